@@ -0,0 +1,292 @@
+"""
+基准测试，不需要界面和win32：回放截图或合成聊天图像，依次执行OCR识别和文本分析，
+统计吞吐量、各阶段延迟分位数、峰值内存和提醒的准确率，结果保存为JSON，便于比较不同提交。
+
+用法:
+    python benchmark.py --synthetic 200 --output result.json
+    python benchmark.py --images 截图目录 --output result.json
+
+截图目录中的labels.json为{文件名: 画面中的真实文本}，没有标注的图片只统计性能。
+合成帧的真实文本只包含字体能够绘制的消息，缺字的消息会被跳过并在结果中报告。
+"""
+import argparse
+import contextlib
+import difflib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from config import MONITOR_SETTINGS, OCR_SETTINGS, RULES
+from metrics import Metrics, metrics
+from monitor.frame_source import ImageDirectoryFrameSource, SyntheticChatFrameSource
+from monitor.text_analyzer import TextAnalyzer
+
+def peak_rss():
+    """本进程的峰值内存占用(字节)"""
+    try:
+        import resource
+        # Linux上ru_maxrss的单位是KB，macOS上是字节
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        import psutil
+        memory = psutil.Process(os.getpid()).memory_info()
+        return getattr(memory, 'peak_wset', memory.rss)
+
+
+def git_commit():
+    """当前代码的提交号，不在git仓库中时返回None"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_frames(args):
+    """读取要回放的帧
+
+    Returns:
+        ([(名称, PIL图像, 真实文本或None), ...], 字体无法绘制而跳过的消息列表)
+    """
+    frames = []
+    skipped = []
+    if args.images:
+        labels = {}
+        labels_path = os.path.join(args.images, 'labels.json')
+        if os.path.exists(labels_path):
+            with open(labels_path, 'r', encoding='utf-8') as f:
+                labels = json.load(f)
+        source = ImageDirectoryFrameSource(args.images, loop=False)
+        while True:
+            image = source.get_frame()
+            if image is None:
+                break
+            name = os.path.basename(source.current_file())
+            frames.append((name, image, labels.get(name)))
+    else:
+        # 每帧发送一条新消息，画面中的文本就是真实文本
+        source = SyntheticChatFrameSource(
+            width=args.width, height=args.height, message_interval=0, font_path=args.font, seed=args.seed
+        )
+        for index in range(args.synthetic):
+            image = source.get_frame()
+            # 缺字的消息在画面上是方框，不能作为真实文本
+            truth = [line for line in source.lines if source.can_render(line)]
+            frames.append((f"synthetic-{index}", image, "\n".join(truth)))
+        skipped = [message for message in source.posted if not source.can_render(message)]
+        if skipped:
+            print(f"字体无法绘制 {len(skipped)}/{len(source.posted)} 条消息，不计入真实文本，可以用--font指定中文字体",
+                  file=sys.stderr)
+    return frames, skipped
+
+
+def create_processor(args):
+    """按配置文件和命令行参数创建OCR处理器"""
+    from ocr.ocr_processor import OCRProcessor
+
+    ocr_settings = dict(OCR_SETTINGS)
+    if args.det_limit_side_len:
+        ocr_settings['det_limit_side_len'] = args.det_limit_side_len
+    if args.rec_batch_num:
+        ocr_settings['rec_batch_num'] = args.rec_batch_num
+    options = {
+        'layout_cache_enabled': MONITOR_SETTINGS.get('layout_cache_enabled', True) and not args.no_layout_cache,
+        'line_cache_size': MONITOR_SETTINGS.get('line_cache_size', 512) if args.line_cache_size is None else args.line_cache_size,
+        'preprocess_steps': {
+            'resize': MONITOR_SETTINGS.get('preprocess_resize', True),
+            'binarize': MONITOR_SETTINGS.get('preprocess_binarize', True),
+            'clahe': MONITOR_SETTINGS.get('preprocess_clahe', True),
+        },
+    }
+    for step in args.disable_step:
+        options['preprocess_steps'][step] = False
+    processor = OCRProcessor(
+        ocr_settings, MONITOR_SETTINGS['confidence_threshold'], auto_reset_enabled=False, **options
+    )
+    return processor, ocr_settings, options
+
+
+def score(found, expected):
+    """比较识别出的提醒和真实文本中的提醒
+
+    Returns:
+        (正确数, 误报数, 漏报数)
+    """
+    found = set(found)
+    expected = set(expected)
+    return len(found & expected), len(found - expected), len(expected - found)
+
+
+def score_lines(text, truth):
+    """逐行比较识别结果和真实文本，忽略空白
+
+    Returns:
+        (完全一致的行数, 识别出的行数, 真实文本的行数, 字符相似度)
+    """
+    def normalize(lines):
+        return [''.join(line.split()) for line in lines if line.strip()]
+
+    found = normalize(text.splitlines() if text else [])
+    expected = normalize(truth.splitlines())
+    remaining = list(expected)
+    matched = 0
+    for line in found:
+        if line in remaining:
+            remaining.remove(line)
+            matched += 1
+    similarity = difflib.SequenceMatcher(None, "\n".join(found), "\n".join(expected)).ratio()
+    return matched, len(found), len(expected), similarity
+
+
+def run(args):
+    frames, skipped = load_frames(args)
+    if not frames:
+        print("没有可回放的帧", file=sys.stderr)
+        return None
+
+    processor, ocr_settings, options = create_processor(args)
+    start_time = time.perf_counter()
+    if not processor.initialize():
+        print("OCR引擎初始化失败", file=sys.stderr)
+        return None
+    startup_seconds = time.perf_counter() - start_time
+
+    # 提醒不记入已提醒记录，每帧都返回全部匹配，便于和真实文本比较
+    analyzer = TextAnalyzer(RULES)
+    truth_analyzer = TextAnalyzer(RULES)
+    layout_key = None if args.no_layout_cache else 'benchmark'
+
+    # 预热，不计入结果
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        for _, image, _ in frames[:args.warmup]:
+            processor.recognize_text(image, layout_key)
+
+    timings = Metrics(window=len(frames) * args.repeat)
+    metrics.reset()
+    true_positives = false_positives = false_negatives = 0
+    labelled = exact_frames = 0
+    matched_lines = found_lines = expected_lines = 0
+    similarity_total = 0.0
+
+    run_start = time.perf_counter()
+    # 识别和分析过程中的日志输出会影响计时，暂时丢弃
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(args.repeat):
+            for name, image, truth in frames:
+                frame_start = time.perf_counter()
+                text = processor.recognize_text(image, layout_key)
+                ocr_end = time.perf_counter()
+                # analyze_text只返回第一条匹配，准确率需要全部匹配
+                found = analyzer.find_matches(text)
+                end = time.perf_counter()
+                timings.observe('ocr', ocr_end - frame_start)
+                timings.observe('analysis', end - ocr_end)
+                timings.observe('frame', end - frame_start)
+
+                if truth is None:
+                    continue
+                labelled += 1
+                hits, extra, missed = score(found, truth_analyzer.find_matches(truth))
+                true_positives += hits
+                false_positives += extra
+                false_negatives += missed
+                if not extra and not missed:
+                    exact_frames += 1
+                matched, found_count, expected_count, similarity = score_lines(text, truth)
+                matched_lines += matched
+                found_lines += found_count
+                expected_lines += expected_count
+                similarity_total += similarity
+    elapsed = time.perf_counter() - run_start
+    processed = len(frames) * args.repeat
+
+    stages = timings.snapshot()['stages']
+    stages.update({stage: stats for stage, stats in metrics.snapshot()['stages'].items()
+                   if stage in ('preprocess', 'detection', 'recognition')})
+    result = {
+        'commit': git_commit(),
+        'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'source': args.images or f"synthetic:{args.synthetic}:{args.width}x{args.height}:seed={args.seed}",
+        'ocr_settings': ocr_settings,
+        'processor_options': options,
+        'frames': processed,
+        'startup_seconds': startup_seconds,
+        'elapsed_seconds': elapsed,
+        'throughput_fps': processed / elapsed if elapsed else 0.0,
+        'latency': stages,
+        'peak_rss_bytes': peak_rss(),
+        'ocr_stats': processor.get_stats(),
+    }
+    if labelled:
+        precision = true_positives / (true_positives + false_positives) if true_positives + false_positives else 1.0
+        recall = true_positives / (true_positives + false_negatives) if true_positives + false_negatives else 1.0
+        result['accuracy'] = {
+            'labelled_frames': labelled,
+            'exact_frames': exact_frames,
+            'true_positives': true_positives,
+            'false_positives': false_positives,
+            'false_negatives': false_negatives,
+            'precision': precision,
+            'recall': recall,
+            'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        }
+        # 逐行的OCR准确率，与提醒是否命中无关
+        result['ocr_accuracy'] = {
+            'matched_lines': matched_lines,
+            'recognized_lines': found_lines,
+            'expected_lines': expected_lines,
+            'line_precision': matched_lines / found_lines if found_lines else 1.0,
+            'line_recall': matched_lines / expected_lines if expected_lines else 1.0,
+            'char_similarity': similarity_total / labelled,
+        }
+    if skipped:
+        result['unrenderable_messages'] = {'count': len(skipped), 'examples': sorted(set(skipped))[:10]}
+    processor.release()
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="车牌监控OCR流水线基准测试")
+    parser.add_argument('--images', help="回放的截图目录，目录中可以有labels.json")
+    parser.add_argument('--synthetic', type=int, default=100, help="不指定--images时生成的合成帧数")
+    parser.add_argument('--width', type=int, default=480, help="合成帧的宽度")
+    parser.add_argument('--height', type=int, default=360, help="合成帧的高度")
+    parser.add_argument('--font', help="合成帧使用的字体")
+    parser.add_argument('--seed', type=int, default=0, help="合成帧的随机数种子")
+    parser.add_argument('--warmup', type=int, default=5, help="预热帧数，不计入结果")
+    parser.add_argument('--repeat', type=int, default=1, help="重复回放的次数")
+    parser.add_argument('--det-limit-side-len', type=int, help="覆盖OCR设置中的det_limit_side_len")
+    parser.add_argument('--rec-batch-num', type=int, help="覆盖OCR设置中的rec_batch_num")
+    parser.add_argument('--no-layout-cache', action='store_true', help="关闭文本行布局缓存")
+    parser.add_argument('--line-cache-size', type=int, help="识别结果缓存的行数，0为关闭")
+    parser.add_argument('--disable-step', action='append', default=[], choices=('resize', 'binarize', 'clahe'),
+                        help="关闭某个预处理步骤，可以重复指定")
+    parser.add_argument('--output', help="结果JSON的保存路径，不指定时输出到标准输出")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    result = run(args)
+    if result is None:
+        return 1
+    content = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"结果已保存到: {args.output}", file=sys.stderr)
+    else:
+        print(content)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
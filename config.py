@@ -1,5 +1,5 @@
 # 监控设置
-MONITOR_SETTINGS = {'window_title': '立直荣断幺九', 'scan_interval': 1.0, 'confidence_threshold': 0.8, 'memory_cleanup_interval': 30, 'max_log_lines': 500, 'use_background_capture': False, 'memory_threshold': 1500, 'auto_reset_enabled': True}
+MONITOR_SETTINGS = {'window_title': '立直荣断幺九', 'scan_interval': 1.0, 'adaptive_interval_enabled': True, 'min_scan_interval': 0.3, 'max_scan_interval': 2.0, 'scan_backoff': 1.5, 'confidence_threshold': 0.8, 'memory_cleanup_interval': 30, 'max_log_lines': 500, 'log_level': 'INFO', 'log_file': '', 'use_background_capture': False, 'memory_threshold': 1500, 'auto_reset_enabled': True, 'change_detection_enabled': True, 'change_sensitivity': 12, 'incremental_ocr_enabled': True, 'layout_cache_enabled': True, 'line_cache_size': 512, 'preprocess_resize': True, 'preprocess_binarize': True, 'preprocess_clahe': True, 'ocr_backend': 'inprocess', 'worker_max_calls': 5000, 'worker_max_age': 3600, 'ocr_workers': 1, 'ocr_threads_per_worker': 0, 'frame_source': 'window', 'frame_source_path': '', 'extra_targets': [], 'alert_ttl_hours': 24, 'alert_history_size': 1000, 'alert_history_persist': True, 'alert_sinks': ['popup', 'sound'], 'alert_sound_file': '', 'alert_log_file': '', 'alert_webhook_url': '', 'alert_socket_path': '', 'metrics_port': 0}
 
 # OCR设置
 OCR_SETTINGS = {'use_angle_cls': False, 'lang': 'ch', 'show_log': False, 'use_gpu': False, 'enable_mkldnn': True, 'cls_model_dir': None, 'rec_char_dict_path': None}
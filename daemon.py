@@ -0,0 +1,379 @@
+"""
+无界面运行入口，不导入任何界面模块：按配置文件截图、识别和分析，日志按行输出JSON，适合在无人值守的机器上运行。
+
+用法:
+    python daemon.py --config config.py
+    python daemon.py --config settings.json --log-file monitor.log
+
+配置文件可以是与config.py相同格式的Python文件，也可以是包含MONITOR_SETTINGS、OCR_SETTINGS和RULES的JSON文件。
+收到SIGINT/SIGTERM时停止监控并退出，收到SIGHUP时重新加载匹配规则。
+"""
+import argparse
+import gc
+import json
+import os
+import runpy
+import signal
+import sys
+import threading
+import time
+
+from metrics import metrics, MetricsServer
+from monitor.alert_dispatcher import AlertDispatcher, create_alert_sinks
+from monitor.alert_store import AlertStore
+from monitor.frame_source import create_frame_source, WindowFrameSource
+from monitor.monitor_target import MonitorTarget
+from monitor.pipeline import MonitorPipeline
+from monitor.scan_scheduler import ScanScheduler
+from monitor.text_analyzer import TextAnalyzer
+from ocr.factory import create_ocr_processor
+from utils import StructuredLogger, RotatingFileSink, get_system_info, log
+
+APP_DIR = os.path.dirname(os.path.abspath(sys.argv[0]))
+PRIMARY_TARGET = '主窗口'
+
+def load_config(path):
+    """读取配置文件
+
+    Returns:
+        (MONITOR_SETTINGS, OCR_SETTINGS, RULES, 裁剪区域文件路径)
+    """
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    else:
+        config = runpy.run_path(path)
+    crop_area_file = config.get('CROP_AREA_FILE', 'last_crop_area.txt')
+    if not os.path.isabs(crop_area_file):
+        crop_area_file = os.path.join(os.path.dirname(os.path.abspath(path)), crop_area_file)
+    return config['MONITOR_SETTINGS'], config['OCR_SETTINGS'], config['RULES'], crop_area_file
+
+
+class MonitorDaemon:
+    """无界面监控：截图线程和OCR线程与界面版相同，主线程代替Tk事件循环轮询结果"""
+
+    def __init__(self, config_path, monitor_settings, ocr_settings, rules, crop_area_file, logger):
+        """初始化无界面监控
+
+        Args:
+            config_path: 配置文件路径，重新加载规则时使用
+            monitor_settings: 监控设置字典
+            ocr_settings: OCR引擎的设置字典
+            rules: 匹配规则字典
+            crop_area_file: 监控区域文件路径
+            logger: StructuredLogger实例
+        """
+        self.config_path = config_path
+        self.settings = monitor_settings
+        self.ocr_settings = ocr_settings
+        self.rules = rules
+        self.crop_area_file = crop_area_file
+        self.logger = logger
+
+        self.stop_event = threading.Event()
+        self.reload_requested = False
+        self.loop_counter = 0
+        self.memory_cleanup_interval = monitor_settings.get('memory_cleanup_interval', 30)
+
+        self.window_capture = None
+        self.frame_source = None
+        self.targets = {}
+        self.ocr_processor = create_ocr_processor(monitor_settings, ocr_settings)
+        self.scan_scheduler = ScanScheduler(
+            base_interval=monitor_settings['scan_interval'],
+            min_interval=monitor_settings.get('min_scan_interval', 0.3),
+            max_interval=monitor_settings.get('max_scan_interval', 2.0),
+            backoff=monitor_settings.get('scan_backoff', 1.5),
+            enabled=monitor_settings.get('adaptive_interval_enabled', True)
+        )
+        self.pipeline = MonitorPipeline(
+            {},
+            self.process_frames,
+            self.scan_scheduler.next_interval,
+            should_process=self.should_process_frame,
+            prepare_frames=self.prepare_frames,
+            finish_frames=self.finish_frames,
+            discard_frames=self.discard_frames
+        )
+        # 无人值守时弹窗没有意义，只保留其他提醒方式
+        sink_settings = dict(monitor_settings)
+        sink_settings['alert_sinks'] = [sink for sink in monitor_settings.get('alert_sinks', []) if sink != 'popup']
+        self.alert_dispatcher = AlertDispatcher(create_alert_sinks(sink_settings, APP_DIR))
+        self.metrics_server = None
+
+    def _create_window_capture(self, window_title, crop_area=None):
+        """创建窗口截图，只有使用窗口帧来源时才导入win32模块"""
+        from monitor.window_capture import WindowCapture
+        window_capture = WindowCapture(check_capabilities=False)
+        window_capture.use_background_capture = self.settings.get('use_background_capture', True)
+        hwnd = window_capture.find_window_by_title(window_title) if window_title else None
+        if hwnd:
+            window_capture.selected_window = hwnd
+        if crop_area:
+            window_capture.crop_area = tuple(crop_area)
+        return window_capture
+
+    def create_alert_store(self, name):
+        """创建监控目标的已提醒消息记录，与界面版使用同样的文件"""
+        path = None
+        if self.settings.get('alert_history_persist', True):
+            suffix = '' if name == PRIMARY_TARGET else '_' + ''.join('_' if c in '\\/:*?"<>|' else c for c in name)
+            path = os.path.join(APP_DIR, f'alert_history{suffix}.json')
+        return AlertStore(
+            ttl=self.settings.get('alert_ttl_hours', 24) * 3600,
+            capacity=self.settings.get('alert_history_size', 1000),
+            path=path
+        )
+
+    def build_targets(self):
+        """根据设置创建所有监控目标
+
+        Returns:
+            bool: 主目标是否可用
+        """
+        if self.settings.get('frame_source', 'window') == 'window':
+            self.window_capture = self._create_window_capture(self.settings.get('window_title'))
+            self.window_capture.crop_area_file = self.crop_area_file
+            self.window_capture.load_crop_area()
+        self.frame_source = create_frame_source(self.settings, self.window_capture)
+        if not self.frame_source.is_ready():
+            log(f"帧来源不可用: {self.frame_source.name}，请检查窗口标题和监控区域", 'ERROR')
+            return False
+
+        options = {
+            'change_sensitivity': self.settings.get('change_sensitivity', 12),
+            'change_detection_enabled': self.settings.get('change_detection_enabled', True),
+            'incremental_ocr_enabled': self.settings.get('incremental_ocr_enabled', True),
+        }
+        self.targets = {
+            PRIMARY_TARGET: MonitorTarget(PRIMARY_TARGET, self.frame_source, self.ocr_processor, self.rules,
+                                          text_analyzer=TextAnalyzer(self.rules, self.create_alert_store(PRIMARY_TARGET)),
+                                          **options)
+        }
+        for index, config in enumerate(self.settings.get('extra_targets', [])):
+            name = config.get('name') or config.get('window_title') or f"目标{index + 2}"
+            window_capture = self._create_window_capture(config.get('window_title'), config.get('crop_area'))
+            frame_source = WindowFrameSource(window_capture)
+            if not frame_source.is_ready():
+                log(f"未找到监控目标窗口或区域: {name}", 'WARNING')
+                continue
+            self.targets[name] = MonitorTarget(name, frame_source, self.ocr_processor, self.rules,
+                                               text_analyzer=TextAnalyzer(self.rules, self.create_alert_store(name)),
+                                               **options)
+        return True
+
+    def should_process_frame(self, name, cropped_image):
+        """截图线程调用：画面没有变化时跳过OCR"""
+        target = self.targets[name]
+        with metrics.timer('change_detection'):
+            changed = target.should_process(cropped_image)
+        if not changed:
+            metrics.increment('frames_skipped')
+        elif target.change_detection_enabled:
+            self.scan_scheduler.record_activity()
+        return changed
+
+    def prepare_frames(self, frames):
+        """OCR线程按取帧顺序调用：定期检查内存，准备各目标需要识别的图像"""
+        self.loop_counter += 1
+        if self.loop_counter >= self.memory_cleanup_interval:
+            self.loop_counter = 0
+            system_info = get_system_info()
+            if system_info and system_info['process_memory'] > self.settings.get('memory_threshold', 1800) * 1024 * 1024:
+                # 新引擎在后台创建，就绪后再替换
+                self.ocr_processor.request_reset("程序内存占用较高，正在重置OCR引擎...")
+            gc.collect()
+        names = list(frames)
+        return names, [self.targets[name].prepare(frames[name]) for name in names]
+
+    def process_frames(self, batch):
+        """OCR线程调用：各目标的图像合并为一次批量识别"""
+        names, prepared = batch
+        images = [image for image, _ in prepared]
+        layout_keys = [self.targets[name].layout_key(request) for name, (_, request) in zip(names, prepared)]
+        with metrics.timer('ocr'):
+            texts = self.ocr_processor.recognize_batch(images, layout_keys)
+        return names, [request for _, request in prepared], texts
+
+    def discard_frames(self, names):
+        """OCR线程调用：这一批帧出错没有识别，之后相同的画面需要重新识别"""
+        for name in names:
+            target = self.targets.get(name)
+            if target is not None:
+                target.discard()
+
+    def finish_frames(self, processed):
+        """OCR线程按取帧顺序调用：把识别结果合并到各目标的行缓冲区"""
+        names, requests, texts = processed
+        return [(name, self.targets[name].commit(text, request)) for name, request, text in zip(names, requests, texts)]
+
+    def poll_results(self):
+        """主线程调用：分析识别结果，发送提醒"""
+        alerts = []
+        for name, text in self.pipeline.poll_results():
+            target = self.targets.get(name)
+            if not text or not target:
+                continue
+            with metrics.timer('analysis'):
+                matches = target.text_analyzer.find_matches(text)
+            for message in matches:
+                target.text_analyzer.add_alerted_message(message)
+                self.logger.event('alert', target=name, message=message)
+                alerts.append(message if name == PRIMARY_TARGET else f"[{name}] {message}")
+        if alerts:
+            self.scan_scheduler.record_activity()
+            self.alert_dispatcher.dispatch("\n".join(alerts))
+
+    def log_stats(self):
+        """输出各阶段耗时和计数"""
+        snapshot = metrics.snapshot()
+        self.logger.event(
+            'stats',
+            stages={stage: {'count': stats['count'], 'p50_ms': round(stats['p50'] * 1000, 1),
+                            'p95_ms': round(stats['p95'] * 1000, 1), 'p99_ms': round(stats['p99'] * 1000, 1)}
+                    for stage, stats in snapshot['stages'].items()},
+            counters=snapshot['counters'],
+            frames_captured=self.pipeline.captured_frames,
+            frames_dropped=self.pipeline.frame_slots.dropped,
+            scan_interval=round(self.scan_scheduler.current_interval(), 2),
+            ocr=self.ocr_processor.get_stats()
+        )
+
+    def reload_rules(self):
+        """重新加载配置文件中的匹配规则"""
+        try:
+            _, _, rules, _ = load_config(self.config_path)
+        except Exception as e:
+            log(f"重新加载配置失败: {str(e)}", 'ERROR')
+            return
+        self.rules = rules
+        for target in self.targets.values():
+            target.text_analyzer.update_rules(rules)
+        self.logger.event('rules_reloaded', path=self.config_path)
+
+    def request_stop(self, signum=None, frame=None):
+        """信号处理：通知主线程停止"""
+        self.stop_event.set()
+
+    def request_reload(self, signum=None, frame=None):
+        """信号处理：通知主线程重新加载规则"""
+        self.reload_requested = True
+
+    def install_signal_handlers(self):
+        """SIGINT/SIGTERM(Windows上还有SIGBREAK)停止监控，SIGHUP重新加载规则"""
+        for name in ('SIGINT', 'SIGTERM', 'SIGBREAK'):
+            if hasattr(signal, name):
+                signal.signal(getattr(signal, name), self.request_stop)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.request_reload)
+
+    def run(self, stats_interval=60.0, poll_interval=0.05):
+        """运行监控直到收到停止信号
+
+        Returns:
+            进程退出码
+        """
+        self.install_signal_handlers()
+        if not self.build_targets():
+            return 1
+        start_time = time.perf_counter()
+        if not self.ocr_processor.initialize():
+            log("OCR引擎初始化失败", 'ERROR')
+            return 1
+        self.logger.event('started', targets=list(self.targets), frame_source=self.frame_source.name,
+                          ocr_startup_seconds=round(time.perf_counter() - start_time, 2))
+
+        metrics.add_collector(lambda: {'scan_interval_seconds': self.scan_scheduler.current_interval()})
+        if self.settings.get('metrics_port', 0):
+            self.metrics_server = MetricsServer(metrics, self.settings['metrics_port'])
+            if not self.metrics_server.start():
+                self.metrics_server = None
+
+        self.alert_dispatcher.start()
+        for target in self.targets.values():
+            target.reset()
+        self.pipeline.frame_sources = {name: target.frame_source for name, target in self.targets.items()}
+        self.pipeline.ocr_threads = self.ocr_processor.worker_count
+        self.pipeline.start()
+
+        next_stats = time.monotonic() + stats_interval
+        try:
+            # 等待时可以被信号打断，Windows上也能及时响应Ctrl+C
+            while not self.stop_event.wait(poll_interval):
+                if self.reload_requested:
+                    self.reload_requested = False
+                    self.reload_rules()
+                try:
+                    self.poll_results()
+                except Exception as e:
+                    log(f"监控过程出错: {str(e)}", 'ERROR')
+                if time.monotonic() >= next_stats:
+                    next_stats = time.monotonic() + stats_interval
+                    self.log_stats()
+            # 停止前处理已完成的结果
+            self.poll_results()
+        finally:
+            self.shutdown()
+        return 0
+
+    def shutdown(self):
+        """停止所有线程，释放资源"""
+        if not self.pipeline.stop():
+            # 程序即将退出，仍然结束OCR子进程，避免留下孤儿进程
+            log("OCR线程没有及时退出", 'WARNING')
+        self.ocr_processor.release()
+        self.alert_dispatcher.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        for target in self.targets.values():
+            target.frame_source.close()
+        self.log_stats()
+        self.logger.event('stopped')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="车牌监控无界面运行入口")
+    parser.add_argument('--config', default=os.path.join(APP_DIR, 'config.py'), help="配置文件(.py或.json)")
+    parser.add_argument('--frame-source', choices=('window', 'directory', 'video', 'synthetic'),
+                        help="覆盖配置中的帧来源")
+    parser.add_argument('--frame-source-path', help="覆盖配置中的帧来源路径")
+    parser.add_argument('--log-level', help="覆盖配置中的日志级别")
+    parser.add_argument('--log-file', help="同时写入的日志文件，按大小轮转")
+    parser.add_argument('--stats-interval', type=float, default=60.0, help="输出统计信息的间隔(秒)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        monitor_settings, ocr_settings, rules, crop_area_file = load_config(args.config)
+    except Exception as e:
+        print(f"读取配置文件失败: {args.config}: {str(e)}", file=sys.stderr)
+        return 1
+    if args.frame_source:
+        monitor_settings['frame_source'] = args.frame_source
+    if args.frame_source_path:
+        monitor_settings['frame_source_path'] = args.frame_source_path
+
+    log_file = args.log_file or monitor_settings.get('log_file')
+    logger = StructuredLogger(
+        sys.stderr,
+        level=args.log_level or monitor_settings.get('log_level', 'INFO'),
+        file_sink=RotatingFileSink(log_file) if log_file else None
+    )
+    original_stdout = sys.stdout
+    sys.stdout = logger
+    try:
+        return MonitorDaemon(args.config, monitor_settings, ocr_settings, rules, crop_area_file, logger).run(
+            stats_interval=args.stats_interval
+        )
+    finally:
+        sys.stdout = original_stdout
+        logger.close()
+
+
+if __name__ == "__main__":
+    # 使用OCR子进程时，打包后的程序需要
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -9,7 +9,7 @@ class AlertHistoryDialog:
         
         Args:
             parent: 父窗口
-            text_analyzer: 文本分析器实例，包含警报消息集合
+            text_analyzer: 文本分析器实例，包含已提醒消息记录
         """
         self.parent = parent
         self.text_analyzer = text_analyzer
@@ -55,14 +55,14 @@ class AlertHistoryDialog:
         # 加载现有记录
         self.load_history(self.text_analyzer.get_alerted_messages())
         
-    def load_history(self, history_set):
+    def load_history(self, history):
         """加载历史记录到列表框
         
         Args:
-            history_set: 包含历史消息的集合
+            history: 按提醒时间先后排列的历史消息列表
         """
         self.history_list.delete(0, tk.END)
-        for item in sorted(history_set):
+        for item in history:
             self.history_list.insert(tk.END, item)
     
     def add_history(self):
@@ -85,12 +85,10 @@ class AlertHistoryDialog:
     
     def save_changes(self):
         """保存更改到文本分析器"""
-        new_history = set(self.history_list.get(0, tk.END))
+        new_history = list(self.history_list.get(0, tk.END))
         
-        # 清空文本分析器中的记录并添加新记录
-        self.text_analyzer.clear_alerted_messages()
-        for message in new_history:
-            self.text_analyzer.add_alerted_message(message)
+        # 替换文本分析器中的记录，保留原有记录的提醒时间
+        self.text_analyzer.replace_alerted_messages(new_history)
             
         messagebox.showinfo("成功", "更改已保存")
         self.window.destroy() 
\ No newline at end of file
@@ -0,0 +1,64 @@
+import tkinter as tk
+from tkinter import ttk
+
+class MetricsDialog:
+    """性能指标面板，每秒刷新各阶段耗时分位数、计数和状态值"""
+
+    def __init__(self, parent, metrics, refresh_interval=1000):
+        """初始化性能指标面板
+
+        Args:
+            parent: 父窗口
+            metrics: Metrics实例
+            refresh_interval: 刷新间隔(毫秒)
+        """
+        self.parent = parent
+        self.metrics = metrics
+        self.refresh_interval = refresh_interval
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("性能指标")
+        self.window.geometry("560x480")
+
+        # 各阶段耗时
+        ttk.Label(self.window, text="各阶段耗时 (毫秒):").pack(anchor=tk.W, padx=5, pady=5)
+        columns = ('count', 'p50', 'p95', 'p99')
+        self.stage_tree = ttk.Treeview(self.window, columns=columns, height=10)
+        self.stage_tree.heading('#0', text="阶段")
+        self.stage_tree.column('#0', width=140)
+        for column, text in zip(columns, ("次数", "P50", "P95", "P99")):
+            self.stage_tree.heading(column, text=text)
+            self.stage_tree.column(column, width=90, anchor=tk.E)
+        self.stage_tree.pack(fill=tk.BOTH, expand=True, padx=5)
+
+        # 计数和状态值
+        ttk.Label(self.window, text="计数和状态:").pack(anchor=tk.W, padx=5, pady=5)
+        self.value_tree = ttk.Treeview(self.window, columns=('value',), height=8)
+        self.value_tree.heading('#0', text="名称")
+        self.value_tree.column('#0', width=240)
+        self.value_tree.heading('value', text="数值")
+        self.value_tree.column('value', width=120, anchor=tk.E)
+        self.value_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+
+        self.refresh()
+
+    def refresh(self):
+        """刷新显示，窗口关闭后停止"""
+        if not self.window.winfo_exists():
+            return
+        snapshot = self.metrics.snapshot()
+
+        self.stage_tree.delete(*self.stage_tree.get_children())
+        for stage, stats in snapshot['stages'].items():
+            self.stage_tree.insert('', tk.END, text=stage, values=(
+                stats['count'], f"{stats['p50'] * 1000:.1f}", f"{stats['p95'] * 1000:.1f}", f"{stats['p99'] * 1000:.1f}"
+            ))
+
+        self.value_tree.delete(*self.value_tree.get_children())
+        for name, value in snapshot['counters'].items():
+            self.value_tree.insert('', tk.END, text=name, values=(value,))
+        for name, value in snapshot['gauges'].items():
+            text = f"{value:.1%}" if name.endswith('_rate') else f"{value:g}"
+            self.value_tree.insert('', tk.END, text=name, values=(text,))
+
+        self.window.after(self.refresh_interval, self.refresh)
@@ -3,6 +3,7 @@ from tkinter import ttk, messagebox
 import re
 import os
 import sys
+from utils import log
 
 class SettingsDialog:
     """设置对话框类，用于配置程序的各项参数"""
@@ -37,6 +38,7 @@ class SettingsDialog:
         self._create_basic_settings_page()
         self._create_keywords_page()
         self._create_rules_page()
+        self._create_performance_page()
         
         # 保存按钮
         ttk.Button(self.window, text="保存设置", 
@@ -93,6 +95,26 @@ class SettingsDialog:
         self.max_log_lines.insert(0, str(self.monitor_settings.get('max_log_lines', 500)))
         self.max_log_lines.pack(pady=5)
         
+        # 日志级别设置
+        ttk.Label(self.basic_frame, text="日志级别:").pack(pady=5)
+        self.log_level_var = tk.StringVar(value=self.monitor_settings.get('log_level', 'INFO'))
+        ttk.Combobox(self.basic_frame, textvariable=self.log_level_var, state='readonly',
+                     values=('DEBUG', 'INFO', 'WARNING', 'ERROR')).pack(pady=5)
+        
+        # 提醒记录有效期设置
+        ttk.Label(self.basic_frame, text="提醒记录有效期(小时, 0为永久):").pack(pady=5)
+        self.alert_ttl_hours = ttk.Entry(self.basic_frame)
+        self.alert_ttl_hours.insert(0, str(self.monitor_settings.get('alert_ttl_hours', 24)))
+        self.alert_ttl_hours.pack(pady=5)
+        
+        # 提醒方式设置，webhook和socket需要在配置文件中填写地址
+        alert_sinks = self.monitor_settings.get('alert_sinks', ['popup'])
+        self.alert_sink_vars = {}
+        for sink, text in (('popup', "弹窗提醒"), ('sound', "声音提醒"), ('log', "写入提醒日志")):
+            self.alert_sink_vars[sink] = tk.BooleanVar(value=sink in alert_sinks)
+            ttk.Checkbutton(self.basic_frame, text=text, 
+                           variable=self.alert_sink_vars[sink]).pack(pady=5)
+        
         # GPU设置
         self.use_gpu_var = tk.BooleanVar(value=self.ocr_settings.get('use_gpu', False))
         ttk.Checkbutton(self.basic_frame, text="使用GPU加速(需要支持CUDA)", 
@@ -183,6 +205,72 @@ class SettingsDialog:
         ttk.Button(self.exclude_pattern_frame, text="删除",
                   command=lambda: self.delete_pattern('exclude')).pack(side=tk.LEFT)
     
+    def _create_performance_page(self):
+        """创建性能设置页面"""
+        self.performance_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.performance_frame, text="性能设置")
+        
+        # 画面变化检测设置
+        self.change_detection_enabled_var = tk.BooleanVar(value=self.monitor_settings.get('change_detection_enabled', True))
+        ttk.Checkbutton(self.performance_frame, text="画面无变化时跳过OCR", 
+                       variable=self.change_detection_enabled_var).pack(pady=5)
+        
+        ttk.Label(self.performance_frame, text="变化灵敏度阈值 (灰度差, 越小越灵敏):").pack(pady=5)
+        self.change_sensitivity = ttk.Entry(self.performance_frame)
+        self.change_sensitivity.insert(0, str(self.monitor_settings.get('change_sensitivity', 12)))
+        self.change_sensitivity.pack(pady=5)
+        
+        # 自适应扫描间隔设置
+        self.adaptive_interval_enabled_var = tk.BooleanVar(value=self.monitor_settings.get('adaptive_interval_enabled', True))
+        ttk.Checkbutton(self.performance_frame, text="聊天活跃时加快扫描，空闲时逐步放慢", 
+                       variable=self.adaptive_interval_enabled_var).pack(pady=5)
+        
+        ttk.Label(self.performance_frame, text="最短/最长扫描间隔 (秒):").pack(pady=5)
+        self.scan_interval_frame = ttk.Frame(self.performance_frame)
+        self.scan_interval_frame.pack(pady=5)
+        self.min_scan_interval = ttk.Entry(self.scan_interval_frame, width=8)
+        self.min_scan_interval.insert(0, str(self.monitor_settings.get('min_scan_interval', 0.3)))
+        self.min_scan_interval.pack(side=tk.LEFT, padx=5)
+        self.max_scan_interval = ttk.Entry(self.scan_interval_frame, width=8)
+        self.max_scan_interval.insert(0, str(self.monitor_settings.get('max_scan_interval', 2.0)))
+        self.max_scan_interval.pack(side=tk.LEFT, padx=5)
+        
+        # 增量识别设置
+        self.incremental_ocr_enabled_var = tk.BooleanVar(value=self.monitor_settings.get('incremental_ocr_enabled', True))
+        ttk.Checkbutton(self.performance_frame, text="聊天滚动时只识别新出现的行", 
+                       variable=self.incremental_ocr_enabled_var).pack(pady=5)
+        
+        # 文本行布局缓存设置
+        self.layout_cache_enabled_var = tk.BooleanVar(value=self.monitor_settings.get('layout_cache_enabled', True))
+        ttk.Checkbutton(self.performance_frame, text="文本行位置不变时跳过文字检测", 
+                       variable=self.layout_cache_enabled_var).pack(pady=5)
+        
+        # OCR运行方式设置
+        self.ocr_subprocess_var = tk.BooleanVar(value=self.monitor_settings.get('ocr_backend', 'inprocess') == 'subprocess')
+        ttk.Checkbutton(self.performance_frame, text="在独立进程中运行OCR(重启程序后生效)", 
+                       variable=self.ocr_subprocess_var).pack(pady=5)
+        
+        ttk.Label(self.performance_frame, text="OCR子进程数 (重启程序后生效):").pack(pady=5)
+        self.ocr_workers = ttk.Entry(self.performance_frame)
+        self.ocr_workers.insert(0, str(self.monitor_settings.get('ocr_workers', 1)))
+        self.ocr_workers.pack(pady=5)
+        
+        # 识别结果缓存设置
+        ttk.Label(self.performance_frame, text="识别结果缓存行数 (0为关闭):").pack(pady=5)
+        self.line_cache_size = ttk.Entry(self.performance_frame)
+        self.line_cache_size.insert(0, str(self.monitor_settings.get('line_cache_size', 512)))
+        self.line_cache_size.pack(pady=5)
+        
+        # 图像预处理设置
+        ttk.Label(self.performance_frame, text="图像预处理:").pack(pady=5)
+        self.preprocess_frame = ttk.Frame(self.performance_frame)
+        self.preprocess_frame.pack(pady=5)
+        self.preprocess_vars = {}
+        for key, text in (('preprocess_resize', "缩小大图"), ('preprocess_binarize', "二值化"),
+                          ('preprocess_clahe', "暗图增强")):
+            self.preprocess_vars[key] = tk.BooleanVar(value=self.monitor_settings.get(key, True))
+            ttk.Checkbutton(self.preprocess_frame, text=text, variable=self.preprocess_vars[key]).pack(side=tk.LEFT, padx=5)
+    
     def add_keyword(self):
         """添加关键词"""
         keyword = self.keyword_entry.get().strip()
@@ -260,21 +348,48 @@ CROP_AREA_FILE = 'last_crop_area.txt'"""
                 f.write(config_content)
             print(f"配置已保存到: {self.config_file}")
         except Exception as e:
-            print(f"保存配置文件失败: {str(e)}")
+            log(f"保存配置文件失败: {str(e)}", 'ERROR')
             raise
 
     def save_settings(self):
         """保存设置"""
         try:
+            scan_interval = float(self.scan_interval.get())
+            min_scan_interval = float(self.min_scan_interval.get())
+            max_scan_interval = float(self.max_scan_interval.get())
+            if not 0 < min_scan_interval <= scan_interval <= max_scan_interval:
+                messagebox.showerror("错误", "扫描间隔需要满足: 0 < 最短扫描间隔 ≤ 扫描间隔 ≤ 最长扫描间隔")
+                return
+
             # 基本设置
-            self.monitor_settings['scan_interval'] = float(self.scan_interval.get())
+            self.monitor_settings['scan_interval'] = scan_interval
             self.monitor_settings['confidence_threshold'] = float(self.confidence_threshold.get())
             self.monitor_settings['memory_cleanup_interval'] = int(self.memory_cleanup_interval.get())
             self.monitor_settings['max_log_lines'] = int(self.max_log_lines.get())
+            self.monitor_settings['log_level'] = self.log_level_var.get()
+            self.monitor_settings['alert_ttl_hours'] = float(self.alert_ttl_hours.get())
+            self.monitor_settings['alert_sinks'] = (
+                [sink for sink, var in self.alert_sink_vars.items() if var.get()] +
+                [sink for sink in self.monitor_settings.get('alert_sinks', []) if sink not in self.alert_sink_vars]
+            )
             self.monitor_settings['memory_threshold'] = int(self.memory_threshold.get())
             self.monitor_settings['auto_reset_enabled'] = self.auto_reset_enabled_var.get()
             self.monitor_settings['use_background_capture'] = self.use_background_capture_var.get()
             
+            # 性能设置
+            self.monitor_settings['change_detection_enabled'] = self.change_detection_enabled_var.get()
+            self.monitor_settings['change_sensitivity'] = int(self.change_sensitivity.get())
+            self.monitor_settings['adaptive_interval_enabled'] = self.adaptive_interval_enabled_var.get()
+            self.monitor_settings['min_scan_interval'] = min_scan_interval
+            self.monitor_settings['max_scan_interval'] = max_scan_interval
+            self.monitor_settings['incremental_ocr_enabled'] = self.incremental_ocr_enabled_var.get()
+            self.monitor_settings['layout_cache_enabled'] = self.layout_cache_enabled_var.get()
+            self.monitor_settings['ocr_backend'] = 'subprocess' if self.ocr_subprocess_var.get() else 'inprocess'
+            self.monitor_settings['ocr_workers'] = max(1, int(self.ocr_workers.get()))
+            self.monitor_settings['line_cache_size'] = int(self.line_cache_size.get())
+            for key, var in self.preprocess_vars.items():
+                self.monitor_settings[key] = var.get()
+            
             # OCR设置
             self.ocr_settings['use_gpu'] = self.use_gpu_var.get()
             self.ocr_settings['enable_mkldnn'] = self.enable_mkldnn_var.get()
@@ -1,11 +1,14 @@
+import time
+# 程序启动时刻，用于统计界面和OCR模型的启动耗时
+STARTUP_TIME = time.perf_counter()
 import os
 import sys
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import ctypes
-import time
 import gc
+import threading
 import traceback
+import multiprocessing
 import win32gui
 
 # 添加资源路径处理函数
@@ -44,12 +47,43 @@ except ImportError:
     MONITOR_SETTINGS = {
         'window_title': '',
         'scan_interval': 1.0,
+        'adaptive_interval_enabled': True,
+        'min_scan_interval': 0.3,
+        'max_scan_interval': 2.0,
+        'scan_backoff': 1.5,
         'confidence_threshold': 0.8,
         'memory_cleanup_interval': 30,
         'max_log_lines': 500,
+        'log_level': 'INFO',
+        'log_file': '',
         'use_background_capture': True,
         'memory_threshold': 1500,
-        'auto_reset_enabled': True
+        'auto_reset_enabled': True,
+        'change_detection_enabled': True,
+        'change_sensitivity': 12,
+        'incremental_ocr_enabled': True,
+        'layout_cache_enabled': True,
+        'line_cache_size': 512,
+        'preprocess_resize': True,
+        'preprocess_binarize': True,
+        'preprocess_clahe': True,
+        'ocr_backend': 'inprocess',
+        'worker_max_calls': 5000,
+        'worker_max_age': 3600,
+        'ocr_workers': 1,
+        'ocr_threads_per_worker': 0,
+        'frame_source': 'window',
+        'frame_source_path': '',
+        'extra_targets': [],
+        'alert_ttl_hours': 24,
+        'alert_history_size': 1000,
+        'alert_history_persist': True,
+        'alert_sinks': ['popup', 'sound'],
+        'alert_sound_file': '',
+        'alert_log_file': '',
+        'alert_webhook_url': '',
+        'alert_socket_path': '',
+        'metrics_port': 0
     }
     
     # 默认OCR设置
@@ -93,12 +127,22 @@ CROP_AREA_FILE = 'last_crop_area.txt'"""
         print(f"创建配置文件失败: {str(e)}")
 
 # 导入自定义模块
-from utils import Logger, clean_memory, get_system_info, format_bytes
+from utils import Logger, RotatingFileSink, clean_memory, get_system_info, format_bytes, log
+from metrics import metrics, MetricsServer
+from ocr.factory import create_ocr_processor, get_preprocess_steps
 from monitor.window_capture import WindowCapture
 from monitor.text_analyzer import TextAnalyzer
-from ocr.ocr_processor import OCRProcessor
+from monitor.alert_store import AlertStore
+from monitor.alert_dispatcher import AlertDispatcher, create_alert_sinks
+from monitor.pipeline import MonitorPipeline
+from monitor.scan_scheduler import ScanScheduler
+from monitor.frame_source import create_frame_source, WindowFrameSource
 from gui.settings_dialog import SettingsDialog
 from gui.alert_history_dialog import AlertHistoryDialog
+from gui.metrics_dialog import MetricsDialog
+
+# 主监控目标的名称，其余目标来自MONITOR_SETTINGS['extra_targets']
+PRIMARY_TARGET = '主窗口'
 
 class MonitorApp:
     """主应用类，整合所有功能模块"""
@@ -130,10 +174,15 @@ class MonitorApp:
         self.log_text = scrolledtext.ScrolledText(self.main_frame, height=15)
         self.log_text.pack(fill=tk.BOTH, expand=True, pady=5)
         
-        # 重定向输出到日志框
-        sys.stdout = Logger(self.log_text)
-        # 设置日志最大行数
-        sys.stdout.max_lines = MONITOR_SETTINGS.get('max_log_lines', 500)
+        # 重定向输出到日志框，日志先写入缓冲区，定时批量刷新到控件
+        log_file = MONITOR_SETTINGS.get('log_file')
+        sys.stdout = Logger(
+            self.log_text,
+            max_lines=MONITOR_SETTINGS.get('max_log_lines', 500),
+            level=MONITOR_SETTINGS.get('log_level', 'INFO'),
+            file_sink=RotatingFileSink(os.path.join(APP_DIR, log_file)) if log_file else None
+        )
+        sys.stdout.start_flush_timer(self.root)
         
         # 创建按钮框架 - 分成两行
         self.button_frame1 = ttk.Frame(self.main_frame)
@@ -152,30 +201,60 @@ class MonitorApp:
         # 第二行按钮 - 辅助功能按钮
         ttk.Button(self.button_frame2, text="识别记录", command=self.show_alert_history).pack(side=tk.LEFT, padx=5)
         ttk.Button(self.button_frame2, text="切换捕获模式", command=self.toggle_capture_mode).pack(side=tk.LEFT, padx=5)
-        ttk.Button(self.button_frame2, text="清理内存", command=self.clean_memory).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.button_frame2, text="清理内存", command=self.request_clean_memory).pack(side=tk.LEFT, padx=5)
         ttk.Button(self.button_frame2, text="系统信息", command=self.show_system_info).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.button_frame2, text="性能指标", command=self.show_metrics).pack(side=tk.LEFT, padx=5)
         ttk.Button(self.button_frame2, text="退出程序", command=self.quit_app).pack(side=tk.RIGHT, padx=5)
         
-        # 初始化模块
-        self.window_capture = WindowCapture()
+        # 初始化模块，捕获功能检查需要试截一次图，界面显示后在后台进行
+        self.window_capture = WindowCapture(check_capabilities=False)
         self.window_capture.crop_area_file = CROP_AREA_FILE_PATH  # 使用绝对路径
         # 设置捕获模式
         self.window_capture.use_background_capture = MONITOR_SETTINGS.get('use_background_capture', True)
-        self.text_analyzer = TextAnalyzer(RULES)
-        self.ocr_processor = OCRProcessor(
-            OCR_SETTINGS,
-            MONITOR_SETTINGS['confidence_threshold'],
-            MONITOR_SETTINGS.get('memory_threshold', 1800),  # 内存阈值，默认1800MB
-            MONITOR_SETTINGS.get('auto_reset_enabled', True)  # 是否启用自动内存重置
+        self.text_analyzer = TextAnalyzer(RULES, self.create_alert_store(PRIMARY_TARGET))
+        # 只创建处理器，不加载模型，模型在界面显示后由后台线程加载
+        self.ocr_processor = self.create_ocr_processor()
+        self.ocr_loader = None
+        self.ocr_ready = False
+        self.ui_startup_seconds = None
+        self.ocr_load_seconds = None
+        # 截图和OCR在后台线程中运行，GUI线程只负责轮询结果
+        self.frame_source = create_frame_source(MONITOR_SETTINGS, self.window_capture)
+        # 所有监控目标共享一个OCR引擎，开始监控时创建
+        self.targets = {}
+        # 聊天活跃时缩短扫描间隔，空闲时逐步延长
+        self.scan_scheduler = ScanScheduler()
+        self.update_scan_scheduler()
+        self.pipeline = MonitorPipeline(
+            {},
+            self.process_frames,
+            self.scan_scheduler.next_interval,
+            should_process=self.should_process_frame,
+            prepare_frames=self.prepare_frames,
+            finish_frames=self.finish_frames,
+            discard_frames=self.discard_frames
         )
+        # 提醒在后台线程中输出，弹窗不会阻塞界面和识别
+        self.alert_dispatcher = AlertDispatcher(create_alert_sinks(MONITOR_SETTINGS, APP_DIR))
+        self.alert_dispatcher.start()
+        # 性能指标：缓存命中率等状态值在读取时收集，设置了端口时通过本地HTTP接口导出
+        metrics.add_collector(self.collect_metrics)
+        self.metrics_server = None
+        if MONITOR_SETTINGS.get('metrics_port', 0):
+            self.metrics_server = MetricsServer(metrics, MONITOR_SETTINGS['metrics_port'])
+            if not self.metrics_server.start():
+                self.metrics_server = None
         
         # 初始化变量
         self.monitoring = False
         self.loop_counter = 0
+        self.cleanup_requested = False
         self.memory_cleanup_interval = MONITOR_SETTINGS.get('memory_cleanup_interval', 30)
         
         # 开始定期更新系统信息
         self.start_system_monitor()
+        # 开始轮询后台线程的结果
+        self.poll_pipeline()
         
         print("车牌监控程序已启动")
         print("-" * 30)
@@ -187,6 +266,43 @@ class MonitorApp:
         
         # 尝试自动选择上次的监控区域
         self.try_auto_load_settings()
+        
+        # 界面显示后再做耗时的初始化
+        self.root.after_idle(self.finish_startup)
+    
+    def finish_startup(self):
+        """界面显示后调用：报告启动耗时，在后台检查捕获功能并加载OCR模型"""
+        self.ui_startup_seconds = time.perf_counter() - STARTUP_TIME
+        print(f"界面启动耗时: {self.ui_startup_seconds:.2f}秒")
+        threading.Thread(target=self.window_capture.check_capture_capabilities, name="capture-check", daemon=True).start()
+        self.load_ocr_async()
+    
+    def load_ocr_async(self, on_ready=None):
+        """在后台线程中加载OCR模型，加载结束后在GUI线程调用on_ready
+        
+        Args:
+            on_ready: 可选的回调函数，模型加载结束(无论成功与否)后调用
+        """
+        if self.ocr_loader is None or not self.ocr_loader.is_alive():
+            self.ocr_loader = threading.Thread(target=self._load_ocr, name="ocr-loader", daemon=True)
+            self.ocr_loader.start()
+        if on_ready:
+            self._wait_for_ocr(on_ready)
+    
+    def _load_ocr(self):
+        """OCR加载线程：初始化OCR引擎并记录耗时"""
+        start_time = time.perf_counter()
+        self.ocr_ready = self.ocr_processor.initialize()
+        self.ocr_load_seconds = time.perf_counter() - start_time
+        if self.ocr_ready:
+            print(f"OCR模型加载耗时: {self.ocr_load_seconds:.2f}秒 (程序启动后 {time.perf_counter() - STARTUP_TIME:.2f}秒)")
+    
+    def _wait_for_ocr(self, on_ready):
+        """GUI线程定时检查OCR模型是否加载结束，不阻塞界面"""
+        if self.ocr_loader.is_alive():
+            self.root.after(100, self._wait_for_ocr, on_ready)
+        else:
+            on_ready()
     
     def try_auto_load_settings(self):
         """尝试自动加载上次的设置"""
@@ -225,6 +341,7 @@ CPU使用率: {system_info['cpu_percent']}%
 
 性能设置:
 扫描间隔: {MONITOR_SETTINGS['scan_interval']}秒
+当前扫描间隔: {self.scan_scheduler.current_interval():.2f}秒 ({self.scan_scheduler.get_rate():.2f}次/秒)
 内存清理间隔: 每{self.memory_cleanup_interval}次扫描
 使用GPU: {'是' if OCR_SETTINGS.get('use_gpu', False) else '否'}
 使用MKL加速: {'是' if OCR_SETTINGS.get('enable_mkldnn', True) else '否'}
@@ -242,21 +359,28 @@ CPU使用率: {system_info['cpu_percent']}%
                 # 检查内存使用是否超过90%，如果是则自动清理
                 if system_info['memory_percent'] > 90:
                     print("系统内存使用超过90%，正在自动清理...")
-                    self.clean_memory()
+                    self.request_clean_memory()
                     
                 # 检查程序内存占用是否超过阈值
                 memory_threshold_bytes = MONITOR_SETTINGS.get('memory_threshold', 1800) * 1024 * 1024
                 if system_info['process_memory'] > memory_threshold_bytes:
                     print(f"程序内存占用较高: {format_bytes(system_info['process_memory'])}，正在自动清理...")
-                    self.clean_memory()
+                    self.request_clean_memory()
                     
         except Exception as e:
-            print(f"监控系统资源时出错: {str(e)}")
+            log(f"监控系统资源时出错: {str(e)}", 'ERROR')
         finally:
             # 继续定期监控
             if hasattr(self, 'root') and self.root:  # 确保root仍然存在
                 self.root.after(60000, self.start_system_monitor)  # 60秒后再次调用
     
+    def request_clean_memory(self):
+        """请求清理内存，监控中由OCR线程在两帧之间执行，避免与识别冲突"""
+        if self.monitoring:
+            self.cleanup_requested = True
+        else:
+            self.clean_memory()
+    
     def clean_memory(self):
         """主动清理内存"""
         print("正在清理内存...")
@@ -276,7 +400,7 @@ CPU使用率: {system_info['cpu_percent']}%
     def handle_exception(self, exc_type, exc_value, exc_traceback):
         """处理未捕获的异常"""
         # 打印到控制台
-        print("发生未捕获的异常:")
+        log("发生未捕获的异常:", 'ERROR')
         traceback.print_exception(exc_type, exc_value, exc_traceback)
         # 显示错误对话框
         if hasattr(self, 'root') and self.root:
@@ -339,7 +463,7 @@ CPU使用率: {system_info['cpu_percent']}%
                         
                     print(f"已保存窗口标题到配置文件: {CONFIG_FILE}")
                 except Exception as e:
-                    print(f"保存窗口标题失败: {str(e)}")
+                    log(f"保存窗口标题失败: {str(e)}", 'ERROR')
                 
                 select_window.destroy()
                 self.window_capture.select_monitor_area()
@@ -348,8 +472,11 @@ CPU使用率: {system_info['cpu_percent']}%
 
     def start_monitor(self):
         """开始监控"""
-        if not self.window_capture.selected_window or not self.window_capture.crop_area:
-            messagebox.showwarning("警告", "请先选择监控窗口和区域")
+        if not self.frame_source.is_ready():
+            if self.frame_source.name == 'window':
+                messagebox.showwarning("警告", "请先选择监控窗口和区域")
+            else:
+                messagebox.showwarning("警告", f"帧来源不可用: {self.frame_source.name}")
             return
             
         if self.monitoring:
@@ -357,86 +484,261 @@ CPU使用率: {system_info['cpu_percent']}%
             
         self.monitoring = True
         
-        # 先清理内存再初始化OCR引擎
-        self.clean_memory()
-        
-        # 初始化OCR引擎
-        if not self.ocr_processor.initialize():
+        # OCR模型在后台加载，停止监控时会被释放，这里重新加载
+        if self.ocr_loader is not None and self.ocr_loader.is_alive():
+            print("OCR模型加载中，加载完成后自动开始监控...")
+        self.load_ocr_async(self._start_pipeline)
+    
+    def _start_pipeline(self):
+        """OCR模型加载结束后调用：创建监控目标并启动流水线"""
+        # 等待模型加载期间可能已经停止监控
+        if not self.monitoring:
+            return
+        if not self.ocr_ready:
+            log("OCR引擎初始化失败，无法开始监控", 'ERROR')
+            self.monitoring = False
+            return
+        # 上次停止时没有退出的OCR线程还在使用监控目标
+        if not self.pipeline.is_stopped():
+            print("上次的OCR线程尚未退出，请稍后再开始监控")
             self.monitoring = False
             return
         
         print("开始监控...")
         self.loop_counter = 0  # 重置计数器
-        self.monitor_loop()
+        self.cleanup_requested = False
+        self.build_targets()
+        for target in self.targets.values():
+            target.reset()
+        self.pipeline.frame_sources = {name: target.frame_source for name, target in self.targets.items()}
+        self.scan_scheduler.reset()
+        # 使用OCR进程池时每个子进程对应一个OCR线程
+        self.pipeline.ocr_threads = self.ocr_processor.worker_count
+        if len(self.targets) > 1:
+            print(f"同时监控 {len(self.targets)} 个目标: {', '.join(self.targets)}")
+        self.pipeline.start()
 
-    def monitor_loop(self):
-        """监控循环"""
-        if not self.monitoring:
-            return
+    def build_targets(self):
+        """根据当前设置创建所有监控目标"""
+        # 变化检测依赖OpenCV，开始监控时才导入
+        from monitor.monitor_target import MonitorTarget
+        
+        # 关闭上次创建的额外目标
+        for target in self.targets.values():
+            if target.frame_source is not self.frame_source:
+                target.frame_source.close()
+        
+        options = {
+            'change_sensitivity': MONITOR_SETTINGS.get('change_sensitivity', 12),
+            'change_detection_enabled': MONITOR_SETTINGS.get('change_detection_enabled', True),
+            'incremental_ocr_enabled': MONITOR_SETTINGS.get('incremental_ocr_enabled', True),
+        }
+        targets = {
+            PRIMARY_TARGET: MonitorTarget(PRIMARY_TARGET, self.frame_source, self.ocr_processor, RULES,
+                                          text_analyzer=self.text_analyzer, **options)
+        }
+        
+        # 额外的监控目标：{'name': 名称, 'window_title': 窗口标题, 'crop_area': [left, top, right, bottom]}
+        for index, config in enumerate(MONITOR_SETTINGS.get('extra_targets', [])):
+            name = config.get('name') or config.get('window_title') or f"目标{index + 2}"
+            window_capture = WindowCapture(check_capabilities=False)
+            window_capture.use_background_capture = self.window_capture.use_background_capture
+            hwnd = window_capture.find_window_by_title(config['window_title']) if config.get('window_title') else None
+            if not hwnd or not config.get('crop_area'):
+                print(f"未找到监控目标窗口或区域: {name}")
+                continue
+            window_capture.selected_window = hwnd
+            window_capture.crop_area = tuple(config['crop_area'])
+            targets[name] = MonitorTarget(name, WindowFrameSource(window_capture), self.ocr_processor, RULES,
+                                          text_analyzer=TextAnalyzer(RULES, self.create_alert_store(name)), **options)
+        
+        self.targets = targets
+
+    def create_ocr_processor(self):
+        """根据ocr_backend设置创建OCR处理器，subprocess模式下推理在独立进程中进行"""
+        return create_ocr_processor(MONITOR_SETTINGS, OCR_SETTINGS)
+
+    def get_preprocess_steps(self):
+        """从监控设置中读取OCR预处理的步骤开关"""
+        return get_preprocess_steps(MONITOR_SETTINGS)
+
+    def create_alert_store(self, name):
+        """创建监控目标的已提醒消息记录，每个目标保存到各自的文件"""
+        path = None
+        if MONITOR_SETTINGS.get('alert_history_persist', True):
+            suffix = '' if name == PRIMARY_TARGET else '_' + ''.join('_' if c in '\\/:*?"<>|' else c for c in name)
+            path = os.path.join(APP_DIR, f'alert_history{suffix}.json')
+        return AlertStore(
+            ttl=MONITOR_SETTINGS.get('alert_ttl_hours', 24) * 3600,
+            capacity=MONITOR_SETTINGS.get('alert_history_size', 1000),
+            path=path
+        )
+
+    def collect_metrics(self):
+        """读取性能指标时调用：收集丢帧数、缓存命中率和引擎重置次数"""
+        stats = self.ocr_processor.get_stats()
+        layout_total = stats['layout_hits'] + stats['layout_misses']
+        line_total = stats['line_hits'] + stats['line_misses']
+        return {
+            'frames_captured': self.pipeline.captured_frames,
+            'frames_dropped': self.pipeline.frame_slots.dropped,
+            'frames_processed': self.pipeline.processed_frames,
+            'layout_cache_hit_rate': stats['layout_hits'] / layout_total if layout_total else 0.0,
+            'line_cache_hit_rate': stats['line_hits'] / line_total if line_total else 0.0,
+            'engine_resets': stats['engine_resets'],
+            'scan_interval_seconds': self.scan_scheduler.current_interval(),
+            'alerts_dropped': self.alert_dispatcher.dropped,
+            'ui_startup_seconds': self.ui_startup_seconds or 0.0,
+            'ocr_load_seconds': self.ocr_load_seconds or 0.0,
+        }
+
+    def print_ocr_stats(self):
+        """打印OCR缓存的统计信息"""
+        stats = self.ocr_processor.get_stats()
+        if stats['layout_cache_enabled']:
+            total = stats['layout_hits'] + stats['layout_misses']
+            print(f"文本行布局缓存命中率: {stats['layout_hits'] / max(total, 1):.0%} ({stats['layout_hits']}/{total})")
+        if stats['line_cache_size'] > 0:
+            total = stats['line_hits'] + stats['line_misses']
+            print(f"识别结果缓存命中率: {stats['line_hits'] / max(total, 1):.0%} ({stats['line_hits']}/{total}), 已缓存 {stats['line_entries']} 行")
+        if stats['engine_resets']:
+            print(f"OCR引擎已重置 {stats['engine_resets']} 次")
+
+    def update_scan_scheduler(self):
+        """按当前设置更新扫描调度器"""
+        self.scan_scheduler.update_settings(
+            base_interval=MONITOR_SETTINGS['scan_interval'],
+            min_interval=MONITOR_SETTINGS.get('min_scan_interval', 0.3),
+            max_interval=MONITOR_SETTINGS.get('max_scan_interval', 2.0),
+            backoff=MONITOR_SETTINGS.get('scan_backoff', 1.5),
+            enabled=MONITOR_SETTINGS.get('adaptive_interval_enabled', True)
+        )
+
+    def should_process_frame(self, name, cropped_image):
+        """截图线程调用：画面没有变化时跳过OCR"""
+        target = self.targets[name]
+        with metrics.timer('change_detection'):
+            changed = target.should_process(cropped_image)
+        if not changed:
+            metrics.increment('frames_skipped')
+        # 关闭变化检测时每帧都会识别，不能作为活动的依据
+        if changed and target.change_detection_enabled:
+            self.scan_scheduler.record_activity()
+        return changed
+
+    def prepare_frames(self, frames):
+        """OCR线程按取帧顺序调用：定期维护，准备各目标需要识别的图像
+        
+        Args:
+            frames: {目标名称: 图像}
             
-        try:
-            # 计数器增加，定期清理一次内存
-            self.loop_counter += 1
-            if self.loop_counter >= self.memory_cleanup_interval:
-                # 检查内存占用
-                system_info = get_system_info()
-                if system_info and system_info['process_memory'] > MONITOR_SETTINGS.get('memory_threshold', 1800) * 1024 * 1024:
+        Returns:
+            (目标名称列表, [(图像, 是否只是新滚入的区域), ...])
+        """
+        # 计数器增加，定期清理一次内存
+        self.loop_counter += 1
+        if self.cleanup_requested or self.loop_counter >= self.memory_cleanup_interval:
+            # 检查内存占用
+            system_info = get_system_info()
+            memory_high = system_info and system_info['process_memory'] > MONITOR_SETTINGS.get('memory_threshold', 1800) * 1024 * 1024
+            if self.cleanup_requested or memory_high:
+                if memory_high:
                     print(f"程序内存占用较高: {format_bytes(system_info['process_memory'])}，正在自动清理...")
-                    self.clean_memory()
-                    # 重新初始化OCR引擎
-                    self.ocr_processor.initialize()
-                else:
-                    # 仅做一般垃圾回收
+                # 新引擎在后台创建，就绪后再替换，识别不会中断
+                self.ocr_processor.request_reset()
+                for _ in range(3):
                     gc.collect()
-                
-                self.loop_counter = 0
-                print("已自动清理内存")
-                
-            # 捕获并处理窗口图像
-            cropped_image = self.window_capture.get_cropped_image()
-            if cropped_image is None:
-                raise Exception("无法获取窗口图像")
-            
-            # 识别文字
-            text = self.ocr_processor.recognize_text(cropped_image)
+            else:
+                # 仅做一般垃圾回收
+                gc.collect()
             
-            # 释放图像资源
-            del cropped_image
-            
-            # 分析文本，检查是否有匹配项
-            if text:
-                message = self.text_analyzer.analyze_text(text)
-                if message:
-                    self.show_alert(message)
-                    self.text_analyzer.add_alerted_message(message)
+            self.loop_counter = 0
+            self.cleanup_requested = False
+            print("已自动清理内存")
+            for name, target in self.targets.items():
+                stats = target.get_stats()
+                if stats:
+                    print(f"[{name}] {stats}")
+            print(f"OCR来不及处理而丢弃的帧: {self.pipeline.frame_slots.dropped}")
+            print(f"当前扫描间隔: {self.scan_scheduler.current_interval():.2f}秒 ({self.scan_scheduler.get_rate():.2f}次/秒)")
+            self.print_ocr_stats()
+            for name, stats in self.alert_dispatcher.get_stats().items():
+                print(f"提醒[{name}]: {stats['count']} 次, 失败 {stats['failures']} 次, "
+                      f"平均延迟 {stats['avg_latency'] * 1000:.0f}ms, 最大延迟 {stats['max_latency'] * 1000:.0f}ms")
+        
+        # 增量模式下只识别新滚入的聊天行
+        names = list(frames)
+        return names, [self.targets[name].prepare(frames[name]) for name in names]
+
+    def process_frames(self, batch):
+        """OCR线程调用：各目标的图像合并为一次批量识别，使用OCR进程池时多个线程会并行调用"""
+        names, prepared = batch
+        images = [image for image, _ in prepared]
+        layout_keys = [self.targets[name].layout_key(request) for name, (_, request) in zip(names, prepared)]
+        with metrics.timer('ocr'):
+            texts = self.ocr_processor.recognize_batch(images, layout_keys)
+        return names, [request for _, request in prepared], texts
+
+    def discard_frames(self, names):
+        """OCR线程调用：这一批帧出错没有识别，之后相同的画面需要重新识别"""
+        for name in names:
+            target = self.targets.get(name)
+            if target is not None:
+                target.discard()
+
+    def finish_frames(self, processed):
+        """OCR线程按取帧顺序调用：把识别结果合并到各目标的行缓冲区
+        
+        Returns:
+            [(目标名称, 文本), ...]
+        """
+        names, requests, texts = processed
+        return [(name, self.targets[name].commit(text, request)) for name, request, text in zip(names, requests, texts)]
+
+    def poll_pipeline(self):
+        """GUI线程定期调用：分析识别结果"""
+        try:
+            alerts = []
+            for name, text in self.pipeline.poll_results():
+                # 分析文本，找出所有新的匹配项
+                target = self.targets.get(name)
+                if not text or not target or not self.monitoring:
+                    continue
+                with metrics.timer('analysis'):
+                    matches = target.text_analyzer.find_matches(text)
+                for message in matches:
+                    target.text_analyzer.add_alerted_message(message)
+                    alerts.append(message if name == PRIMARY_TARGET else f"[{name}] {message}")
             
+            # 同一批结果中的所有匹配合并为一次提醒
+            if alerts:
+                self.scan_scheduler.record_activity()
+                self.show_alert("\n".join(alerts))
         except Exception as e:
-            print(f"监控过程出错: {str(e)}")
-            
+            log(f"监控过程出错: {str(e)}", 'ERROR')
         finally:
-            # 确保资源释放
-            if 'cropped_image' in locals():
-                del cropped_image
-            
-            # 确保即使发生异常也会继续循环
-            if self.monitoring:
-                # 使用更长的间隔让系统有时间释放资源
-                self.root.after(int(MONITOR_SETTINGS['scan_interval'] * 1000), self.monitor_loop)
+            if hasattr(self, 'root') and self.root:
+                self.root.after(50, self.poll_pipeline)
 
     def show_alert(self, message):
         """显示警告"""
         print(f"触发提醒: {message}")
-        # 获取当前程序窗口句柄
-        hwnd = self.root.winfo_id()
-        # 显示置顶的消息框
-        ctypes.windll.user32.MessageBoxW(hwnd, message, "警告", 0x30 | 0x40000)  # MB_ICONWARNING | MB_SETFOREGROUND
+        # 交给提醒分发线程，立即返回
+        self.alert_dispatcher.dispatch(message)
 
     def stop_monitor(self):
         """停止监控"""
         self.monitoring = False
+        # 等待截图和OCR线程退出
+        stopped = self.pipeline.stop()
         print("监控已停止")
+        if not stopped:
+            # OCR线程还在识别，不能释放引擎，下次开始监控时继续使用
+            print("OCR线程尚未退出，暂不释放OCR资源")
+            return
         # 释放OCR资源
         self.ocr_processor.release()
+        self.ocr_ready = False
         # 主动清理内存
         self.clean_memory()
 
@@ -444,8 +746,18 @@ CPU使用率: {system_info['cpu_percent']}%
         """退出程序"""
         if messagebox.askokcancel("确认退出", "确定要退出程序吗？"):
             self.stop_monitor()
+            for target in self.targets.values():
+                if target.frame_source is not self.frame_source:
+                    target.frame_source.close()
+            self.frame_source.close()
+            self.alert_dispatcher.stop()
+            if self.metrics_server:
+                self.metrics_server.stop()
             # 恢复原始的stdout
+            logger = sys.stdout
             sys.stdout = self.original_stdout
+            if isinstance(logger, Logger):
+                logger.close()
             # 清理内存
             gc.collect()
             self.root.quit()
@@ -457,15 +769,39 @@ CPU使用率: {system_info['cpu_percent']}%
         self.root.wait_window(settings_dialog.window)
         # 更新捕获模式
         self.window_capture.use_background_capture = MONITOR_SETTINGS.get('use_background_capture', True)
-        # 更新日志最大行数
-        sys.stdout.max_lines = MONITOR_SETTINGS.get('max_log_lines', 500)
+        # 重新编译匹配规则，更新提醒记录有效期
+        analyzers = [self.text_analyzer] + [target.text_analyzer for target in self.targets.values()
+                                            if target.text_analyzer is not self.text_analyzer]
+        for analyzer in analyzers:
+            analyzer.update_rules(RULES)
+            analyzer.alerted_messages.ttl = MONITOR_SETTINGS.get('alert_ttl_hours', 24) * 3600
+        # 更新画面变化检测和增量识别设置
+        for target in self.targets.values():
+            target.change_detector.update_settings(sensitivity=MONITOR_SETTINGS.get('change_sensitivity', 12))
+            target.change_detection_enabled = MONITOR_SETTINGS.get('change_detection_enabled', True)
+        # 更新扫描间隔
+        self.update_scan_scheduler()
+        # 更新提醒方式
+        self.alert_dispatcher.set_sinks(create_alert_sinks(MONITOR_SETTINGS, APP_DIR))
+        # 更新日志最大行数和级别
+        sys.stdout.update_settings(
+            max_lines=MONITOR_SETTINGS.get('max_log_lines', 500),
+            level=MONITOR_SETTINGS.get('log_level', 'INFO')
+        )
         # 更新OCR处理器设置
         self.ocr_processor.update_settings(
             memory_threshold=MONITOR_SETTINGS.get('memory_threshold', 1800),
-            auto_reset_enabled=MONITOR_SETTINGS.get('auto_reset_enabled', True)
+            auto_reset_enabled=MONITOR_SETTINGS.get('auto_reset_enabled', True),
+            layout_cache_enabled=MONITOR_SETTINGS.get('layout_cache_enabled', True),
+            line_cache_size=MONITOR_SETTINGS.get('line_cache_size', 512),
+            preprocess_steps=self.get_preprocess_steps()
         )
         print(f"设置已更新，内存阈值: {MONITOR_SETTINGS.get('memory_threshold', 1800)}MB, 自动重置: {'开启' if MONITOR_SETTINGS.get('auto_reset_enabled', True) else '关闭'}")
 
+    def show_metrics(self):
+        """显示性能指标面板"""
+        MetricsDialog(self.root, metrics)
+
     def show_alert_history(self):
         """显示已识别记录对话框"""
         AlertHistoryDialog(self.root, self.text_analyzer)
@@ -539,10 +875,24 @@ CPU使用率: {system_info['cpu_percent']}%
         """打印配置信息"""
         print("当前配置:")
         print(f"  扫描间隔: {MONITOR_SETTINGS['scan_interval']}秒")
+        if MONITOR_SETTINGS.get('adaptive_interval_enabled', True):
+            print(f"  自适应扫描间隔: {MONITOR_SETTINGS.get('min_scan_interval', 0.3)}~{MONITOR_SETTINGS.get('max_scan_interval', 2.0)}秒")
         print(f"  置信度阈值: {MONITOR_SETTINGS['confidence_threshold']}")
         print(f"  内存清理间隔: 每{MONITOR_SETTINGS.get('memory_cleanup_interval', 30)}次扫描")
         print(f"  使用GPU: {'是' if OCR_SETTINGS.get('use_gpu', False) else '否'}")
         print(f"  使用MKL加速: {'是' if OCR_SETTINGS.get('enable_mkldnn', True) else '否'}")
+        print(f"  画面变化检测: {'开启' if MONITOR_SETTINGS.get('change_detection_enabled', True) else '关闭'} (灵敏度阈值: {MONITOR_SETTINGS.get('change_sensitivity', 12)})")
+        print(f"  增量识别: {'开启' if MONITOR_SETTINGS.get('incremental_ocr_enabled', True) else '关闭'}")
+        print(f"  文本行布局缓存: {'开启' if MONITOR_SETTINGS.get('layout_cache_enabled', True) else '关闭'}")
+        print(f"  识别结果缓存: {MONITOR_SETTINGS.get('line_cache_size', 512)} 行")
+        steps = [name for name, enabled in self.get_preprocess_steps().items() if enabled]
+        print(f"  图像预处理: {', '.join(steps) if steps else '关闭'}")
+        if MONITOR_SETTINGS.get('ocr_backend', 'inprocess') == 'subprocess':
+            print(f"  OCR运行方式: {MONITOR_SETTINGS.get('ocr_workers', 1)} 个独立进程")
+        else:
+            print("  OCR运行方式: 主进程")
+        if self.frame_source.name != 'window':
+            print(f"  帧来源: {self.frame_source.name} {MONITOR_SETTINGS.get('frame_source_path', '')}")
         print(f"  捕获模式: {'背景模式（无需窗口置顶）' if self.window_capture.use_background_capture else '前台模式（需要窗口置顶）'}")
         
         # 显示窗口置顶状态
@@ -557,5 +907,7 @@ CPU使用率: {system_info['cpu_percent']}%
         self.root.mainloop()
 
 if __name__ == "__main__":
+    # 打包后OCR子进程也从这里启动
+    multiprocessing.freeze_support()
     app = MonitorApp()
     app.run() 
\ No newline at end of file
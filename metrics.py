@@ -0,0 +1,227 @@
+"""
+性能指标模块，记录流水线各阶段的耗时分布和计数，可以通过本地HTTP接口导出
+"""
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils import log
+
+# 流水线各阶段，按执行顺序排列
+STAGES = ('capture', 'crop', 'change_detection', 'preprocess', 'detection', 'recognition', 'ocr', 'analysis', 'alert')
+
+class Histogram:
+    """耗时分布，只保留最近的样本计算分位数，累计次数和总耗时"""
+
+    def __init__(self, window=1024):
+        """初始化耗时分布
+
+        Args:
+            window: 计算分位数时使用的最近样本数
+        """
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        """记录一个样本"""
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def snapshot(self):
+        """获取统计结果，分位数单位为秒"""
+        samples = sorted(self.samples)
+        result = {'count': self.count, 'sum': self.total}
+        for name, quantile in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99)):
+            result[name] = samples[min(len(samples) - 1, int(quantile * len(samples)))] if samples else 0.0
+        return result
+
+
+class StageTimer:
+    """阶段计时器，用于with语句"""
+
+    __slots__ = ('metrics', 'stage', 'start')
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """性能指标记录，热路径上只做一次追加和两次加法，统计在读取时计算"""
+
+    def __init__(self, window=1024):
+        """初始化性能指标记录
+
+        Args:
+            window: 每个阶段计算分位数时使用的最近样本数
+        """
+        self.window = window
+        self.histograms = {}
+        self.counters = {}
+        self.collectors = []
+        self.lock = threading.Lock()
+        # 子进程中记录的样本暂存在这里，随识别结果一起交给主进程
+        self.forward = False
+        self.pending = []
+
+    def _histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.window))
+        return histogram
+
+    def observe(self, stage, seconds):
+        """记录一个阶段的耗时(秒)"""
+        self._histogram(stage).observe(seconds)
+        if self.forward:
+            self.pending.append((stage, seconds))
+
+    def timer(self, stage):
+        """返回阶段计时器，with语句结束时记录耗时"""
+        return StageTimer(self, stage)
+
+    def increment(self, name, amount=1):
+        """计数器加一"""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def reset(self):
+        """清空所有耗时和计数"""
+        with self.lock:
+            self.histograms = {}
+            self.counters = {}
+        self.pending = []
+
+    def take_pending(self):
+        """取出子进程中暂存的样本"""
+        pending, self.pending = self.pending, []
+        return pending
+
+    def merge(self, samples):
+        """记录子进程交来的样本"""
+        for stage, seconds in samples:
+            self._histogram(stage).observe(seconds)
+
+    def add_collector(self, collector):
+        """注册读取指标时调用的函数，函数返回{名称: 数值}，用于缓存命中率等状态值"""
+        self.collectors.append(collector)
+
+    def snapshot(self):
+        """获取所有指标
+
+        Returns:
+            {'stages': {阶段: {'count', 'sum', 'p50', 'p95', 'p99'}}, 'counters': {...}, 'gauges': {...}}
+        """
+        with self.lock:
+            histograms = dict(self.histograms)
+        stages = {stage: histograms[stage].snapshot() for stage in STAGES if stage in histograms}
+        stages.update({stage: histogram.snapshot() for stage, histogram in histograms.items() if stage not in stages})
+        gauges = {}
+        for collector in list(self.collectors):
+            try:
+                gauges.update(collector())
+            except Exception as e:
+                log(f"读取性能指标出错: {str(e)}", 'ERROR')
+        return {'stages': stages, 'counters': dict(self.counters), 'gauges': gauges}
+
+    def to_prometheus(self, snapshot=None, prefix='plate_monitor'):
+        """按Prometheus文本格式导出"""
+        snapshot = snapshot or self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds 流水线各阶段耗时",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for stage, stats in snapshot['stages'].items():
+            for name, quantile in (('p50', '0.5'), ('p95', '0.95'), ('p99', '0.99')):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[name]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        for name, value in snapshot['counters'].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in snapshot['gauges'].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {float(value):g}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """本地HTTP接口：/metrics返回Prometheus文本，/metrics.json返回JSON"""
+
+    def __init__(self, metrics, port, host='127.0.0.1'):
+        """初始化HTTP接口
+
+        Args:
+            metrics: Metrics实例
+            port: 监听端口
+            host: 监听地址，默认只允许本机访问
+        """
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """在后台线程中启动HTTP服务
+
+        Returns:
+            bool: 是否启动成功
+        """
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if path == '/metrics.json':
+                    body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json; charset=utf-8'
+                elif path == '/metrics':
+                    body = metrics.to_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # 不把每个请求写入日志
+                pass
+
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            log(f"性能指标接口启动失败: {str(e)}", 'ERROR')
+            return False
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        print(f"性能指标接口: http://{self.host}:{self.server.server_address[1]}/metrics")
+        return True
+
+    def stop(self):
+        """停止HTTP服务"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            self.thread = None
+
+
+# 全局的性能指标记录，各模块直接使用
+metrics = Metrics()
@@ -0,0 +1,354 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+import urllib.request
+from metrics import metrics
+from utils import log
+
+class AlertSink:
+    """提醒输出基类，由提醒分发线程调用"""
+
+    name = "base"
+    # 需要等待网络等外部响应的输出在单独的线程中发送，不拖慢其他输出
+    blocking = False
+
+    def send(self, alert):
+        """输出一条提醒
+
+        Args:
+            alert: {'message': 消息文本, 'time': 提醒时间, 'created': 创建时的单调时钟}
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """释放资源"""
+        pass
+
+
+class PopupSink(AlertSink):
+    """弹窗提醒，每个弹窗在单独的线程中显示，不阻塞分发线程和界面"""
+
+    name = "popup"
+
+    def __init__(self, title="警告", max_open=3):
+        """初始化弹窗提醒
+
+        Args:
+            title: 弹窗标题
+            max_open: 同时显示的弹窗上限，超出时只打印不弹窗
+        """
+        self.title = title
+        self.slots = threading.Semaphore(max_open)
+
+    def _show(self, message):
+        try:
+            import ctypes
+            # MB_ICONWARNING | MB_SETFOREGROUND | MB_TOPMOST
+            ctypes.windll.user32.MessageBoxW(0, message, self.title, 0x30 | 0x10000 | 0x40000)
+        except Exception as e:
+            log(f"弹窗提醒失败: {str(e)}", 'ERROR')
+        finally:
+            self.slots.release()
+
+    def send(self, alert):
+        if not self.slots.acquire(blocking=False):
+            log("弹窗过多，本次提醒未弹窗", 'WARNING')
+            return
+        threading.Thread(target=self._show, args=(alert['message'],), daemon=True).start()
+
+
+class SoundSink(AlertSink):
+    """声音提醒，可以指定wav文件，否则播放系统提示音"""
+
+    name = "sound"
+
+    def __init__(self, sound_file=None):
+        self.sound_file = sound_file
+
+    def send(self, alert):
+        try:
+            import winsound
+        except ImportError:
+            print("\a", end="")
+            return
+        if self.sound_file:
+            winsound.PlaySound(self.sound_file, winsound.SND_FILENAME | winsound.SND_ASYNC)
+        else:
+            winsound.MessageBeep(winsound.MB_ICONEXCLAMATION)
+
+
+class LogFileSink(AlertSink):
+    """提醒日志，每条提醒追加一行到文件"""
+
+    name = "log"
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alert):
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(alert['time']))
+        message = alert['message'].replace('\n', ' | ')
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f"{timestamp}\t{message}\n")
+
+
+class WebhookSink(AlertSink):
+    """Webhook提醒，以JSON格式POST到指定地址"""
+
+    name = "webhook"
+    blocking = True
+
+    def __init__(self, url, timeout=2.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        data = json.dumps({'message': alert['message'], 'time': alert['time']}, ensure_ascii=False).encode('utf-8')
+        request = urllib.request.Request(self.url, data=data, headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class UnixSocketSink(AlertSink):
+    """Unix套接字提醒，每条提醒发送一行JSON"""
+
+    name = "socket"
+    blocking = True
+
+    def __init__(self, path, timeout=2.0):
+        self.path = path
+        self.timeout = timeout
+
+    def send(self, alert):
+        data = json.dumps({'message': alert['message'], 'time': alert['time']}, ensure_ascii=False) + "\n"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.settimeout(self.timeout)
+            connection.connect(self.path)
+            connection.sendall(data.encode('utf-8'))
+
+
+def create_alert_sinks(settings, app_dir):
+    """根据监控设置创建提醒输出
+
+    Args:
+        settings: 监控设置字典，读取alert_sinks等配置
+        app_dir: 程序所在目录，提醒日志默认保存在这里
+
+    Returns:
+        AlertSink实例列表
+    """
+    sinks = []
+    for name in settings.get('alert_sinks', ['popup']):
+        if name == 'popup':
+            sinks.append(PopupSink())
+        elif name == 'sound':
+            sinks.append(SoundSink(settings.get('alert_sound_file') or None))
+        elif name == 'log':
+            sinks.append(LogFileSink(settings.get('alert_log_file') or os.path.join(app_dir, 'alerts.log')))
+        elif name == 'webhook':
+            if settings.get('alert_webhook_url'):
+                sinks.append(WebhookSink(settings['alert_webhook_url']))
+            else:
+                log("未设置alert_webhook_url，已忽略webhook提醒", 'WARNING')
+        elif name == 'socket':
+            if not hasattr(socket, 'AF_UNIX'):
+                log("当前系统不支持Unix套接字，已忽略socket提醒", 'WARNING')
+            elif settings.get('alert_socket_path'):
+                sinks.append(UnixSocketSink(settings['alert_socket_path']))
+            else:
+                log("未设置alert_socket_path，已忽略socket提醒", 'WARNING')
+        else:
+            log(f"未知的提醒方式: {name}", 'WARNING')
+    return sinks
+
+
+def put_sentinel(alert_queue):
+    """放入结束标记，不阻塞，队列已满时丢弃最旧的提醒"""
+    while True:
+        try:
+            alert_queue.put_nowait(None)
+            return
+        except queue.Full:
+            try:
+                alert_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+
+class SinkWorker:
+    """单个阻塞输出的发送线程，有自己的队列，慢的输出只会让自己的提醒排队"""
+
+    def __init__(self, sink, deliver, queue_size=100):
+        """初始化发送线程
+
+        Args:
+            sink: AlertSink实例
+            deliver: 发送并记录统计的函数(sink, alert)
+            queue_size: 队列容量，队列满时丢弃新的提醒
+        """
+        self.sink = sink
+        self.deliver = deliver
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._loop, name=f"alert-{sink.name}", daemon=True)
+        self.thread.start()
+
+    def put(self, alert):
+        """提交一条提醒，立即返回"""
+        try:
+            self.queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+            log(f"提醒输出[{self.sink.name}]队列已满，丢弃提醒: {alert['message']}", 'WARNING')
+
+    def stop(self, timeout=None):
+        """通知线程退出，timeout不为None时等待"""
+        put_sentinel(self.queue)
+        if timeout is not None:
+            self.thread.join(timeout)
+
+    def _loop(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                break
+            self.deliver(self.sink, alert)
+
+
+class AlertDispatcher:
+    """提醒分发器，提醒先放入队列，由后台线程交给各个输出，并统计每个输出的延迟
+
+    本地输出在分发线程中依次调用，网络等阻塞输出在各自的线程中发送
+    """
+
+    def __init__(self, sinks, queue_size=100):
+        """初始化提醒分发器
+
+        Args:
+            sinks: AlertSink实例列表
+            queue_size: 队列容量，队列满时丢弃新的提醒
+        """
+        self.sinks = list(sinks)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.thread = None
+        # 阻塞输出各自的发送线程
+        self.workers = {}
+
+        self.dropped = 0
+        self.stats = {}
+
+    def start(self):
+        """启动分发线程"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self._dispatch_loop, name="alert-dispatcher", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        """停止分发线程和各输出的发送线程，关闭所有输出，不会因为队列已满而卡住"""
+        if self.thread is not None:
+            put_sentinel(self.queue)
+            self.thread.join(timeout)
+            self.thread = None
+        with self.lock:
+            workers, self.workers = list(self.workers.values()), {}
+            sinks = list(self.sinks)
+        for worker in workers:
+            worker.stop()
+        deadline = time.monotonic() + timeout
+        for worker in workers:
+            worker.thread.join(max(0.0, deadline - time.monotonic()))
+        for sink in sinks:
+            sink.close()
+
+    def set_sinks(self, sinks):
+        """替换提醒输出"""
+        with self.lock:
+            old_sinks = self.sinks
+            self.sinks = list(sinks)
+            old_workers = [self.workers.pop(sink) for sink in old_sinks if sink in self.workers]
+        for worker in old_workers:
+            worker.stop()
+        for sink in old_sinks:
+            sink.close()
+
+    def dispatch(self, message):
+        """提交一条提醒，立即返回
+
+        Returns:
+            bool: 是否成功放入队列
+        """
+        alert = {'message': message, 'time': time.time(), 'created': time.perf_counter()}
+        try:
+            self.queue.put_nowait(alert)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            log(f"提醒队列已满，丢弃提醒: {message}", 'WARNING')
+            return False
+
+    def _worker(self, sink):
+        """阻塞输出的发送线程，第一次使用时创建"""
+        with self.lock:
+            worker = self.workers.get(sink)
+            if worker is None:
+                worker = self.workers[sink] = SinkWorker(sink, self._deliver, self.queue_size)
+            return worker
+
+    def _deliver(self, sink, alert):
+        """交给一个输出并记录统计"""
+        failed = False
+        try:
+            sink.send(alert)
+        except Exception as e:
+            failed = True
+            log(f"提醒输出[{sink.name}]失败: {str(e)}", 'ERROR')
+        # 延迟从提醒创建时开始计算，包括在队列中等待的时间
+        self._record(sink.name, time.perf_counter() - alert['created'], failed)
+
+    def _record(self, name, latency, failed):
+        stats = self.stats.setdefault(name, {'count': 0, 'failures': 0, 'total_latency': 0.0, 'max_latency': 0.0})
+        if failed:
+            stats['failures'] += 1
+            return
+        stats['count'] += 1
+        stats['total_latency'] += latency
+        stats['max_latency'] = max(stats['max_latency'], latency)
+
+    def _dispatch_loop(self):
+        while True:
+            alert = self.queue.get()
+            if alert is None:
+                break
+            with self.lock:
+                sinks = list(self.sinks)
+            # 阻塞输出交给各自的线程，弹窗和声音等本地输出不用等待网络
+            for sink in sinks:
+                if sink.blocking:
+                    self._worker(sink).put(alert)
+            for sink in sinks:
+                if not sink.blocking:
+                    self._deliver(sink, alert)
+            metrics.observe('alert', time.perf_counter() - alert['created'])
+
+    def get_stats(self):
+        """获取每个输出的统计信息
+
+        Returns:
+            {输出名称: {'count', 'failures', 'avg_latency', 'max_latency'}}，延迟单位为秒
+        """
+        result = {}
+        for name, stats in list(self.stats.items()):
+            count = stats['count']
+            result[name] = {
+                'count': count,
+                'failures': stats['failures'],
+                'avg_latency': stats['total_latency'] / count if count else 0.0,
+                'max_latency': stats['max_latency'],
+            }
+        return result
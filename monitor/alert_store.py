@@ -0,0 +1,123 @@
+import json
+import os
+import time
+import unicodedata
+from collections import OrderedDict
+from utils import log
+
+class AlertStore:
+    """已提醒消息记录，超过有效期的记录自动过期，超出容量时淘汰最早的记录，可选保存到文件"""
+
+    def __init__(self, ttl=24 * 3600, capacity=1000, path=None):
+        """初始化已提醒消息记录
+
+        Args:
+            ttl: 记录的有效期(秒)，过期后同样的消息会再次提醒，为0时永不过期
+            capacity: 最多保留的记录数
+            path: 保存记录的JSON文件路径，为None时只保存在内存中
+        """
+        self.ttl = ttl
+        self.capacity = capacity
+        self.path = path
+        # 规范化后的消息 -> (原始消息, 提醒时间)，按提醒时间先后排列
+        self.entries = OrderedDict()
+        if path:
+            self.load()
+
+    @staticmethod
+    def normalize(message):
+        """规范化消息：统一全角半角并合并空白"""
+        return " ".join(unicodedata.normalize('NFKC', message).split())
+
+    def _expired(self, timestamp, now):
+        return self.ttl > 0 and now - timestamp > self.ttl
+
+    def _purge(self, now=None):
+        """删除过期和超出容量的记录，记录按时间排列，只需检查最前面的"""
+        now = time.time() if now is None else now
+        while self.entries:
+            _, timestamp = next(iter(self.entries.values()))
+            if not self._expired(timestamp, now) and len(self.entries) <= self.capacity:
+                break
+            self.entries.popitem(last=False)
+
+    def __contains__(self, message):
+        entry = self.entries.get(self.normalize(message))
+        if entry is None:
+            return False
+        if self._expired(entry[1], time.time()):
+            del self.entries[self.normalize(message)]
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, message, timestamp=None, save=True):
+        """添加一条已提醒的消息
+
+        Args:
+            message: 消息文本
+            timestamp: 提醒时间，为None时使用当前时间
+            save: 是否立即保存到文件
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        key = self.normalize(message)
+        self.entries[key] = (message, timestamp)
+        self.entries.move_to_end(key)
+        self._purge()
+        if save:
+            self.save()
+
+    def replace(self, messages):
+        """用新的消息列表替换全部记录，保留已有记录的提醒时间"""
+        now = time.time()
+        old_entries = self.entries
+        self.entries = OrderedDict()
+        for message in messages:
+            previous = old_entries.get(self.normalize(message))
+            self.add(message, previous[1] if previous else now, save=False)
+        # 保留的旧记录可能比新加的早，重新按时间排序
+        self.entries = OrderedDict(sorted(self.entries.items(), key=lambda item: item[1][1]))
+        self.save()
+
+    def clear(self):
+        """清空全部记录"""
+        self.entries.clear()
+        self.save()
+
+    def items(self):
+        """获取未过期的记录[(消息, 提醒时间), ...]，按提醒时间先后排列"""
+        self._purge()
+        return list(self.entries.values())
+
+    def messages(self):
+        """获取未过期的消息列表，按提醒时间先后排列"""
+        return [message for message, _ in self.items()]
+
+    def load(self):
+        """从文件加载记录"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            self.entries.clear()
+            for message, timestamp in sorted(records, key=lambda record: record[1]):
+                self.entries[self.normalize(message)] = (message, timestamp)
+            self._purge()
+            print(f"已加载 {len(self.entries)} 条提醒记录")
+        except Exception as e:
+            log(f"加载提醒记录失败: {str(e)}", 'ERROR')
+
+    def save(self):
+        """保存记录到文件，先写临时文件再替换，避免写到一半时文件损坏"""
+        if not self.path:
+            return
+        try:
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump([list(entry) for entry in self.entries.values()], f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            log(f"保存提醒记录失败: {str(e)}", 'ERROR')
@@ -0,0 +1,390 @@
+import ctypes
+import threading
+from ctypes import wintypes
+import numpy as np
+from utils import log
+
+# 使用独立的DLL实例，设置参数类型不会影响其他模块对user32/gdi32的调用
+_user32 = ctypes.WinDLL('user32', use_last_error=True)
+_gdi32 = ctypes.WinDLL('gdi32', use_last_error=True)
+
+PW_RENDERFULLCONTENT = 2
+BI_RGB = 0
+DIB_RGB_COLORS = 0
+SRCCOPY = 0x00CC0020
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ('biSize', wintypes.DWORD),
+        ('biWidth', wintypes.LONG),
+        ('biHeight', wintypes.LONG),
+        ('biPlanes', wintypes.WORD),
+        ('biBitCount', wintypes.WORD),
+        ('biCompression', wintypes.DWORD),
+        ('biSizeImage', wintypes.DWORD),
+        ('biXPelsPerMeter', wintypes.LONG),
+        ('biYPelsPerMeter', wintypes.LONG),
+        ('biClrUsed', wintypes.DWORD),
+        ('biClrImportant', wintypes.DWORD),
+    ]
+
+class BITMAPINFO(ctypes.Structure):
+    _fields_ = [
+        ('bmiHeader', BITMAPINFOHEADER),
+        ('bmiColors', wintypes.DWORD * 3),
+    ]
+
+_user32.GetWindowRect.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.RECT)]
+_user32.GetWindowRect.restype = wintypes.BOOL
+_user32.PrintWindow.argtypes = [wintypes.HWND, wintypes.HDC, wintypes.UINT]
+_user32.PrintWindow.restype = wintypes.BOOL
+_user32.IsWindow.argtypes = [wintypes.HWND]
+_user32.IsWindow.restype = wintypes.BOOL
+_user32.GetDesktopWindow.argtypes = []
+_user32.GetDesktopWindow.restype = wintypes.HWND
+_user32.GetWindowDC.argtypes = [wintypes.HWND]
+_user32.GetWindowDC.restype = wintypes.HDC
+_user32.ReleaseDC.argtypes = [wintypes.HWND, wintypes.HDC]
+_user32.ReleaseDC.restype = ctypes.c_int
+
+_gdi32.CreateCompatibleDC.argtypes = [wintypes.HDC]
+_gdi32.CreateCompatibleDC.restype = wintypes.HDC
+_gdi32.CreateDIBSection.argtypes = [wintypes.HDC, ctypes.POINTER(BITMAPINFO), wintypes.UINT,
+                                    ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.DWORD]
+_gdi32.CreateDIBSection.restype = wintypes.HBITMAP
+_gdi32.SelectObject.argtypes = [wintypes.HDC, wintypes.HGDIOBJ]
+_gdi32.SelectObject.restype = wintypes.HGDIOBJ
+_gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+_gdi32.DeleteObject.restype = wintypes.BOOL
+_gdi32.DeleteDC.argtypes = [wintypes.HDC]
+_gdi32.DeleteDC.restype = wintypes.BOOL
+_gdi32.GdiFlush.argtypes = []
+_gdi32.GdiFlush.restype = wintypes.BOOL
+_gdi32.SetViewportOrgEx.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.POINTER(wintypes.POINT)]
+_gdi32.SetViewportOrgEx.restype = wintypes.BOOL
+_gdi32.BitBlt.argtypes = [wintypes.HDC, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+                          wintypes.HDC, ctypes.c_int, ctypes.c_int, wintypes.DWORD]
+_gdi32.BitBlt.restype = wintypes.BOOL
+
+# DWM缩略图API定义
+try:
+    DWMAPI = ctypes.WinDLL('dwmapi')
+    THUMBNAILID = ctypes.c_ulonglong
+
+    class DWM_THUMBNAIL_PROPERTIES(ctypes.Structure):
+        _fields_ = [
+            ('dwFlags', wintypes.DWORD),
+            ('rcDestination', wintypes.RECT),
+            ('rcSource', wintypes.RECT),
+            ('opacity', ctypes.c_byte),
+            ('fVisible', wintypes.BOOL),
+            ('fSourceClientAreaOnly', wintypes.BOOL),
+        ]
+
+    DWMAPI.DwmRegisterThumbnail.restype = ctypes.HRESULT
+    DWMAPI.DwmRegisterThumbnail.argtypes = [wintypes.HWND, wintypes.HWND, ctypes.POINTER(THUMBNAILID)]
+    DWMAPI.DwmUpdateThumbnailProperties.restype = ctypes.HRESULT
+    DWMAPI.DwmUpdateThumbnailProperties.argtypes = [THUMBNAILID, ctypes.POINTER(DWM_THUMBNAIL_PROPERTIES)]
+    DWMAPI.DwmUnregisterThumbnail.restype = ctypes.HRESULT
+    DWMAPI.DwmUnregisterThumbnail.argtypes = [THUMBNAILID]
+    DWMAPI.DwmFlush.restype = ctypes.HRESULT
+    DWMAPI.DwmFlush.argtypes = []
+
+    DWM_TNP_RECTDESTINATION = 0x1
+    DWM_TNP_RECTSOURCE = 0x2
+    DWM_TNP_VISIBLE = 0x8
+
+    HAS_DWM_SUPPORT = True
+except Exception:
+    HAS_DWM_SUPPORT = False
+
+
+def get_window_size(hwnd):
+    """获取窗口尺寸
+
+    Returns:
+        (宽度, 高度)，获取失败时返回None
+    """
+    rect = wintypes.RECT()
+    if not _user32.GetWindowRect(hwnd, ctypes.byref(rect)):
+        return None
+    return rect.right - rect.left, rect.bottom - rect.top
+
+
+def clamp_region(region, width, height):
+    """把区域限制在窗口范围内
+
+    Args:
+        region: (left, top, right, bottom)，为None时表示整个窗口
+        width: 窗口宽度
+        height: 窗口高度
+
+    Returns:
+        限制后的区域，区域为空时返回None
+    """
+    if region is None:
+        return 0, 0, width, height
+    left, top, right, bottom = region
+    left, top = max(0, int(left)), max(0, int(top))
+    right, bottom = min(width, int(right)), min(height, int(bottom))
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right, bottom
+
+
+def frames_match(frame, reference, tolerance=0.01):
+    """比较两帧BGRX图像，不同的像素不超过tolerance比例时认为一致(两次截图之间内容可能有少量变化)"""
+    if frame.shape != reference.shape:
+        return False
+    different = np.count_nonzero(np.any(frame[:, :, :3] != reference[:, :, :3], axis=2))
+    return different <= frame.shape[0] * frame.shape[1] * tolerance
+
+
+class DIBBuffer:
+    """内存DC和32位自顶向下DIB位图，像素数据以numpy视图的形式暴露，无需拷贝"""
+
+    def __init__(self, width, height):
+        """创建内存DC和DIB位图
+
+        Args:
+            width: 位图宽度
+            height: 位图高度
+        """
+        self.width = width
+        self.height = height
+        self.mem_dc = None
+        self.bitmap = None
+        self.old_bitmap = None
+        self.array = None
+
+        self.mem_dc = _gdi32.CreateCompatibleDC(None)
+        if not self.mem_dc:
+            raise ctypes.WinError(ctypes.get_last_error())
+
+        info = BITMAPINFO()
+        info.bmiHeader.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        info.bmiHeader.biWidth = width
+        info.bmiHeader.biHeight = -height  # 负数表示自顶向下，行顺序与numpy一致
+        info.bmiHeader.biPlanes = 1
+        info.bmiHeader.biBitCount = 32
+        info.bmiHeader.biCompression = BI_RGB
+
+        bits = ctypes.c_void_p()
+        self.bitmap = _gdi32.CreateDIBSection(self.mem_dc, ctypes.byref(info), DIB_RGB_COLORS,
+                                              ctypes.byref(bits), None, 0)
+        if not self.bitmap or not bits.value:
+            error = ctypes.WinError(ctypes.get_last_error())
+            self.release()
+            raise error
+        self.old_bitmap = _gdi32.SelectObject(self.mem_dc, self.bitmap)
+
+        # 直接映射DIB的像素内存，形状为(高度, 宽度, 4)，通道顺序为BGRX
+        raw = (ctypes.c_ubyte * (width * height * 4)).from_address(bits.value)
+        self.array = np.ctypeslib.as_array(raw).reshape(height, width, 4)
+
+    def release(self):
+        """释放DC和位图"""
+        self.array = None
+        if self.mem_dc and self.old_bitmap:
+            _gdi32.SelectObject(self.mem_dc, self.old_bitmap)
+        if self.bitmap:
+            _gdi32.DeleteObject(self.bitmap)
+        if self.mem_dc:
+            _gdi32.DeleteDC(self.mem_dc)
+        self.mem_dc = None
+        self.bitmap = None
+        self.old_bitmap = None
+
+
+class PrintWindowSession:
+    """PrintWindow捕获会话，捕获尺寸不变时复用DC和位图，只在窗口或区域大小变化时重新分配"""
+
+    def __init__(self, flags=PW_RENDERFULLCONTENT):
+        """初始化捕获会话
+
+        Args:
+            flags: PrintWindow标志，默认PW_RENDERFULLCONTENT，被遮挡的窗口也能捕获
+        """
+        self.flags = flags
+        self.dib = None
+        # 整窗口位图，用于检查区域捕获结果和不支持视口偏移的窗口
+        self.full_dib = None
+        # 每个窗口是否按视口偏移绘制，None表示尚未检查
+        self.offset_support = {}
+        self.lock = threading.Lock()
+        self.reallocations = 0
+
+    def _ensure_buffer(self, dib, width, height):
+        """确保位图尺寸与捕获区域一致，返回可用的位图"""
+        if dib is not None and dib.width == width and dib.height == height:
+            return dib
+        if dib is not None:
+            dib.release()
+        self.reallocations += 1
+        return DIBBuffer(width, height)
+
+    def _print(self, dib, hwnd, left=0, top=0):
+        """把窗口绘制到位图中，(left, top)对应位图左上角"""
+        _gdi32.SetViewportOrgEx(dib.mem_dc, -left, -top, None)
+        if not _user32.PrintWindow(hwnd, dib.mem_dc, self.flags):
+            return False
+        # 确保GDI已经把像素写入DIB内存
+        _gdi32.GdiFlush()
+        return True
+
+    def _capture_full(self, hwnd, size):
+        """捕获整个窗口，返回整窗口位图的数组，失败时返回None"""
+        self.full_dib = self._ensure_buffer(self.full_dib, *size)
+        return self.full_dib.array if self._print(self.full_dib, hwnd) else None
+
+    def capture(self, hwnd, region=None):
+        """捕获窗口内容
+
+        位图只分配区域大小，通过视口原点偏移让PrintWindow把区域绘制到位图左上角，
+        每帧传输的数据量与区域大小成正比。
+        并不是所有窗口都按视口偏移绘制，每个窗口第一次捕获区域时和整窗口截图中的同一区域比较一次，
+        不一致时这个窗口改为捕获整个窗口后切出区域。
+        返回的数组直接映射会话内部的位图，下一次捕获时会被覆盖，
+        需要保留时请先拷贝或裁剪转换
+
+        Args:
+            hwnd: 窗口句柄
+            region: 窗口坐标系中的区域(left, top, right, bottom)，为None时捕获整个窗口
+
+        Returns:
+            形状为(区域高度, 区域宽度, 4)的BGRX numpy数组，失败时返回None
+        """
+        size = get_window_size(hwnd)
+        if size is None or size[0] <= 0 or size[1] <= 0:
+            return None
+        region = clamp_region(region, *size)
+        if region is None:
+            return None
+        left, top, right, bottom = region
+
+        with self.lock:
+            supported = self.offset_support.get(hwnd)
+            if supported is False:
+                full = self._capture_full(hwnd, size)
+                return None if full is None else full[top:bottom, left:right]
+
+            self.dib = self._ensure_buffer(self.dib, right - left, bottom - top)
+            if not self._print(self.dib, hwnd, left, top):
+                return None
+            if supported is None and (left, top) != (0, 0):
+                full = self._capture_full(hwnd, size)
+                if full is not None:
+                    supported = frames_match(self.dib.array, full[top:bottom, left:right])
+                    self.offset_support[hwnd] = supported
+                    if not supported:
+                        print("窗口不支持区域捕获，改为捕获整个窗口后切出区域")
+                        return full[top:bottom, left:right]
+            return self.dib.array
+
+    def release(self):
+        """释放会话持有的GDI资源"""
+        with self.lock:
+            for dib in (self.dib, self.full_dib):
+                if dib is not None:
+                    dib.release()
+            self.dib = None
+            self.full_dib = None
+            self.offset_support = {}
+
+
+class DwmThumbnailSession:
+    """DWM缩略图捕获会话，桌面DC和位图在多帧之间复用
+
+    缩略图画在桌面上，会挡住屏幕左上角的内容，所以只在每次捕获时注册，读取后立即取消注册。
+    注册后用DwmFlush等待下一次合成完成，不再固定等待
+    """
+
+    def __init__(self):
+        """初始化捕获会话"""
+        self.dest_hwnd = None
+        self.dest_dc = None
+        self.dib = None
+        self.lock = threading.Lock()
+        self.registrations = 0
+
+    def _show_thumbnail(self, hwnd, region):
+        """为窗口注册缩略图，把区域显示在桌面左上角
+
+        Returns:
+            缩略图ID，失败时返回None
+        """
+        thumbnail_id = THUMBNAILID(0)
+        ret = DWMAPI.DwmRegisterThumbnail(self.dest_hwnd, hwnd, ctypes.byref(thumbnail_id))
+        if ret != 0:
+            log(f"DWM注册缩略图失败: {ret}", 'ERROR')
+            return None
+        self.registrations += 1
+
+        left, top, right, bottom = region
+        props = DWM_THUMBNAIL_PROPERTIES()
+        props.dwFlags = DWM_TNP_VISIBLE | DWM_TNP_RECTDESTINATION | DWM_TNP_RECTSOURCE
+        props.fVisible = True
+        props.rcSource = wintypes.RECT(left, top, right, bottom)
+        props.rcDestination = wintypes.RECT(0, 0, right - left, bottom - top)
+        ret = DWMAPI.DwmUpdateThumbnailProperties(thumbnail_id, ctypes.byref(props))
+        if ret != 0:
+            log(f"DWM更新缩略图属性失败: {ret}", 'ERROR')
+            DWMAPI.DwmUnregisterThumbnail(thumbnail_id)
+            return None
+        return thumbnail_id
+
+    def capture(self, hwnd, region=None):
+        """捕获窗口内容
+
+        返回的数组直接映射会话内部的位图，下一次捕获时会被覆盖
+
+        Args:
+            hwnd: 窗口句柄
+            region: 窗口坐标系中的区域(left, top, right, bottom)，为None时捕获整个窗口
+
+        Returns:
+            形状为(区域高度, 区域宽度, 4)的BGRX numpy数组，失败时返回None
+        """
+        if not HAS_DWM_SUPPORT:
+            return None
+        size = get_window_size(hwnd)
+        if size is None or size[0] <= 0 or size[1] <= 0:
+            return None
+        region = clamp_region(region, *size)
+        if region is None:
+            return None
+
+        with self.lock:
+            if self.dest_hwnd is None:
+                self.dest_hwnd = _user32.GetDesktopWindow()
+                self.dest_dc = _user32.GetWindowDC(self.dest_hwnd)
+
+            width, height = region[2] - region[0], region[3] - region[1]
+            if self.dib is None or self.dib.width != width or self.dib.height != height:
+                if self.dib is not None:
+                    self.dib.release()
+                self.dib = DIBBuffer(width, height)
+
+            thumbnail_id = self._show_thumbnail(hwnd, region)
+            if thumbnail_id is None:
+                return None
+            try:
+                # 等待DWM完成一次合成，缩略图即可读取
+                DWMAPI.DwmFlush()
+                if not _gdi32.BitBlt(self.dib.mem_dc, 0, 0, width, height, self.dest_dc, 0, 0, SRCCOPY):
+                    return None
+                _gdi32.GdiFlush()
+            finally:
+                DWMAPI.DwmUnregisterThumbnail(thumbnail_id)
+            return self.dib.array
+
+    def release(self):
+        """释放GDI资源"""
+        with self.lock:
+            if self.dib is not None:
+                self.dib.release()
+                self.dib = None
+            if self.dest_dc:
+                _user32.ReleaseDC(self.dest_hwnd, self.dest_dc)
+            self.dest_dc = None
+            self.dest_hwnd = None
@@ -0,0 +1,92 @@
+import numpy as np
+
+def is_blank_frame(frame, tolerance=2, step=4):
+    """判断捕获结果是否为空白帧（全黑），PrintWindow失败时常返回这样的图像
+
+    Args:
+        frame: 形状为(高度, 宽度, 4)的BGRX数组
+        tolerance: 最大灰度值不超过该值视为全黑
+        step: 采样步长，隔行隔列采样以减少计算量
+
+    Returns:
+        bool: 是否为空白帧
+    """
+    if frame is None or frame.size == 0:
+        return True
+    sample = frame[::step, ::step, :3]
+    return int(sample.max()) <= tolerance
+
+
+class CaptureStrategyCache:
+    """捕获策略缓存，按窗口类名和句柄记录上次成功的捕获方法及其耗时"""
+
+    def __init__(self, methods, reprobe_interval=200, latency_smoothing=0.2):
+        """初始化策略缓存
+
+        Args:
+            methods: 按默认优先级排列的捕获方法名列表
+            reprobe_interval: 每隔多少帧按默认优先级重新探测一次
+            latency_smoothing: 耗时指数平均的平滑系数
+        """
+        self.methods = list(methods)
+        self.reprobe_interval = reprobe_interval
+        self.latency_smoothing = latency_smoothing
+        self.entries = {}
+
+    def _entry(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = {'method': None, 'frames': 0, 'latency': {}, 'failures': {}}
+            self.entries[key] = entry
+        return entry
+
+    def order(self, key):
+        """返回本帧应尝试的捕获方法顺序
+
+        Args:
+            key: (窗口类名, 窗口句柄)
+
+        Returns:
+            捕获方法名列表，缓存的方法排在最前，定期按默认优先级重新探测
+        """
+        entry = self._entry(key)
+        entry['frames'] += 1
+        winner = entry['method']
+        if winner is None or entry['frames'] % self.reprobe_interval == 0:
+            return list(self.methods)
+        return [winner] + [method for method in self.methods if method != winner]
+
+    def record_success(self, key, method, latency):
+        """记录成功的捕获
+
+        Returns:
+            bool: 缓存的方法是否发生了变化
+        """
+        entry = self._entry(key)
+        previous = entry['latency'].get(method)
+        if previous is None:
+            entry['latency'][method] = latency
+        else:
+            entry['latency'][method] = previous + (latency - previous) * self.latency_smoothing
+        entry['failures'][method] = 0
+        changed = entry['method'] != method
+        entry['method'] = method
+        return changed
+
+    def record_failure(self, key, method):
+        """记录失败的捕获（返回None或空白帧）"""
+        entry = self._entry(key)
+        entry['failures'][method] = entry['failures'].get(method, 0) + 1
+        if entry['method'] == method:
+            entry['method'] = None
+
+    def get_strategy(self, key):
+        """获取缓存的捕获方法和平均耗时(秒)"""
+        entry = self.entries.get(key)
+        if entry is None or entry['method'] is None:
+            return None, None
+        return entry['method'], entry['latency'].get(entry['method'])
+
+    def forget(self, key):
+        """删除窗口的缓存"""
+        self.entries.pop(key, None)
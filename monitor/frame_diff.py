@@ -0,0 +1,89 @@
+import numpy as np
+import cv2
+
+class FrameChangeDetector:
+    """画面变化检测类，监控区域没有变化时跳过OCR"""
+
+    def __init__(self, sensitivity=12, min_changed_pixels=3, sample_width=160):
+        """初始化画面变化检测器
+
+        Args:
+            sensitivity: 像素灰度差阈值，超过该值的像素视为发生变化，越小越灵敏
+            min_changed_pixels: 至少有多少个像素变化才认为画面发生了变化
+            sample_width: 比较前将灰度图缩小到的宽度，越小越快
+        """
+        self.sensitivity = sensitivity
+        self.min_changed_pixels = min_changed_pixels
+        self.sample_width = sample_width
+
+        self.last_sample = None
+        self.checked_frames = 0
+        self.skipped_frames = 0
+
+    def update_settings(self, sensitivity=None, min_changed_pixels=None):
+        """更新检测参数
+
+        Args:
+            sensitivity: 像素灰度差阈值
+            min_changed_pixels: 最少变化像素数
+        """
+        if sensitivity is not None:
+            self.sensitivity = sensitivity
+        if min_changed_pixels is not None:
+            self.min_changed_pixels = min_changed_pixels
+        # 参数变化后重新比较
+        self.last_sample = None
+
+    def discard(self):
+        """丢弃参照帧但保留统计，用于参照帧没有被成功识别的情况，下一帧必定视为变化"""
+        self.last_sample = None
+
+    def reset(self):
+        """清空上一帧，下一帧必定视为变化"""
+        self.last_sample = None
+        self.checked_frames = 0
+        self.skipped_frames = 0
+
+    def _sample(self, image):
+        """将图像转换为缩小后的灰度图
+
+        Args:
+            image: PIL图像对象
+
+        Returns:
+            缩小后的灰度numpy数组
+        """
+        gray = np.asarray(image.convert('L'))
+        height, width = gray.shape
+        if width > self.sample_width:
+            new_height = max(1, int(height * self.sample_width / width))
+            gray = cv2.resize(gray, (self.sample_width, new_height), interpolation=cv2.INTER_AREA)
+        return gray
+
+    def has_changed(self, image):
+        """判断图像与上一帧相比是否发生变化
+
+        Args:
+            image: PIL图像对象
+
+        Returns:
+            bool: 画面是否发生变化
+        """
+        self.checked_frames += 1
+        sample = self._sample(image)
+
+        # 第一帧或尺寸变化时视为变化
+        if self.last_sample is None or self.last_sample.shape != sample.shape:
+            self.last_sample = sample
+            return True
+
+        # 阈值化的灰度绝对差
+        diff = cv2.absdiff(sample, self.last_sample)
+        changed_pixels = int(np.count_nonzero(diff > self.sensitivity))
+
+        if changed_pixels < self.min_changed_pixels:
+            self.skipped_frames += 1
+            return False
+
+        self.last_sample = sample
+        return True
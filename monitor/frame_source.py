@@ -0,0 +1,287 @@
+import os
+import random
+import time
+from PIL import Image, ImageDraw, ImageFont
+from utils import log
+
+class FrameSource:
+    """帧来源基类，监控流水线通过它获取待识别的图像"""
+
+    name = "base"
+
+    def get_frame(self):
+        """获取一帧图像
+
+        Returns:
+            PIL图像对象，暂时无法获取时返回None
+        """
+        raise NotImplementedError
+
+    def is_ready(self):
+        """是否已经可以开始获取图像"""
+        return True
+
+    def reset(self):
+        """回到初始状态"""
+        pass
+
+    def close(self):
+        """释放资源"""
+        pass
+
+
+class WindowFrameSource(FrameSource):
+    """窗口帧来源，使用WindowCapture截取窗口的监控区域"""
+
+    name = "window"
+
+    def __init__(self, window_capture):
+        """初始化窗口帧来源
+
+        Args:
+            window_capture: WindowCapture实例
+        """
+        self.window_capture = window_capture
+
+    def is_ready(self):
+        return bool(self.window_capture.selected_window and self.window_capture.crop_area)
+
+    def get_frame(self):
+        return self.window_capture.get_cropped_image()
+
+    def close(self):
+        self.window_capture.release()
+
+
+class ImageDirectoryFrameSource(FrameSource):
+    """图片目录帧来源，按文件名顺序回放目录中的截图"""
+
+    name = "directory"
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+    def __init__(self, directory, loop=True, crop_area=None):
+        """初始化图片目录帧来源
+
+        Args:
+            directory: 图片所在目录
+            loop: 播放完毕后是否从头开始
+            crop_area: 可选的裁剪区域(left, top, right, bottom)
+        """
+        self.directory = directory
+        self.loop = loop
+        self.crop_area = tuple(crop_area) if crop_area else None
+        self.files = []
+        self.index = 0
+        if not directory or not os.path.isdir(directory):
+            log(f"无法打开图片目录: {directory}", 'WARNING')
+            return
+        self.files = sorted(
+            os.path.join(directory, name) for name in os.listdir(directory)
+            if name.lower().endswith(self.IMAGE_EXTENSIONS)
+        )
+        if not self.files:
+            log(f"目录中没有图片: {directory}", 'WARNING')
+
+    def is_ready(self):
+        return bool(self.files)
+
+    def reset(self):
+        self.index = 0
+
+    def current_file(self):
+        """最近一次返回的图片路径"""
+        if not self.files or self.index == 0:
+            return None
+        return self.files[(self.index - 1) % len(self.files)]
+
+    def get_frame(self):
+        if not self.files:
+            return None
+        if self.index >= len(self.files):
+            if not self.loop:
+                return None
+            self.index = 0
+
+        path = self.files[self.index]
+        self.index += 1
+        with Image.open(path) as image:
+            frame = image.convert('RGB')
+        if self.crop_area:
+            frame = frame.crop(self.crop_area)
+        return frame
+
+
+class VideoFrameSource(FrameSource):
+    """视频帧来源，逐帧解码录制好的视频"""
+
+    name = "video"
+
+    def __init__(self, path, loop=True, crop_area=None):
+        """初始化视频帧来源
+
+        Args:
+            path: 视频文件路径
+            loop: 播放完毕后是否从头开始
+            crop_area: 可选的裁剪区域(left, top, right, bottom)
+        """
+        import cv2
+        self.cv2 = cv2
+        self.path = path
+        self.loop = loop
+        self.crop_area = tuple(crop_area) if crop_area else None
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            log(f"无法打开视频: {path}", 'WARNING')
+
+    def is_ready(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def reset(self):
+        if self.capture is not None:
+            self.capture.set(self.cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def get_frame(self):
+        if not self.is_ready():
+            return None
+        ok, frame = self.capture.read()
+        if not ok and self.loop:
+            self.reset()
+            ok, frame = self.capture.read()
+        if not ok:
+            return None
+
+        image = Image.fromarray(self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2RGB))
+        if self.crop_area:
+            image = image.crop(self.crop_area)
+        return image
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class SyntheticChatFrameSource(FrameSource):
+    """合成聊天帧来源，用PIL绘制模拟的聊天记录，可按固定速率发送新消息"""
+
+    name = "synthetic"
+    FONT_CANDIDATES = (
+        'msyh.ttc', 'simhei.ttf', 'simsun.ttc',
+        '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+        '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+        '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    )
+    CHATTER = ('有人打吗', '来了来了', '等车', '刚才那把好险', '车车', '今天手气不错', '约吗', '三缺一')
+
+    def __init__(self, width=480, height=360, message_interval=1.0, plate_ratio=0.3,
+                 font_path=None, font_size=18, seed=None):
+        """初始化合成聊天帧来源
+
+        Args:
+            width: 图像宽度
+            height: 图像高度
+            message_interval: 新消息的间隔(秒)，为0时每帧都发送一条新消息
+            plate_ratio: 新消息中包含车牌号码的比例
+            font_path: 字体路径，为None时自动查找中文字体
+            font_size: 字号
+            seed: 随机数种子，便于复现
+        """
+        self.width = width
+        self.height = height
+        self.message_interval = message_interval
+        self.plate_ratio = plate_ratio
+        self.font_size = font_size
+        self.line_height = int(font_size * 1.6)
+        self.font = self._load_font(font_path, font_size)
+        self.glyphs = {}
+        self.missing_glyph = None
+        self.seed = seed
+        self.random = random.Random(seed)
+
+        self.lines = []
+        self.posted = []  # 已发送的消息，用于核对识别结果
+        self.last_message_time = None
+
+    def _load_font(self, font_path, font_size):
+        """加载字体，找不到中文字体时使用PIL默认字体"""
+        for candidate in ((font_path,) if font_path else ()) + self.FONT_CANDIDATES:
+            try:
+                return ImageFont.truetype(candidate, font_size)
+            except (OSError, IOError):
+                continue
+        log("未找到中文字体，合成图像中的中文会显示为方框", 'WARNING')
+        return ImageFont.load_default()
+
+    def _has_glyph(self, char):
+        """字体中是否有这个字符，缺字时绘制的是和未定义字符相同的方框或者什么都不画"""
+        if char not in self.glyphs:
+            if self.missing_glyph is None:
+                missing = self.font.getmask('\U0010FFFD')
+                self.missing_glyph = (missing.size, bytes(missing))
+            mask = self.font.getmask(char)
+            self.glyphs[char] = mask.getbbox() is not None and (mask.size, bytes(mask)) != self.missing_glyph
+        return self.glyphs[char]
+
+    def can_render(self, text):
+        """字体能否绘制文本中的所有字符，不能绘制的文本不能作为识别的真实文本"""
+        return all(char.isspace() or self._has_glyph(char) for char in text)
+
+    def reset(self):
+        self.random = random.Random(self.seed)
+        self.lines = []
+        self.posted = []
+        self.last_message_time = None
+
+    def next_message(self):
+        """生成一条随机消息"""
+        if self.random.random() < self.plate_ratio:
+            plate = f"{self.random.randint(10000, 99999)}"
+            return self.random.choice((plate, f"{plate} 来人", f"车 {plate}"))
+        return self.random.choice(self.CHATTER)
+
+    def post_message(self, message):
+        """发送一条消息，超出画面的旧消息会被滚出"""
+        self.lines.append(message)
+        self.posted.append(message)
+        max_lines = max(1, (self.height - 8) // self.line_height)
+        if len(self.lines) > max_lines:
+            self.lines = self.lines[-max_lines:]
+
+    def get_frame(self):
+        now = time.monotonic()
+        if self.last_message_time is None or now - self.last_message_time >= self.message_interval:
+            self.post_message(self.next_message())
+            self.last_message_time = now
+
+        image = Image.new('RGB', (self.width, self.height), (255, 255, 255))
+        draw = ImageDraw.Draw(image)
+        # 消息从底部向上排列，和聊天窗口一致
+        y = self.height - 4 - len(self.lines) * self.line_height
+        for line in self.lines:
+            draw.text((8, y), line, fill=(0, 0, 0), font=self.font)
+            y += self.line_height
+        return image
+
+
+def create_frame_source(settings, window_capture=None):
+    """根据监控设置创建帧来源
+
+    Args:
+        settings: 监控设置字典，读取frame_source、frame_source_path等配置
+        window_capture: 使用窗口帧来源时的WindowCapture实例
+
+    Returns:
+        FrameSource实例
+    """
+    source_type = settings.get('frame_source', 'window')
+    path = settings.get('frame_source_path', '')
+
+    if source_type == 'directory':
+        return ImageDirectoryFrameSource(path)
+    if source_type == 'video':
+        return VideoFrameSource(path)
+    if source_type == 'synthetic':
+        return SyntheticChatFrameSource(message_interval=settings.get('synthetic_message_interval', 1.0))
+    if source_type != 'window':
+        log(f"未知的帧来源类型: {source_type}，将使用窗口捕获", 'WARNING')
+    return WindowFrameSource(window_capture)
@@ -0,0 +1,80 @@
+from monitor.frame_diff import FrameChangeDetector
+from monitor.scroll_tracker import IncrementalReader
+from monitor.text_analyzer import TextAnalyzer
+
+class MonitorTarget:
+    """监控目标类，一个帧来源及其独立的变化检测、增量识别和文本分析状态"""
+
+    def __init__(self, name, frame_source, ocr_processor, rules, text_analyzer=None,
+                 change_sensitivity=12, change_detection_enabled=True, incremental_ocr_enabled=True):
+        """初始化监控目标
+
+        Args:
+            name: 目标名称，用于区分提醒来源
+            frame_source: FrameSource实例
+            ocr_processor: 共享的OCR处理器
+            rules: 匹配规则字典
+            text_analyzer: 可选的文本分析器，为None时新建一个
+            change_sensitivity: 画面变化检测灵敏度
+            change_detection_enabled: 是否启用画面变化检测
+            incremental_ocr_enabled: 是否启用增量识别
+        """
+        self.name = name
+        self.frame_source = frame_source
+        self.change_detection_enabled = change_detection_enabled
+        self.incremental_ocr_enabled = incremental_ocr_enabled
+        self.change_detector = FrameChangeDetector(change_sensitivity)
+        self.incremental_reader = IncrementalReader(ocr_processor)
+        self.text_analyzer = text_analyzer if text_analyzer is not None else TextAnalyzer(rules)
+
+    def reset(self):
+        """开始监控前重置状态"""
+        self.change_detector.reset()
+        self.incremental_reader.reset()
+        self.frame_source.reset()
+
+    def should_process(self, image):
+        """截图线程调用：画面没有变化时跳过OCR"""
+        if not self.change_detection_enabled:
+            return True
+        return self.change_detector.has_changed(image)
+
+    def prepare(self, image):
+        """OCR线程按取帧顺序调用：返回需要识别的图像
+
+        Returns:
+            (图像, 识别请求)，交给commit时需要带上第二项，不使用增量识别时为None
+        """
+        if self.incremental_ocr_enabled:
+            return self.incremental_reader.prepare(image)
+        return image, None
+
+    def layout_key(self, request):
+        """文本行布局缓存的标识，只识别新滚入区域时区域大小每帧不同，不使用缓存"""
+        return None if request is not None and request.band else self.name
+
+    def commit(self, text, request):
+        """OCR线程按取帧顺序调用：返回交给文本分析器的文本
+
+        识别失败(text为None)时返回None并调用discard，
+        否则之后相同的画面都会被当作没有变化而跳过，这一帧的内容就再也不会被识别
+        """
+        if text is None:
+            self.discard()
+            return None
+        if self.incremental_ocr_enabled and request is not None:
+            return self.incremental_reader.commit(text, request)
+        return text
+
+    def discard(self):
+        """这一帧没有识别成功：让变化检测丢弃参照帧，下一帧即使画面相同也会重新识别"""
+        self.change_detector.discard()
+
+    def get_stats(self):
+        """获取统计信息文本"""
+        stats = []
+        if self.change_detection_enabled:
+            stats.append(f"画面未变化已跳过: {self.change_detector.skipped_frames}/{self.change_detector.checked_frames} 帧")
+        if self.incremental_ocr_enabled:
+            stats.append(f"增量识别: {self.incremental_reader.band_scans} 次, 完整识别: {self.incremental_reader.full_scans} 次")
+        return ", ".join(stats)
@@ -0,0 +1,276 @@
+import queue
+import threading
+import time
+from utils import log
+
+class DropOldestQueue:
+    """有界队列，队列已满时丢弃最旧的元素"""
+
+    def __init__(self, maxsize):
+        """初始化队列
+
+        Args:
+            maxsize: 队列最大长度
+        """
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        """放入元素，队列已满时丢弃最旧的元素"""
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """取出元素，超时抛出queue.Empty"""
+        return self.queue.get(timeout=timeout)
+
+    def drain(self):
+        """取出队列中的全部元素"""
+        items = []
+        while True:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def clear(self):
+        """清空队列"""
+        self.drain()
+
+
+class LatestFrameSlots:
+    """每个帧来源一个槽位，只保留最新的一帧，未处理的旧帧会被覆盖"""
+
+    def __init__(self):
+        self.frames = {}
+        self.condition = threading.Condition()
+        self.dropped = 0
+
+    def put(self, source_name, frame):
+        """放入一帧，覆盖该来源尚未处理的旧帧"""
+        with self.condition:
+            if source_name in self.frames:
+                self.dropped += 1
+            self.frames[source_name] = frame
+            self.condition.notify()
+
+    def take_all(self, timeout=None):
+        """取出所有来源的最新帧，没有帧时最多等待timeout秒
+
+        Returns:
+            {来源名称: 图像}，超时返回空字典
+        """
+        with self.condition:
+            if not self.frames:
+                self.condition.wait(timeout)
+            frames = self.frames
+            self.frames = {}
+            return frames
+
+    def clear(self):
+        """清空所有槽位"""
+        with self.condition:
+            self.frames = {}
+
+
+class MonitorPipeline:
+    """监控流水线类，截图线程和OCR线程通过有界槽位连接，结果由GUI线程轮询
+
+    每个扫描周期截取所有帧来源，OCR线程一次取出各来源的最新帧进行批量识别。
+    可以启动多个OCR线程同时识别多批帧，准备和收尾阶段按取帧顺序执行，结果按顺序交付
+    """
+
+    def __init__(self, frame_sources, process_frames, get_interval, should_process=None,
+                 result_queue_size=32, prepare_frames=None, finish_frames=None, ocr_threads=1,
+                 discard_frames=None):
+        """初始化监控流水线
+
+        Args:
+            frame_sources: {来源名称: FrameSource实例}，截图线程从中获取图像
+            process_frames: 处理函数，在OCR线程中调用，多个OCR线程时会并行调用
+            get_interval: 返回当前扫描间隔(秒)的函数
+            should_process: 可选的过滤函数(来源名称, 图像)，返回False的帧不会进入OCR
+            result_queue_size: 结果队列长度
+            prepare_frames: 可选的准备函数，按取帧顺序以{来源名称: 图像}调用，返回值交给process_frames
+            finish_frames: 可选的收尾函数，按取帧顺序以process_frames的返回值调用，返回结果列表
+            ocr_threads: OCR线程数，process_frames能够并行执行时才可以大于1
+            discard_frames: 可选的函数，某一批帧的准备、识别或收尾出错时按取帧顺序以[来源名称, ...]调用
+        """
+        self.frame_sources = frame_sources
+        self.process_frames = process_frames
+        self.prepare_frames = prepare_frames
+        self.finish_frames = finish_frames
+        self.discard_frames = discard_frames
+        self.get_interval = get_interval
+        self.should_process = should_process
+        self.ocr_threads = ocr_threads
+
+        self.frame_slots = LatestFrameSlots()
+        self.result_queue = DropOldestQueue(result_queue_size)
+
+        # 按取帧顺序交付结果
+        self.take_lock = threading.Lock()
+        self.deliver_lock = threading.Lock()
+        self.next_sequence = 0
+        self.next_delivery = 0
+        self.finished_batches = {}
+
+        self.stop_event = threading.Event()
+        self.capture_thread = None
+        self.ocr_thread_list = []
+
+        # 统计信息
+        self.captured_frames = 0
+        self.capture_failures = 0
+        self.processed_frames = 0
+
+    def is_running(self):
+        """流水线是否正在运行"""
+        return self.capture_thread is not None and self.capture_thread.is_alive()
+
+    def is_stopped(self):
+        """上次启动的线程是否都已经退出"""
+        return not any(thread is not None and thread.is_alive()
+                       for thread in [self.capture_thread] + self.ocr_thread_list)
+
+    def start(self):
+        """启动截图线程和OCR线程
+
+        Returns:
+            bool: 是否在运行，上次停止时有线程没有及时退出的话不会重新启动
+        """
+        if self.is_running():
+            return True
+        if not self.is_stopped():
+            log("上次的截图或OCR线程尚未退出，暂时无法重新开始", 'WARNING')
+            return False
+        self.stop_event.clear()
+        self.frame_slots.clear()
+        self.result_queue.clear()
+        self.next_sequence = 0
+        self.next_delivery = 0
+        self.finished_batches = {}
+
+        self.capture_thread = threading.Thread(target=self._capture_loop, name="capture", daemon=True)
+        self.ocr_thread_list = [
+            threading.Thread(target=self._ocr_loop, name=f"ocr-{index}", daemon=True)
+            for index in range(max(1, self.ocr_threads))
+        ]
+        for thread in self.ocr_thread_list:
+            thread.start()
+        self.capture_thread.start()
+        return True
+
+    def stop(self, timeout=5.0):
+        """停止流水线并等待线程退出
+
+        Args:
+            timeout: 每个线程的最长等待时间(秒)
+
+        Returns:
+            bool: 线程是否都已退出，没有退出的线程会保留，退出前不能重新启动
+        """
+        self.stop_event.set()
+        for thread in [self.capture_thread] + self.ocr_thread_list:
+            if thread is not None and thread is not threading.current_thread():
+                thread.join(timeout)
+        if self.capture_thread is not None and not self.capture_thread.is_alive():
+            self.capture_thread = None
+        self.ocr_thread_list = [thread for thread in self.ocr_thread_list if thread.is_alive()]
+        self.frame_slots.clear()
+        return self.is_stopped()
+
+    def poll_results(self):
+        """取出所有已完成的结果，供GUI线程调用"""
+        return self.result_queue.drain()
+
+    def _capture_loop(self):
+        """截图线程：按扫描间隔截取所有来源，把需要识别的帧放入槽位"""
+        while not self.stop_event.is_set():
+            start_time = time.monotonic()
+            for name, frame_source in list(self.frame_sources.items()):
+                try:
+                    frame = frame_source.get_frame()
+                    if frame is None:
+                        self.capture_failures += 1
+                    else:
+                        self.captured_frames += 1
+                        if self.should_process is None or self.should_process(name, frame):
+                            self.frame_slots.put(name, frame)
+                except Exception as e:
+                    log(f"截图线程出错 [{name}]: {str(e)}", 'ERROR')
+
+            elapsed = time.monotonic() - start_time
+            self.stop_event.wait(max(0.0, self.get_interval() - elapsed))
+
+    def _take_batch(self):
+        """按顺序取出一批帧并执行准备阶段
+
+        Returns:
+            (序号, 来源名称列表, 交给process_frames的数据)，没有帧时返回(None, None, None)
+        """
+        with self.take_lock:
+            frames = self.frame_slots.take_all(timeout=0.2)
+            if not frames:
+                return None, None, None
+            sequence = self.next_sequence
+            self.next_sequence += 1
+            try:
+                batch = self.prepare_frames(frames) if self.prepare_frames else frames
+            except Exception as e:
+                log(f"OCR线程出错: {str(e)}", 'ERROR')
+                batch = None
+            return sequence, list(frames), batch
+
+    def _discard(self, names):
+        """通知这些来源取出的帧没有完成识别"""
+        if self.discard_frames is None:
+            return
+        try:
+            self.discard_frames(names)
+        except Exception as e:
+            log(f"OCR线程出错: {str(e)}", 'ERROR')
+
+    def _deliver(self, sequence, names, processed):
+        """按序号顺序执行收尾阶段，把结果放入结果队列，出错的批次交给discard_frames"""
+        with self.deliver_lock:
+            self.finished_batches[sequence] = (names, processed)
+            while self.next_delivery in self.finished_batches:
+                names, processed = self.finished_batches.pop(self.next_delivery)
+                self.next_delivery += 1
+                if processed is None:
+                    self._discard(names)
+                    continue
+                try:
+                    results = self.finish_frames(processed) if self.finish_frames else processed
+                except Exception as e:
+                    log(f"OCR线程出错: {str(e)}", 'ERROR')
+                    self._discard(names)
+                    continue
+                self.processed_frames += 1
+                for result in results or ():
+                    self.result_queue.put(result)
+
+    def _ocr_loop(self):
+        """OCR线程：取出各来源的最新帧批量识别，结果按取帧顺序放入结果队列"""
+        while not self.stop_event.is_set():
+            sequence, names, batch = self._take_batch()
+            if sequence is None:
+                continue
+
+            processed = None
+            if batch is not None:
+                try:
+                    processed = self.process_frames(batch)
+                except Exception as e:
+                    log(f"OCR线程出错: {str(e)}", 'ERROR')
+            del batch
+            self._deliver(sequence, names, processed)
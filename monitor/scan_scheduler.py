@@ -0,0 +1,82 @@
+import threading
+
+class ScanScheduler:
+    """自适应扫描间隔：画面变化或发现匹配时缩短到最小间隔，空闲时按倍数逐步延长到最大间隔"""
+
+    def __init__(self, base_interval=1.0, min_interval=0.3, max_interval=2.0, backoff=1.5, enabled=True):
+        """初始化扫描调度器
+
+        Args:
+            base_interval: 关闭自适应时的固定扫描间隔(秒)，也是开启后的初始间隔
+            min_interval: 有活动时的扫描间隔(秒)
+            max_interval: 空闲时最多延长到的扫描间隔(秒)，应满足min_interval ≤ base_interval ≤ max_interval，
+                画面一变化就回到min_interval，所以空闲时放慢不会推迟新消息之后的扫描
+            backoff: 每个空闲周期间隔延长的倍数
+            enabled: 是否启用自适应间隔
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.enabled = enabled
+
+        self.lock = threading.Lock()
+        self.interval = self._clamp(base_interval)
+        self.active = False
+        self.active_cycles = 0
+        self.idle_cycles = 0
+
+    def _clamp(self, interval):
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def update_settings(self, base_interval=None, min_interval=None, max_interval=None, backoff=None, enabled=None):
+        """更新调度参数，下一个周期生效，参数的大小关系由调用方检查"""
+        with self.lock:
+            if base_interval is not None:
+                self.base_interval = base_interval
+            if min_interval is not None:
+                self.min_interval = min_interval
+            if max_interval is not None:
+                self.max_interval = max_interval
+            if backoff is not None:
+                self.backoff = max(1.0, backoff)
+            if enabled is not None:
+                self.enabled = enabled
+            self.interval = self._clamp(self.interval)
+
+    def record_activity(self):
+        """记录一次活动(画面变化或发现匹配)，可以在任意线程调用"""
+        self.active = True
+
+    def next_interval(self):
+        """截图线程每个周期结束时调用：根据本周期是否有活动计算下一次扫描前的等待时间
+
+        Returns:
+            扫描间隔(秒)
+        """
+        with self.lock:
+            active, self.active = self.active, False
+            if not self.enabled:
+                return self.base_interval
+            if active:
+                self.active_cycles += 1
+                self.interval = self.min_interval
+            else:
+                self.idle_cycles += 1
+                self.interval = self._clamp(self.interval * self.backoff)
+            return self.interval
+
+    def reset(self):
+        """开始监控时从初始间隔开始"""
+        with self.lock:
+            self.active = False
+            self.interval = self._clamp(self.base_interval)
+
+    def current_interval(self):
+        """当前的扫描间隔(秒)"""
+        return self.interval if self.enabled else self.base_interval
+
+    def get_rate(self):
+        """当前的扫描频率(次/秒)"""
+        interval = self.current_interval()
+        return 1.0 / interval if interval > 0 else 0.0
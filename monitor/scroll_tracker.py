@@ -0,0 +1,298 @@
+from collections import deque
+import numpy as np
+
+class ScrollTracker:
+    """滚动跟踪类，估计相邻两帧聊天区域的垂直滚动距离"""
+
+    def __init__(self, max_shift_ratio=0.6, match_tolerance=3.0, column_bins=16, blank_row_std=2.0):
+        """初始化滚动跟踪器
+
+        Args:
+            max_shift_ratio: 最大可识别的滚动距离占图像高度的比例
+            match_tolerance: 行轮廓平均灰度差的容忍值，超过则认为无法对齐
+            column_bins: 计算行轮廓时将每行划分的列数
+            blank_row_std: 行灰度标准差低于该值视为行间空白
+        """
+        self.max_shift_ratio = max_shift_ratio
+        self.match_tolerance = match_tolerance
+        self.column_bins = column_bins
+        self.blank_row_std = blank_row_std
+
+        self.last_profile = None
+        self.last_bottom = None
+
+    def reset(self):
+        """清空上一帧"""
+        self.last_profile = None
+        self.last_bottom = None
+
+    def _row_profile(self, gray):
+        """计算分列的行轮廓，形状为(高度, 列数)"""
+        height, width = gray.shape
+        bins = max(1, min(self.column_bins, width))
+        bin_width = width // bins
+        trimmed = gray[:, :bins * bin_width].astype(np.float32)
+        return trimmed.reshape(height, bins, bin_width).mean(axis=2)
+
+    def measure(self, image):
+        """计算一帧的行轮廓和每行的灰度标准差，不改变跟踪状态
+
+        Args:
+            image: PIL图像对象
+
+        Returns:
+            (行轮廓, 每行灰度标准差)
+        """
+        gray = np.asarray(image.convert('L'))
+        return self._row_profile(gray), gray.std(axis=1)
+
+    def estimate_shift(self, profile):
+        """估计相对上一次确认的帧内容向上滚动的像素数
+
+        Args:
+            profile: measure返回的行轮廓
+
+        Returns:
+            滚动像素数(0表示没有滚动)，无法对齐时返回None
+        """
+        previous = self.last_profile
+        if previous is None or previous.shape != profile.shape:
+            return None
+
+        height, bins = profile.shape
+        if height == 0:
+            return None
+        max_shift = min(int(height * self.max_shift_ratio), height - 1)
+
+        # 内容上移s像素时，当前帧的第y行对应上一帧的第y+s行，
+        # 所有滚动距离的平方误差一次算出：sum(p[y]²) + sum(q[y+s]²) - 2·sum(p[y]·q[y+s])，互相关用FFT计算
+        current = profile.astype(np.float64)
+        reference = previous.astype(np.float64)
+        size = 1 << (2 * height - 1).bit_length()
+        spectrum = np.conj(np.fft.rfft(current, size, axis=0)) * np.fft.rfft(reference, size, axis=0)
+        cross = np.fft.irfft(spectrum, size, axis=0)[:max_shift + 1].sum(axis=1)
+
+        shifts = np.arange(max_shift + 1)
+        current_energy = np.concatenate(([0.0], np.cumsum((current ** 2).sum(axis=1))))
+        reference_energy = np.concatenate(([0.0], np.cumsum((reference ** 2).sum(axis=1))))
+        squared_error = (current_energy[height - shifts]
+                         + reference_energy[height] - reference_energy[shifts] - 2 * cross)
+        mean_squared_error = np.maximum(squared_error, 0.0) / ((height - shifts) * bins)
+
+        # 误差相同时取较小的滚动距离，FFT有舍入误差，留一点余量
+        best_shift = int(np.flatnonzero(mean_squared_error <= mean_squared_error.min() + 1e-6)[0])
+        best_error = float(np.mean(np.abs(profile[:height - best_shift] - previous[best_shift:])))
+        if best_error > self.match_tolerance:
+            return None
+        return best_shift
+
+    def read_bottom(self, row_std, max_snap=60):
+        """计算识别区域的下边界：底部有被截断的文字行时，向上对齐到行间空白处，截断的行等完整滚入后再识别
+
+        下一帧的新区域从这条行间空白滚动后的位置开始
+
+        Args:
+            row_std: measure返回的每行灰度标准差
+            max_snap: 向上寻找行间空白的最大距离
+
+        Returns:
+            识别区域的下边界(不含)，找不到行间空白时为图像高度
+        """
+        height = len(row_std)
+        if height == 0 or row_std[-1] < self.blank_row_std:
+            return height
+        for row in range(height - 1, max(0, height - 1 - max_snap), -1):
+            if row_std[row] < self.blank_row_std:
+                return row
+        return height
+
+    def content_end(self, row_std, bottom):
+        """识别区域内最后一行文字的下边界
+
+        文字下方的空白在之后的帧中可能出现新消息，不能算作已经识别过的区域
+
+        Args:
+            row_std: measure返回的每行灰度标准差
+            bottom: 识别区域的下边界
+
+        Returns:
+            最后一个非空白行的下一行，没有文字时为0
+        """
+        rows = np.flatnonzero(np.asarray(row_std[:bottom]) >= self.blank_row_std)
+        return int(rows[-1]) + 1 if len(rows) else 0
+
+    def advance(self, profile, bottom):
+        """确认一帧已经识别并合并，之后的帧以它为参照估计滚动距离
+
+        Args:
+            profile: 这一帧的行轮廓
+            bottom: 这一帧已经识别的文字的下边界，content_end的返回值
+        """
+        self.last_profile = profile
+        self.last_bottom = bottom
+
+
+class ReadRequest:
+    """IncrementalReader.prepare返回的识别请求，识别结果交给commit时带上"""
+
+    __slots__ = ('frame', 'profile', 'bottom', 'band')
+
+    def __init__(self, frame, profile, bottom, band=False):
+        """初始化识别请求
+
+        Args:
+            frame: prepare的调用序号
+            profile: 这一帧的行轮廓
+            bottom: 识别区域内文字的下边界，commit后作为下一帧新内容的起点
+            band: 是否只识别新滚入的区域
+        """
+        self.frame = frame
+        self.profile = profile
+        self.bottom = bottom
+        self.band = band
+
+
+class LineBuffer:
+    """滚动行缓冲区，保存最近识别到的聊天行"""
+
+    def __init__(self, max_lines=100):
+        """初始化行缓冲区
+
+        Args:
+            max_lines: 最多保留的行数
+        """
+        self.lines = deque(maxlen=max_lines)
+
+    def clear(self):
+        """清空缓冲区"""
+        self.lines.clear()
+
+    def replace(self, lines):
+        """用完整识别的结果替换缓冲区内容"""
+        self.lines.clear()
+        self.lines.extend(lines)
+
+    def extend(self, lines):
+        """追加新滚入区域的识别结果，新区域从上一帧识别区域的下边界开始，不会和已有的行重叠
+
+        Args:
+            lines: 新区域识别出的行列表
+        """
+        self.lines.extend(lines)
+
+    def get_text(self):
+        """获取缓冲区中的全部文本"""
+        return "\n".join(self.lines)
+
+
+class IncrementalReader:
+    """增量识别类，只对新滚入的聊天行进行OCR
+
+    滚动距离相对上一次commit的帧估计，识别结果合并后才更新参照帧，识别失败的区域会在下一帧重新识别。
+    上一次prepare的结果还没有commit时(多个OCR线程同时识别)，这一帧完整识别
+    """
+
+    def __init__(self, ocr_processor, max_lines=100, band_padding=4):
+        """初始化增量识别器
+
+        Args:
+            ocr_processor: OCR处理器实例
+            max_lines: 行缓冲区最多保留的行数
+            band_padding: 新内容区域上方是行间空白时，额外向上包含的最大像素数
+        """
+        self.ocr_processor = ocr_processor
+        self.band_padding = band_padding
+        self.tracker = ScrollTracker()
+        self.buffer = LineBuffer(max_lines)
+
+        self.full_scans = 0
+        self.band_scans = 0
+        self.prepared = 0
+        self.committed = 0
+        self.pending_request = None
+
+    def reset(self):
+        """清空滚动状态和行缓冲区"""
+        self.tracker.reset()
+        self.buffer.clear()
+        self.full_scans = 0
+        self.band_scans = 0
+        self.prepared = 0
+        self.committed = 0
+        self.pending_request = None
+
+    def prepare(self, image):
+        """估计滚动距离，返回本帧需要识别的图像
+
+        Args:
+            image: PIL图像对象
+
+        Returns:
+            (图像, ReadRequest)，只识别新滚入的区域时ReadRequest.band为True，
+            无法对齐或原地变化时返回整幅图像，底部被截断的行不包含在内
+        """
+        profile, row_std = self.tracker.measure(image)
+        width, height = image.size
+        bottom = self.tracker.read_bottom(row_std)
+        self.prepared += 1
+        request = ReadRequest(self.prepared, profile, self.tracker.content_end(row_std, bottom))
+        self.pending_request = request
+
+        # 上一次准备的帧已经合并时才能只识别新区域
+        if self.prepared - 1 == self.committed:
+            shift = self.tracker.estimate_shift(profile)
+            if shift:
+                # 上一帧最后一行文字的下边界滚动后的位置，以下都是新内容
+                top = self.tracker.last_bottom - shift
+                if 0 <= top < bottom:
+                    # 向上多留一点空白边距，只包含空白行，不会带入已经识别过的文字
+                    margin = 0
+                    while margin < self.band_padding and top > 0 and row_std[top - 1] < self.tracker.blank_row_std:
+                        top -= 1
+                        margin += 1
+                    request.band = True
+                    return image.crop((0, top, width, bottom)), request
+
+        # 无法对齐或原地变化时完整识别
+        if bottom < height:
+            image = image.crop((0, 0, width, bottom))
+        return image, request
+
+    def commit(self, text, request=None):
+        """把prepare返回图像的识别结果合并到行缓冲区，并以这一帧作为之后估计滚动的参照
+
+        识别失败时不修改行缓冲区和参照帧，下一次prepare会完整识别
+
+        Args:
+            text: 识别出的文本，识别失败时为None
+            request: prepare返回的ReadRequest，为None时使用最近一次prepare的结果
+
+        Returns:
+            行缓冲区中的全部文本，识别失败时返回None
+        """
+        if text is None:
+            return None
+        lines = text.splitlines()
+        if request is None:
+            request = self.pending_request
+        if request.band:
+            self.buffer.extend(lines)
+            self.band_scans += 1
+        else:
+            self.buffer.replace(lines)
+            self.full_scans += 1
+        self.tracker.advance(request.profile, request.bottom)
+        self.committed = request.frame
+        return self.buffer.get_text()
+
+    def read(self, image):
+        """识别一帧图像并返回行缓冲区中的文本
+
+        Args:
+            image: PIL图像对象
+
+        Returns:
+            行缓冲区中的全部文本，识别失败时返回None
+        """
+        image, request = self.prepare(image)
+        return self.commit(self.ocr_processor.recognize_text(image), request)
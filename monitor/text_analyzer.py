@@ -1,21 +1,68 @@
 import re
+from monitor.alert_store import AlertStore
+from utils import log
 
 class TextAnalyzer:
     """文本分析类，处理文本匹配和识别"""
     
-    def __init__(self, rules):
+    def __init__(self, rules, alert_store=None):
         """初始化文本分析器
         
         Args:
             rules: 包含匹配规则的字典，需包含keywords, number_patterns, custom_patterns, exclude_patterns
+            alert_store: 已提醒消息记录，为None时新建一个只保存在内存中的记录
         """
-        self.rules = rules
         self.last_printed_text = None
-        self.alerted_messages = set()  # 已经触发警报的消息集合
+        self.last_printed_lines = set()
+        self.alerted_messages = alert_store if alert_store is not None else AlertStore()  # 已经触发警报的消息记录
+        self.update_rules(rules)
     
     def update_rules(self, rules):
-        """更新匹配规则"""
+        """更新匹配规则，规则在这里一次性编译，无效的正则表达式会被丢弃"""
         self.rules = rules
+        # 数字和自定义模式各自报告自己的匹配，合并为一个正则后同一位置只会有一个模式匹配，所以保持分开
+        self.number_regexes = [regex for _, regex in self._valid_patterns(rules.get('number_patterns', []))]
+        self.custom_regexes = [(regex, pattern) for pattern, regex in self._valid_patterns(rules.get('custom_patterns', []))]
+        # 排除规则只判断是否有任意一个匹配，可以合并
+        self.exclude_regexes = self._compile_group(rules.get('exclude_patterns', []))
+        
+        # 所有关键词合并为一个正则，长的关键词优先
+        keywords = sorted({keyword for keyword in rules.get('keywords', []) if keyword}, key=len, reverse=True)
+        self.keyword_regex = re.compile("|".join(re.escape(keyword) for keyword in keywords)) if keywords else None
+    
+    def _valid_patterns(self, patterns):
+        """编译并过滤出有效的正则表达式"""
+        valid = []
+        for pattern in patterns:
+            if not pattern:  # 跳过空模式
+                continue
+            try:
+                valid.append((pattern, re.compile(pattern)))
+            except re.error:
+                log(f"无效的正则表达式: {pattern}", 'WARNING')
+        return valid
+    
+    def _can_combine(self, compiled):
+        """含有反向引用或命名分组的模式合并后编号会错位，含有内联标志(如(?i))的模式只能放在整个正则开头，都不能合并"""
+        return not any(re.search(r'\\\d|\(\?P|\(\?[aiLmsux]', pattern) for pattern, _ in compiled)
+    
+    def _compile_group(self, patterns):
+        """把一组模式合并为一个正则，无法合并时保留各自编译的结果
+        
+        Returns:
+            编译后的正则列表
+        """
+        compiled = self._valid_patterns(patterns)
+        if len(compiled) > 1 and self._can_combine(compiled):
+            try:
+                return [re.compile("|".join(f"(?:{pattern})" for pattern, _ in compiled))]
+            except re.error as e:
+                log(f"合并正则表达式失败，分别匹配: {str(e)}", 'ERROR')
+        return [regex for _, regex in compiled]
+    
+    def _is_excluded(self, number):
+        """检查数字是否被排除规则排除"""
+        return any(regex.search(number) for regex in self.exclude_regexes)
     
     def analyze_text(self, text):
         """分析OCR识别出的文本，检查是否匹配任何规则
@@ -24,59 +71,66 @@ class TextAnalyzer:
             text: OCR识别的文本
             
         Returns:
-            匹配到的消息，如果没有匹配则返回None
+            第一条匹配到的消息，如果没有匹配则返回None
+        """
+        messages = self.find_matches(text)
+        return messages[0] if messages else None
+    
+    def find_matches(self, text):
+        """一次找出文本中所有尚未提醒过的匹配，按在屏幕上出现的顺序排列
+        
+        Args:
+            text: OCR识别的文本
+            
+        Returns:
+            匹配到的消息列表，没有匹配时返回空列表
         """
         if not text:
-            return None
+            return []
             
-        # 只在文本变化时打印
+        lines = text.splitlines()
+        
+        # 只在文本变化时打印，完整文本只在调试级别输出，平时只输出新出现的行
         if text != self.last_printed_text:
-            print("\n寻找车车中:")
-            print(text)
+            log("\n寻找车车中:\n" + text, 'DEBUG')
+            new_lines = [line for line in lines if line not in self.last_printed_lines]
+            if new_lines:
+                print("\n寻找车车中:\n" + "\n".join(new_lines))
             self.last_printed_text = text
-            
-        lines = text.splitlines()
+            self.last_printed_lines = set(lines)
         
+        messages = []
+        seen = set()
         for line in lines:
+            # 同一行内按匹配位置排序
+            found = []
+            
             # 检查数字模式
-            for pattern in self.rules['number_patterns']:
-                matches = re.finditer(pattern, line)
-                for match in matches:
+            for regex in self.number_regexes:
+                for match in regex.finditer(line):
                     number = match.group()
                     # 检查这个数字是否被排除规则排除
-                    should_exclude = False
-                    for exclude_pattern in self.rules['exclude_patterns']:
-                        if re.search(exclude_pattern, number):
-                            should_exclude = True
-                            break
-                    
-                    if not should_exclude:
-                        message = f"发现车牌: {number}"
-                        if message not in self.alerted_messages:
-                            return message
+                    if not self._is_excluded(number):
+                        found.append((match.start(), f"发现车牌: {number}"))
             
             # 检查自定义正则表达式
-            for pattern in self.rules.get('custom_patterns', []):
-                if not pattern:  # 跳过空模式
-                    continue
-                try:
-                    matches = re.finditer(pattern, line)
-                    for match in matches:
-                        matched_text = match.group()
-                        message = f"匹配正则'{pattern}': {matched_text}"
-                        if message not in self.alerted_messages:
-                            return message
-                except re.error:
-                    print(f"无效的正则表达式: {pattern}")
+            for regex, pattern in self.custom_regexes:
+                for match in regex.finditer(line):
+                    found.append((match.start(), f"匹配正则'{pattern}': {match.group()}"))
             
             # 检查关键词
-            for keyword in self.rules['keywords']:
-                if keyword in line:
-                    message = f"发现关键词: {line}"
-                    if message not in self.alerted_messages:
-                        return message
+            if self.keyword_regex is not None:
+                match = self.keyword_regex.search(line)
+                if match:
+                    found.append((match.start(), f"发现关键词: {line}"))
+            
+            found.sort(key=lambda item: item[0])
+            for _, message in found:
+                if message not in seen and message not in self.alerted_messages:
+                    seen.add(message)
+                    messages.append(message)
                         
-        return None
+        return messages
     
     def add_alerted_message(self, message):
         """添加已触发警报的消息"""
@@ -86,6 +140,10 @@ class TextAnalyzer:
         """清空已触发警报的消息"""
         self.alerted_messages.clear()
     
+    def replace_alerted_messages(self, messages):
+        """用新的消息列表替换已触发警报的消息"""
+        self.alerted_messages.replace(messages)
+    
     def get_alerted_messages(self):
-        """获取已触发警报的消息列表"""
-        return self.alerted_messages 
\ No newline at end of file
+        """获取已触发警报的消息列表，按提醒时间先后排列"""
+        return self.alerted_messages.messages() 
\ No newline at end of file
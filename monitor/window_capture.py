@@ -2,68 +2,52 @@ import win32gui
 import win32ui
 import win32con
 import ctypes
-import cv2
 import numpy as np
 import json
 import os
 from PIL import Image
 import gc
 import win32api
-import comtypes
-import comtypes.client
 import time
+from monitor.capture_session import PrintWindowSession, DwmThumbnailSession, HAS_DWM_SUPPORT
+from monitor.capture_strategy import CaptureStrategyCache, is_blank_frame
+from metrics import metrics
+from utils import log
 
-# 导入DWM API
-try:
-    from ctypes.wintypes import RECT, DWORD, HWND, HRESULT, BOOL
-    from comtypes.automation import POINTER
-
-    # DWM缩略图API定义
-    DWMAPI = ctypes.WinDLL('dwmapi')
-    THUMBNAILID = ctypes.c_ulonglong
-
-    class DWM_THUMBNAIL_PROPERTIES(ctypes.Structure):
-        _fields_ = [
-            ('dwFlags', DWORD),
-            ('rcDestination', RECT),
-            ('rcSource', RECT),
-            ('opacity', ctypes.c_byte),
-            ('fVisible', BOOL),
-            ('fSourceClientAreaOnly', BOOL),
-        ]
-
-    # 定义DWM API函数
-    DWMAPI.DwmRegisterThumbnail.restype = HRESULT
-    DWMAPI.DwmRegisterThumbnail.argtypes = [HWND, HWND, POINTER(THUMBNAILID)]
-    
-    DWMAPI.DwmUpdateThumbnailProperties.restype = HRESULT
-    DWMAPI.DwmUpdateThumbnailProperties.argtypes = [THUMBNAILID, POINTER(DWM_THUMBNAIL_PROPERTIES)]
-    
-    DWMAPI.DwmUnregisterThumbnail.restype = HRESULT
-    DWMAPI.DwmUnregisterThumbnail.argtypes = [THUMBNAILID]
-    
-    # 定义DWM常量
-    DWM_TNP_VISIBLE = 0x8
-    DWM_TNP_RECTDESTINATION = 0x1
-    DWM_TNP_RECTSOURCE = 0x2
-    
-    HAS_DWM_SUPPORT = True
-except:
-    HAS_DWM_SUPPORT = False
-    print("DWM支持加载失败，将使用备用捕获方法")
+if not HAS_DWM_SUPPORT:
+    log("DWM支持加载失败，将使用备用捕获方法", 'WARNING')
 
 class WindowCapture:
     """窗口捕获类，负责窗口截图和区域选择"""
     
-    def __init__(self):
-        """初始化窗口捕获"""
+    def __init__(self, check_capabilities=True):
+        """初始化窗口捕获
+        
+        Args:
+            check_capabilities: 是否检查并打印捕获功能的支持情况
+        """
         self.selected_window = None
         self.crop_area = None
         self.crop_area_file = 'last_crop_area.txt'
         self.use_background_capture = True  # 默认使用背景捕获模式
+        # PrintWindow捕获会话，窗口尺寸不变时复用DC和位图
+        self.printwindow_session = PrintWindowSession()
+        # DWM缩略图捕获会话，缩略图注册在多帧之间复用
+        self.dwm_session = DwmThumbnailSession()
+        # 整窗口PrintWindow会话，区域捕获不可用时截取整个窗口再切出区域
+        self.printwindow_full_session = PrintWindowSession()
+        
+        # 背景模式下可用的捕获方法，按默认优先级排列
+        self.capture_methods = {
+            'printwindow': self.capture_using_printwindow,
+            'dwm': self.capture_using_dwm,
+            'printwindow_full': self.capture_using_printwindow_full,
+        }
+        self.strategy_cache = CaptureStrategyCache(self.capture_methods.keys())
         
         # 检查捕获功能
-        self.check_capture_capabilities()
+        if check_capabilities:
+            self.check_capture_capabilities()
     
     def check_capture_capabilities(self):
         """检查捕获功能的支持情况"""
@@ -80,7 +64,7 @@ class WindowCapture:
         
         # 至少要有一种背景捕获方法可用
         if not capabilities["PrintWindow"] and not capabilities["DWM缩略图"]:
-            print("警告: 所有背景捕获方法均不可用，将只能使用前台模式捕获窗口")
+            log("警告: 所有背景捕获方法均不可用，将只能使用前台模式捕获窗口", 'WARNING')
             self.use_background_capture = False
     
     def check_printwindow_support(self):
@@ -128,230 +112,135 @@ class WindowCapture:
         return None
     
     def capture_window(self, hwnd):
-        """截图窗口内容"""
+        """截图窗口内容，返回PIL图像"""
+        frame = self.capture_window_frame(hwnd)
+        if frame is None:
+            return None
+        return self.frame_to_image(frame)
+    
+    def capture_window_frame(self, hwnd, region=None):
+        """截图窗口内容，返回形状为(高度, 宽度, 4)的BGRX数组
+        
+        Args:
+            hwnd: 窗口句柄
+            region: 只捕获窗口中的该区域(left, top, right, bottom)，为None时捕获整个窗口
+        """
         if self.use_background_capture:
-            return self.capture_window_background(hwnd)
+            return self.capture_window_background(hwnd, region)
         else:
-            return self.capture_window_foreground(hwnd)
+            return self.capture_window_foreground(hwnd, region)
+    
+    def frame_to_image(self, frame, crop_area=None):
+        """将BGRX数组(或其中的裁剪区域)转换为PIL图像，只拷贝需要的像素
+        
+        Args:
+            frame: 形状为(高度, 宽度, 4)的BGRX数组
+            crop_area: 可选的裁剪区域(left, top, right, bottom)
+            
+        Returns:
+            PIL图像对象，裁剪区域无效时返回None
+        """
+        height, width = frame.shape[:2]
+        left, top, right, bottom = crop_area if crop_area else (0, 0, width, height)
+        left, right = max(0, left), min(width, right)
+        top, bottom = max(0, top), min(height, bottom)
+        if right <= left or bottom <= top:
+            return None
+        
+        # 按行跨度直接从原始缓冲区解码裁剪区域，不生成中间数组
+        frame = np.ascontiguousarray(frame)
+        row_stride = frame.strides[0]
+        offset = top * row_stride + left * 4
+        buffer = memoryview(frame.reshape(-1))[offset:].toreadonly()
+        return Image.frombuffer('RGB', (right - left, bottom - top), buffer, 'raw', 'BGRX', row_stride, 1)
     
-    def capture_window_foreground(self, hwnd):
+    def capture_window_foreground(self, hwnd, region=None):
         """使用前台模式截图窗口内容（需要窗口置顶）"""
         try:
-            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-            width = right - left
-            height = bottom - top
-
-            hwndDC = win32gui.GetWindowDC(hwnd)
-            mfcDC = win32ui.CreateDCFromHandle(hwndDC)
-            saveDC = mfcDC.CreateCompatibleDC()
-            saveBitMap = win32ui.CreateBitmap()
-            saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
-            saveDC.SelectObject(saveBitMap)
-            
-            result = ctypes.windll.user32.PrintWindow(hwnd, saveDC.GetSafeHdc(), 2)
-            bmpinfo = saveBitMap.GetInfo()
-            bmpstr = saveBitMap.GetBitmapBits(True)
-
-            im = Image.frombuffer(
-                'RGB',
-                (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
-                bmpstr, 'raw', 'BGRX', 0, 1
-            )
-
-            # 确保资源释放
-            win32gui.DeleteObject(saveBitMap.GetHandle())
-            saveDC.DeleteDC()
-            mfcDC.DeleteDC()
-            win32gui.ReleaseDC(hwnd, hwndDC)
-
-            return im
+            return self.printwindow_session.capture(hwnd, region)
         except Exception as e:
-            print(f"前台截图过程出错: {str(e)}")
-            # 确保资源释放
-            try:
-                if 'saveBitMap' in locals():
-                    win32gui.DeleteObject(saveBitMap.GetHandle())
-                if 'saveDC' in locals():
-                    saveDC.DeleteDC()
-                if 'mfcDC' in locals():
-                    mfcDC.DeleteDC()
-                if 'hwndDC' in locals():
-                    win32gui.ReleaseDC(hwnd, hwndDC)
-            except:
-                pass
+            log(f"前台截图过程出错: {str(e)}", 'ERROR')
             return None
             
-    def capture_window_background(self, hwnd):
-        """使用背景模式截图窗口内容（不需要窗口置顶，即使被遮挡也能获取内容）"""
+    def capture_window_background(self, hwnd, region=None):
+        """使用背景模式截图窗口内容（不需要窗口置顶，即使被遮挡也能获取内容）
+        
+        按窗口缓存上次成功的捕获方法并优先尝试，全黑的结果也视为失败
+        """
         try:
             # 首先检查窗口是否存在
             if not win32gui.IsWindow(hwnd):
                 print("窗口不存在或已关闭")
                 return None
+            
+            key = (win32gui.GetClassName(hwnd), hwnd)
+            blank_frame = None
+            for method in self.strategy_cache.order(key):
+                start_time = time.perf_counter()
+                frame = self.capture_methods[method](hwnd, region)
+                latency = time.perf_counter() - start_time
                 
-            # 尝试使用PrintWindow API
-            im = self.capture_using_printwindow(hwnd)
-            if im is not None:
-                return im
-                
-            # 如果PrintWindow失败，尝试DWM缩略图捕获
-            print("PrintWindow失败，尝试DWM缩略图捕获...")
-            im = self.capture_using_dwm(hwnd)
-            if im is not None:
-                return im
+                if frame is not None and not is_blank_frame(frame):
+                    if self.strategy_cache.record_success(key, method, latency):
+                        print(f"捕获方式切换为: {method} ({latency * 1000:.1f}ms)")
+                    return frame
                 
-            # 如果两种方法都失败，尝试最后的方案
-            print("所有背景捕获方式都失败，尝试前台模式...")
-            return self.capture_window_foreground(hwnd)
+                self.strategy_cache.record_failure(key, method)
+                if frame is not None:
+                    blank_frame = frame
+            
+            # 所有方式都只得到全黑图像时，返回最后一次结果（窗口内容可能本身就是黑色）
+            return blank_frame
             
         except Exception as e:
-            print(f"背景截图过程出错: {str(e)}")
+            log(f"背景截图过程出错: {str(e)}", 'ERROR')
             print("尝试使用前台模式截图...")
-            return self.capture_window_foreground(hwnd)
+            return self.capture_window_foreground(hwnd, region)
     
-    def capture_using_printwindow(self, hwnd):
-        """使用PrintWindow API捕获窗口内容"""
+    def capture_using_printwindow(self, hwnd, region=None):
+        """使用PrintWindow API捕获窗口内容
+        
+        复用捕获会话中的DC和位图，返回的数组直接映射位图内存，
+        下一次捕获时会被覆盖
+        """
         try:
-            # 获取窗口位置和大小
-            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-            width = right - left
-            height = bottom - top
-
-            # 获取窗口DC
-            hwndDC = win32gui.GetWindowDC(hwnd)
-            mfcDC = win32ui.CreateDCFromHandle(hwndDC)
-            saveDC = mfcDC.CreateCompatibleDC()
-            saveBitMap = win32ui.CreateBitmap()
-            saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
-            saveDC.SelectObject(saveBitMap)
-            
             # 使用PrintWindow捕获窗口内容，使用PW_RENDERFULLCONTENT标志(2)能捕获整个窗口内容
             # 即使窗口被覆盖或最小化
-            result = ctypes.windll.user32.PrintWindow(hwnd, saveDC.GetSafeHdc(), 2)
-            
-            if result == 0:
-                # PrintWindow失败
-                self.clean_dc_resources(saveBitMap, saveDC, mfcDC, hwndDC, hwnd)
-                return None
-            
-            # 获取位图信息
-            bmpinfo = saveBitMap.GetInfo()
-            bmpstr = saveBitMap.GetBitmapBits(True)
-            
-            # 创建PIL图片对象
-            im = Image.frombuffer(
-                'RGB',
-                (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
-                bmpstr, 'raw', 'BGRX', 0, 1
-            )
-            
-            # 清理资源
-            self.clean_dc_resources(saveBitMap, saveDC, mfcDC, hwndDC, hwnd)
-            
-            return im
+            return self.printwindow_session.capture(hwnd, region)
         except Exception as e:
-            print(f"PrintWindow捕获失败: {str(e)}")
+            log(f"PrintWindow捕获失败: {str(e)}", 'ERROR')
             return None
     
-    def clean_dc_resources(self, bitmap, dc, mfcDC, hwndDC, hwnd):
-        """清理DC资源，避免内存泄漏"""
+    def capture_using_printwindow_full(self, hwnd, region=None):
+        """使用PrintWindow捕获整个窗口后切出区域，兼容不支持视口偏移的窗口"""
         try:
-            if bitmap:
-                win32gui.DeleteObject(bitmap.GetHandle())
-            if dc:
-                dc.DeleteDC()
-            if mfcDC:
-                mfcDC.DeleteDC()
-            if hwndDC and hwnd:
-                win32gui.ReleaseDC(hwnd, hwndDC)
+            frame = self.printwindow_full_session.capture(hwnd)
+            if frame is None or region is None:
+                return frame
+            left, top, right, bottom = region
+            return frame[max(0, top):bottom, max(0, left):right]
         except Exception as e:
-            print(f"清理DC资源时出错: {str(e)}")
+            log(f"PrintWindow捕获失败: {str(e)}", 'ERROR')
+            return None
+    
+    def release(self):
+        """释放捕获会话持有的GDI资源"""
+        self.printwindow_session.release()
+        self.dwm_session.release()
+        self.printwindow_full_session.release()
     
-    def capture_using_dwm(self, hwnd):
-        """使用DWM缩略图API捕获窗口内容"""
+    def capture_using_dwm(self, hwnd, region=None):
+        """使用DWM缩略图API捕获窗口内容，region不为None时只传输该区域
+        
+        缩略图只在捕获期间显示，位图在多帧之间复用，返回的数组直接映射位图内存，下一次捕获时会被覆盖
+        """
         if not HAS_DWM_SUPPORT:
             return None
         
         try:
-            # 创建目标DC
-            desk_hwnd = win32gui.GetDesktopWindow()
-            desk_dc = win32gui.GetWindowDC(desk_hwnd)
-            dest_dc = win32ui.CreateDCFromHandle(desk_dc)
-            mem_dc = dest_dc.CreateCompatibleDC()
-            
-            # 获取窗口尺寸
-            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-            width, height = right - left, bottom - top
-            
-            # 创建位图
-            bitmap = win32ui.CreateBitmap()
-            bitmap.CreateCompatibleBitmap(dest_dc, width, height)
-            mem_dc.SelectObject(bitmap)
-            
-            # 注册缩略图
-            thumbnail_id = ctypes.c_ulonglong(0)
-            ret = DWMAPI.DwmRegisterThumbnail(
-                desk_hwnd, hwnd, ctypes.byref(thumbnail_id)
-            )
-            
-            if ret != 0:
-                print(f"DWM注册缩略图失败: {ret}")
-                return None
-            
-            # 设置缩略图属性
-            props = DWM_THUMBNAIL_PROPERTIES()
-            props.dwFlags = DWM_TNP_VISIBLE | DWM_TNP_RECTDESTINATION | DWM_TNP_RECTSOURCE
-            props.fVisible = True
-            
-            # 设置源区域为整个窗口
-            props.rcSource.left = 0
-            props.rcSource.top = 0
-            props.rcSource.right = width
-            props.rcSource.bottom = height
-            
-            # 设置目标位置
-            props.rcDestination.left = 0
-            props.rcDestination.top = 0
-            props.rcDestination.right = width
-            props.rcDestination.bottom = height
-            
-            # 更新缩略图属性
-            ret = DWMAPI.DwmUpdateThumbnailProperties(thumbnail_id, ctypes.byref(props))
-            if ret != 0:
-                print(f"DWM更新缩略图属性失败: {ret}")
-                DWMAPI.DwmUnregisterThumbnail(thumbnail_id)
-                return None
-            
-            # 等待缩略图渲染完成
-            time.sleep(0.1)
-            
-            # 复制到位图
-            mem_dc.BitBlt((0, 0), (width, height), dest_dc, (0, 0), win32con.SRCCOPY)
-            
-            # 取消注册缩略图
-            DWMAPI.DwmUnregisterThumbnail(thumbnail_id)
-            
-            # 获取位图数据
-            bitmap_info = bitmap.GetInfo()
-            bitmap_bits = bitmap.GetBitmapBits(True)
-            
-            # 创建PIL图像
-            image = Image.frombuffer(
-                'RGB',
-                (bitmap_info['bmWidth'], bitmap_info['bmHeight']),
-                bitmap_bits, 'raw', 'BGRX', 0, 1
-            )
-            
-            # 清理资源
-            win32gui.DeleteObject(bitmap.GetHandle())
-            mem_dc.DeleteDC()
-            dest_dc.DeleteDC()
-            win32gui.ReleaseDC(desk_hwnd, desk_dc)
-            
-            return image
-            
+            return self.dwm_session.capture(hwnd, region)
         except Exception as e:
-            print(f"使用DWM捕获窗口失败: {str(e)}")
+            log(f"使用DWM捕获窗口失败: {str(e)}", 'ERROR')
             return None
     
     def toggle_capture_mode(self):
@@ -368,13 +257,14 @@ class WindowCapture:
             return False
             
         # 获取窗口截图
-        image = self.capture_window(self.selected_window)
-        if image is None:
-            print("无法捕获窗口内容")
+        frame = self.capture_window_frame(self.selected_window)
+        if frame is None:
+            log("无法捕获窗口内容", 'WARNING')
             return False
             
-        img_np = np.array(image)
-        img_cv = cv2.cvtColor(img_np, cv2.COLOR_RGB2BGR)
+        # 只在选择区域时用到OpenCV的界面，用到时才导入
+        import cv2
+        img_cv = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
         
         # 创建窗口并选择ROI
         cv2.namedWindow('Select Region', cv2.WINDOW_NORMAL)
@@ -383,9 +273,8 @@ class WindowCapture:
         cv2.destroyAllWindows()
         
         # 释放图像资源
-        del img_np
         del img_cv
-        del image
+        del frame
         gc.collect()  # 强制回收
         
         # 转换ROI格式
@@ -401,7 +290,7 @@ class WindowCapture:
                 print("已保存监控区域设置")
                 return True
             except Exception as e:
-                print(f"保存监控区域失败: {str(e)}")
+                log(f"保存监控区域失败: {str(e)}", 'ERROR')
                 return False
         else:
             print("未选择有效的监控区域，请重试")
@@ -417,7 +306,7 @@ class WindowCapture:
                 return True
             return False
         except Exception as e:
-            print(f"加载监控区域失败: {str(e)}")
+            log(f"加载监控区域失败: {str(e)}", 'ERROR')
             return False
     
     def get_cropped_image(self):
@@ -429,23 +318,25 @@ class WindowCapture:
         # 多次尝试捕获窗口
         max_retries = 3
         for i in range(max_retries):
-            image = self.capture_window(self.selected_window)
-            if image is not None:
+            # 只捕获监控区域，每帧传输的数据量与区域大小成正比
+            with metrics.timer('capture'):
+                frame = self.capture_window_frame(self.selected_window, self.crop_area)
+            if frame is not None:
                 break
-            print(f"捕获失败，重试 ({i+1}/{max_retries})...")
+            log(f"捕获失败，重试 ({i+1}/{max_retries})...", 'WARNING')
             time.sleep(0.5)
         
-        if image is None:
-            print("多次尝试捕获窗口失败")
+        if frame is None:
+            log("多次尝试捕获窗口失败", 'ERROR')
             return None
             
         try:
-            cropped_image = image.crop(self.crop_area)
-            # 释放原始图像资源
-            del image
+            with metrics.timer('crop'):
+                cropped_image = self.frame_to_image(frame)
+            del frame
             return cropped_image
         except Exception as e:
-            print(f"裁剪图像失败: {str(e)}")
+            log(f"裁剪图像失败: {str(e)}", 'ERROR')
             return None
     
     def toggle_window_topmost(self, hwnd):
@@ -458,7 +349,7 @@ class WindowCapture:
             bool: 操作后窗口是否置顶
         """
         if not hwnd or not win32gui.IsWindow(hwnd):
-            print("窗口无效，无法更改置顶状态")
+            log("窗口无效，无法更改置顶状态", 'WARNING')
             return False
             
         # 获取窗口当前样式
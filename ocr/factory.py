@@ -0,0 +1,48 @@
+def get_preprocess_steps(monitor_settings):
+    """从监控设置中读取OCR预处理的步骤开关"""
+    return {
+        'resize': monitor_settings.get('preprocess_resize', True),
+        'binarize': monitor_settings.get('preprocess_binarize', True),
+        'clahe': monitor_settings.get('preprocess_clahe', True),
+    }
+
+
+def create_ocr_processor(monitor_settings, ocr_settings):
+    """根据ocr_backend设置创建OCR处理器，subprocess模式下推理在独立进程中进行
+
+    推理框架在这里才导入，界面和无界面入口都不需要在启动时加载
+
+    Args:
+        monitor_settings: 监控设置字典
+        ocr_settings: OCR引擎的设置字典
+
+    Returns:
+        OCRProcessor或OCRWorkerPool实例
+    """
+    options = {
+        'layout_cache_enabled': monitor_settings.get('layout_cache_enabled', True),
+        'line_cache_size': monitor_settings.get('line_cache_size', 512),
+        'preprocess_steps': get_preprocess_steps(monitor_settings),
+    }
+    if monitor_settings.get('ocr_backend', 'inprocess') == 'subprocess':
+        from ocr.ocr_worker import OCRWorkerPool
+        return OCRWorkerPool(
+            ocr_settings,
+            monitor_settings['confidence_threshold'],
+            monitor_settings.get('memory_threshold', 1800),  # 子进程内存阈值
+            monitor_settings.get('auto_reset_enabled', True),  # 是否自动回收子进程
+            max_calls=monitor_settings.get('worker_max_calls', 5000),
+            max_age=monitor_settings.get('worker_max_age', 3600),
+            workers=monitor_settings.get('ocr_workers', 1),
+            threads_per_worker=monitor_settings.get('ocr_threads_per_worker', 0),
+            **options
+        )
+
+    from ocr.ocr_processor import OCRProcessor
+    return OCRProcessor(
+        ocr_settings,
+        monitor_settings['confidence_threshold'],
+        monitor_settings.get('memory_threshold', 1800),  # 内存阈值，默认1800MB
+        monitor_settings.get('auto_reset_enabled', True),  # 是否启用自动内存重置
+        **options
+    )
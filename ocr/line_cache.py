@@ -0,0 +1,63 @@
+import hashlib
+from collections import OrderedDict
+
+class LineResultCache:
+    """文本行识别结果缓存，按行图像内容的哈希保存识别出的文本和置信度，超出容量时淘汰最久未使用的行"""
+
+    def __init__(self, max_entries=512):
+        """初始化识别结果缓存
+
+        Args:
+            max_entries: 最多缓存的行数，为0时不缓存
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(crop):
+        """计算行图像的内容哈希，图像尺寸也参与哈希"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(crop.shape).encode())
+        digest.update(crop.tobytes())
+        return digest.digest()
+
+    def get(self, key):
+        """查找缓存的识别结果
+
+        Returns:
+            (文本, 置信度)，没有缓存时返回None
+        """
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        """保存识别结果"""
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = result
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def resize(self, max_entries):
+        """修改缓存容量"""
+        self.max_entries = max_entries
+        while len(self.entries) > max(0, max_entries):
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        """清空缓存"""
+        self.entries.clear()
+
+    def get_hit_rate(self):
+        """获取缓存命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
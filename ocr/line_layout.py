@@ -0,0 +1,126 @@
+import numpy as np
+
+class LineLayoutCache:
+    """文本行布局缓存，保存上次检测到的文本行位置，布局未变化时跳过文本检测"""
+
+    def __init__(self, row_tolerance=2, redetect_interval=50, min_confidence=0.6):
+        """初始化布局缓存
+
+        Args:
+            row_tolerance: 行投影允许不一致的行数，超过则认为文本行发生了移动
+            redetect_interval: 每隔多少帧强制重新检测一次
+            min_confidence: 快速识别的平均置信度低于该值时丢弃缓存
+        """
+        self.row_tolerance = row_tolerance
+        self.redetect_interval = redetect_interval
+        self.min_confidence = min_confidence
+        self.layouts = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _ink_mask(self, img_array):
+        """计算文字像素掩码，数量较少的一侧视为文字"""
+        gray = img_array[:, :, 0] if img_array.ndim == 3 else img_array
+        dark = gray < 128
+        if np.count_nonzero(dark) * 2 > dark.size:
+            return ~dark
+        return dark
+
+    def _bands(self, boxes, height):
+        """把文本框按垂直方向合并为行区域[(top, bottom), ...]"""
+        spans = sorted(
+            (max(0, int(min(point[1] for point in box))), min(height, int(np.ceil(max(point[1] for point in box)))))
+            for box in boxes
+        )
+        bands = []
+        for top, bottom in spans:
+            if bottom <= top:
+                continue
+            if bands:
+                last_top, last_bottom = bands[-1]
+                overlap = min(bottom, last_bottom) - max(top, last_top)
+                # 与上一行重叠超过较矮一方的一半时视为同一行
+                if overlap * 2 > min(bottom - top, last_bottom - last_top):
+                    bands[-1] = (min(top, last_top), max(bottom, last_bottom))
+                    continue
+            bands.append((top, bottom))
+        return bands
+
+    def store(self, key, img_array, boxes):
+        """保存一次完整检测的结果
+
+        Args:
+            key: 布局的标识，例如监控目标名称
+            img_array: 执行检测的图像数组
+            boxes: 检测到的文本框列表
+        """
+        bands = self._bands(boxes, img_array.shape[0])
+        if not bands:
+            self.layouts.pop(key, None)
+            return
+        self.layouts[key] = {
+            'shape': img_array.shape,
+            'rows': self._ink_mask(img_array).any(axis=1),
+            'bands': bands,
+            'frames': 0,
+        }
+
+    def lookup(self, key, img_array):
+        """布局未变化时返回各文本行的切片
+
+        Args:
+            key: 布局的标识
+            img_array: 当前帧的图像数组
+
+        Returns:
+            文本行图像列表，需要重新检测时返回None
+        """
+        layout = self.layouts.get(key)
+        if layout is None or layout['shape'] != img_array.shape:
+            self.misses += 1
+            return None
+
+        layout['frames'] += 1
+        if layout['frames'] >= self.redetect_interval:
+            self.misses += 1
+            return None
+
+        # 行投影与检测时不一致，说明文本行移动了
+        ink = self._ink_mask(img_array)
+        rows = ink.any(axis=1)
+        if np.count_nonzero(rows != layout['rows']) > self.row_tolerance:
+            self.misses += 1
+            return None
+
+        width = img_array.shape[1]
+        crops = []
+        for top, bottom in layout['bands']:
+            columns = np.flatnonzero(ink[top:bottom].any(axis=0))
+            if len(columns) == 0:
+                continue
+            # 水平范围按当前帧重新计算，文本长度变化时不会被截断
+            padding = (bottom - top) // 2
+            left = max(0, columns[0] - padding)
+            right = min(width, columns[-1] + 1 + padding)
+            crops.append(img_array[top:bottom, left:right])
+
+        self.hits += 1
+        return crops
+
+    def check_confidence(self, key, confidences):
+        """快速识别结果置信度过低时丢弃缓存，下一帧重新检测"""
+        if confidences and sum(confidences) / len(confidences) < self.min_confidence:
+            self.invalidate(key)
+
+    def invalidate(self, key=None):
+        """丢弃指定布局，key为None时丢弃全部"""
+        if key is None:
+            self.layouts.clear()
+        else:
+            self.layouts.pop(key, None)
+
+    def get_hit_rate(self):
+        """获取缓存命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
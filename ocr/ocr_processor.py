@@ -1,16 +1,24 @@
 import numpy as np
 import cv2
-from paddleocr import PaddleOCR
 import gc
 import os
 import time
+import threading
 import psutil
-import paddle
+from ocr.line_layout import LineLayoutCache
+from ocr.line_cache import LineResultCache
+from ocr.preprocess import ImagePreprocessor
+from metrics import metrics
+from utils import log
 
 class OCRProcessor:
     """OCR处理类，封装PaddleOCR的功能"""
     
-    def __init__(self, ocr_settings, confidence_threshold=0.8, memory_threshold=1800, auto_reset_enabled=True):
+    # 可以同时调用recognize_batch的线程数，引擎不是线程安全的
+    worker_count = 1
+    
+    def __init__(self, ocr_settings, confidence_threshold=0.8, memory_threshold=1800, auto_reset_enabled=True,
+                 layout_cache_enabled=False, line_cache_size=0, preprocess_steps=None):
         """初始化OCR处理器
         
         Args:
@@ -18,16 +26,36 @@ class OCRProcessor:
             confidence_threshold: 置信度阈值
             memory_threshold: 内存阈值，单位MB
             auto_reset_enabled: 是否启用自动内存重置
+            layout_cache_enabled: 是否缓存文本行布局，布局未变化时只执行文字识别
+            line_cache_size: 识别结果缓存的行数，已识别过的行不再推理，为0时不缓存
+            preprocess_steps: 预处理步骤开关{'resize', 'binarize', 'clahe'}，为None时全部启用
         """
         # 基础设置
         self.ocr_settings = ocr_settings
         self.confidence_threshold = confidence_threshold
         self.ocr = None
         
+        # 备用引擎：重置时在后台创建新引擎，就绪后在两次识别之间替换，识别不会中断
+        self.standby_ocr = None
+        self.standby_thread = None
+        self.engine_lock = threading.Lock()
+        self.engine_generation = 0  # 每次释放引擎时加一，丢弃过时的备用引擎
+        self.engine_resets = 0
+        
         # 内存阈值设置
         self.memory_threshold = memory_threshold * 1024 * 1024  # 转换为字节
         self.auto_reset_enabled = auto_reset_enabled
         
+        # 文本行布局缓存，聊天框的行高和行位置很规整，检测结果可以复用
+        self.layout_cache_enabled = layout_cache_enabled
+        self.layout_cache = LineLayoutCache()
+        
+        # 文本行识别结果缓存，聊天行在滚出画面前会被反复识别
+        self.line_cache = LineResultCache(line_cache_size)
+        
+        # 预处理缓冲区在各帧之间复用
+        self.preprocessor = ImagePreprocessor(preprocess_steps)
+        
         # 优化设置
         self.default_rec_model = None
         self.default_det_model = None
@@ -46,17 +74,43 @@ class OCRProcessor:
         self.reset_threshold = 50  # 每50次请求或内存增加超过200MB重置引擎
         self.memory_increase_threshold = 200 * 1024 * 1024  # 200MB
     
-    def update_settings(self, memory_threshold=None, auto_reset_enabled=None):
+    def update_settings(self, memory_threshold=None, auto_reset_enabled=None, layout_cache_enabled=None,
+                        line_cache_size=None, preprocess_steps=None):
         """更新设置
         
         Args:
             memory_threshold: 内存阈值，单位MB
             auto_reset_enabled: 是否启用自动内存重置
+            layout_cache_enabled: 是否缓存文本行布局
+            line_cache_size: 识别结果缓存的行数
+            preprocess_steps: 预处理步骤开关
         """
         if memory_threshold is not None:
             self.memory_threshold = memory_threshold * 1024 * 1024
         if auto_reset_enabled is not None:
             self.auto_reset_enabled = auto_reset_enabled
+        if layout_cache_enabled is not None:
+            self.layout_cache_enabled = layout_cache_enabled
+            if not layout_cache_enabled:
+                self.layout_cache.invalidate()
+        if line_cache_size is not None:
+            self.line_cache.resize(line_cache_size)
+        if preprocess_steps is not None:
+            self.preprocessor.update_steps(preprocess_steps)
+        
+    def get_stats(self):
+        """获取缓存命中和引擎重置的统计信息"""
+        return {
+            'layout_cache_enabled': self.layout_cache_enabled,
+            'layout_hits': self.layout_cache.hits,
+            'layout_misses': self.layout_cache.misses,
+            'line_cache_size': self.line_cache.max_entries,
+            'line_hits': self.line_cache.hits,
+            'line_misses': self.line_cache.misses,
+            'line_entries': len(self.line_cache.entries),
+            'engine_resets': self.engine_resets,
+            'preprocess_allocations': self.preprocessor.allocations,
+        }
         
     def get_process_memory(self):
         """获取当前进程内存占用"""
@@ -74,56 +128,123 @@ class OCRProcessor:
             # 清理可能残留的缓存
             self._clean_paddle_cache()
             
-            # 基于使用场景对OCR设置进行优化
-            optimized_settings = self.ocr_settings.copy()
-            
-            # 关闭不必要的功能
-            optimized_settings.update({
-                'use_angle_cls': False,     # 不进行方向分类
-                'det_db_unclip_ratio': 1.6, # 减小文本检测区域，提高速度
-                'rec_batch_num': 6,         # 减小批处理数量
-                'use_mp': False,            # 不使用多进程
-                'total_process_num': 1,     # 单进程
-                'cls_model_dir': None,      # 不加载方向分类模型
-                'rec_char_dict_path': None, # 使用默认字典
-                'use_tensorrt': False,      # 不使用TensorRT
-                'enable_mkldnn': True,      # 启用MKL加速
-                'det_limit_type': 'max',    # 限制最大边长而非最小边长
-            })
-            
-            # 轻量级检测器设置
-            if 'det_limit_side_len' not in optimized_settings:
-                optimized_settings['det_limit_side_len'] = 960  # 限制最大检测尺寸
-            
-            self.ocr = PaddleOCR(**optimized_settings)
+            self.ocr = self._create_engine()
             print("OCR引擎初始化成功")
             
             # 保存初始内存占用
-            self.last_process_memory = self.get_process_memory()
-            self.call_count = 0
-            self.last_reset_time = time.time()
+            self._reset_memory_baseline()
             
             # 强制进行一次内存回收
             self._clean_paddle_cache()
             gc.collect()
             return True
         except Exception as e:
-            print(f"OCR引擎初始化失败: {str(e)}")
+            log(f"OCR引擎初始化失败: {str(e)}", 'ERROR')
             return False
     
+    def _reset_memory_baseline(self):
+        """引擎创建或替换后重新记录内存占用和调用次数"""
+        self.last_process_memory = self.get_process_memory()
+        self.call_count = 0
+        self.last_reset_time = time.time()
+    
+    def _create_engine(self):
+        """创建PaddleOCR实例"""
+        # 推理框架导入需要数秒，创建引擎时才导入，程序启动时不加载
+        from paddleocr import PaddleOCR
+        
+        # 基于使用场景对OCR设置进行优化
+        optimized_settings = self.ocr_settings.copy()
+        
+        # 关闭不必要的功能
+        optimized_settings.update({
+            'use_angle_cls': False,     # 不进行方向分类
+            'det_db_unclip_ratio': 1.6, # 减小文本检测区域，提高速度
+            'rec_batch_num': self.ocr_settings.get('rec_batch_num', 6),  # 识别批处理数量，批量识别多个区域时可调大
+            'use_mp': False,            # 不使用多进程
+            'total_process_num': 1,     # 单进程
+            'cls_model_dir': None,      # 不加载方向分类模型
+            'rec_char_dict_path': None, # 使用默认字典
+            'use_tensorrt': False,      # 不使用TensorRT
+            'enable_mkldnn': True,      # 启用MKL加速
+            'det_limit_type': 'max',    # 限制最大边长而非最小边长
+        })
+        
+        # 轻量级检测器设置
+        if 'det_limit_side_len' not in optimized_settings:
+            optimized_settings['det_limit_side_len'] = 960  # 限制最大检测尺寸
+        
+        return PaddleOCR(**optimized_settings)
+    
     def _clean_paddle_cache(self):
         """清理Paddle框架缓存"""
         try:
+            import paddle
             # 清理Paddle的缓存
             paddle.device.cuda.empty_cache()
             # 清理CPU内存缓存
             if hasattr(paddle, 'fluid') and hasattr(paddle.fluid, 'core') and hasattr(paddle.fluid.core, 'garbage_collect_memory'):
                 paddle.fluid.core.garbage_collect_memory()
         except Exception as e:
-            print(f"清理Paddle缓存出错 (可忽略): {e}")
+            log(f"清理Paddle缓存出错 (可忽略): {e}", 'WARNING')
+    
+    def request_reset(self, reason=None):
+        """在后台创建新的OCR引擎，就绪后在两次识别之间替换当前引擎
+        
+        Args:
+            reason: 打印的重置原因
+            
+        Returns:
+            bool: 是否开始创建备用引擎，已经在创建时返回False
+        """
+        if self.ocr is None:
+            return False
+        if self.standby_thread is not None and self.standby_thread.is_alive():
+            return False
+        if reason:
+            print(reason)
+        print("正在后台创建备用OCR引擎...")
+        self.standby_thread = threading.Thread(
+            target=self._build_standby, args=(self.engine_generation,), name="ocr-standby", daemon=True
+        )
+        self.standby_thread.start()
+        return True
+    
+    def _build_standby(self, generation):
+        """后台线程：创建备用引擎"""
+        try:
+            engine = self._create_engine()
+        except Exception as e:
+            log(f"备用OCR引擎创建失败: {str(e)}", 'ERROR')
+            return
+        with self.engine_lock:
+            # 创建期间引擎被释放过，备用引擎已经过时
+            if generation != self.engine_generation:
+                return
+            self.standby_ocr = engine
+        print("备用OCR引擎已就绪")
+    
+    def _swap_standby(self):
+        """用就绪的备用引擎替换当前引擎，只在识别线程的两次识别之间调用"""
+        with self.engine_lock:
+            engine, self.standby_ocr = self.standby_ocr, None
+        if engine is None:
+            return False
+        old_engine, self.ocr = self.ocr, engine
+        del old_engine
+        self._clean_paddle_cache()
+        gc.collect()
+        self._reset_memory_baseline()
+        self.engine_resets += 1
+        print("已切换到新的OCR引擎")
+        return True
     
     def release(self):
         """释放OCR引擎资源"""
+        with self.engine_lock:
+            self.engine_generation += 1
+            self.standby_ocr = None
+        self.preprocessor.clear()
         if self.ocr:
             # 释放OCR引擎
             self.ocr = None
@@ -148,120 +269,165 @@ class OCRProcessor:
         memory_increase = current_memory - self.last_process_memory
         time_elapsed = time.time() - self.last_reset_time
         
-        # 检查是否超过配置的内存阈值
+        # 检查是否超过配置的内存阈值，新引擎在后台创建，当前引擎继续识别
         if current_memory > self.memory_threshold:
-            print(f"内存占用({current_memory/1024/1024:.2f}MB)超过阈值({self.memory_threshold/1024/1024:.2f}MB)，正在重置OCR引擎...")
-            self.release()
-            time.sleep(0.5)  # 短暂暂停，等待资源释放
-            self.initialize()
-            return True
+            return self.request_reset(
+                f"内存占用({current_memory/1024/1024:.2f}MB)超过阈值({self.memory_threshold/1024/1024:.2f}MB)，正在重置OCR引擎..."
+            )
         
         # 检查内存增长和调用次数
         elif (memory_increase > self.memory_increase_threshold and time_elapsed > 60) or \
              (self.call_count >= self.reset_threshold and time_elapsed > 120):
-            print(f"内存占用增加: {memory_increase/1024/1024:.2f}MB, 调用次数: {self.call_count}")
-            print("重置OCR引擎以释放内存...")
-            self.release()
-            time.sleep(0.5)  # 短暂暂停，等待资源释放
-            self.initialize()
-            return True
+            return self.request_reset(
+                f"内存占用增加: {memory_increase/1024/1024:.2f}MB, 调用次数: {self.call_count}，重置OCR引擎以释放内存..."
+            )
             
         return False
     
-    def preprocess_image(self, image):
+    def preprocess_image(self, image, slot=0):
         """预处理图像以提高OCR精度
         
         Args:
-            image: PIL图像对象
+            image: PIL图像对象或BGRX数组
+            slot: 预处理缓冲区槽位，同时使用的多幅图像需要不同的槽位
             
         Returns:
-            处理后的numpy数组
+            处理后的numpy数组，指向预处理缓冲区
+        """
+        with metrics.timer('preprocess'):
+            return self.preprocessor.process(image, slot)
+    
+    def _ensure_engine(self):
+        """确保OCR引擎可用，必要时检查内存并在后台准备新引擎"""
+        # 备用引擎就绪时先替换
+        if self.standby_ocr is not None:
+            self._swap_standby()
+        
+        if not self.ocr:
+            if not self.initialize():
+                return False
+        
+        # 检查内存占用并在需要时重置引擎
+        self._check_memory_and_reset_if_needed()
+        return True
+    
+    def _ocr_lines(self, img_array):
+        """对预处理后的图像执行OCR
+        
+        Returns:
+            [(文本框, 文本, 置信度), ...]
+        """
+        # 检测和识别分开执行，识别过的行可以直接使用缓存结果
+        with metrics.timer('detection'):
+            dt_boxes, _ = self.ocr.text_detector(img_array)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return []
+        
+        boxes = []
+        crops = []
+        height, width = img_array.shape[:2]
+        for box in self._sort_boxes(dt_boxes):
+            # 不进行方向分类，文本框都是水平的，直接按外接矩形裁剪
+            left = max(0, int(np.floor(box[:, 0].min())))
+            right = min(width, int(np.ceil(box[:, 0].max())))
+            top = max(0, int(np.floor(box[:, 1].min())))
+            bottom = min(height, int(np.ceil(box[:, 1].max())))
+            if right - left < 2 or bottom - top < 2:
+                continue
+            boxes.append(box.tolist())
+            crops.append(img_array[top:bottom, left:right])
+        
+        results = self._recognize_crops(crops)
+        return [(box, text, confidence) for box, (text, confidence) in zip(boxes, results)]
+    
+    def _sort_boxes(self, dt_boxes):
+        """按从上到下、从左到右的顺序排列文本框，与PaddleOCR的排序规则一致"""
+        boxes = sorted(dt_boxes, key=lambda box: (box[0][1], box[0][0]))
+        for i in range(len(boxes) - 1):
+            for j in range(i, -1, -1):
+                if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                    boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+                else:
+                    break
+        return boxes
+    
+    def _recognize_crops(self, crops):
+        """跳过文本检测，直接识别文本行切片，已缓存的行不再推理
+        
+        Returns:
+            [(文本, 置信度), ...]
         """
-        # 降低图像分辨率以提高性能
-        width, height = image.size
-        # 如果图像过大，缩小它
-        max_dimension = 1024  # 最大尺寸限制
-        if width > max_dimension or height > max_dimension:
-            if width > height:
-                new_width = max_dimension
-                new_height = int(height * (max_dimension / width))
+        if not crops:
+            return []
+        if self.line_cache.max_entries <= 0:
+            with metrics.timer('recognition'):
+                rec_res, _ = self.ocr.text_recognizer(crops)
+            return [(text, confidence) for text, confidence in rec_res]
+        
+        results = [None] * len(crops)
+        missing = []
+        for index, crop in enumerate(crops):
+            key = self.line_cache.key(crop)
+            cached = self.line_cache.get(key)
+            if cached is None:
+                missing.append((index, key))
             else:
-                new_height = max_dimension
-                new_width = int(width * (max_dimension / height))
-            image = image.resize((new_width, new_height), image.LANCZOS)
+                results[index] = cached
         
-        img_array = np.array(image)
+        if missing:
+            with metrics.timer('recognition'):
+                rec_res, _ = self.ocr.text_recognizer([crops[index] for index, _ in missing])
+            for (index, key), (text, confidence) in zip(missing, rec_res):
+                results[index] = (text, confidence)
+                self.line_cache.put(key, (text, confidence))
+        return results
+    
+    def _lookup_layout(self, layout_key, img_array):
+        """布局缓存可用时返回文本行切片，否则返回None"""
+        if not self.layout_cache_enabled or layout_key is None:
+            return None
+        return self.layout_cache.lookup(layout_key, img_array)
+    
+    def _read_lines(self, img_array, layout_key=None):
+        """识别单幅图像，布局未变化时只执行文字识别
         
-        # 针对中文文本优化的预处理
-        if len(img_array.shape) == 3 and img_array.shape[2] == 3:
-            # 转为灰度图
-            img_gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            
-            # 计算图像的平均亮度，动态选择处理方法
-            mean_brightness = np.mean(img_gray)
-            
-            if mean_brightness > 180:  # 亮图像
-                # OTSU二值化
-                _, img_binary = cv2.threshold(img_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            elif mean_brightness < 100:  # 暗图像
-                # 先增强对比度
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-                enhanced = clahe.apply(img_gray)
-                # 再二值化
-                _, img_binary = cv2.threshold(enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-                # 释放临时变量
-                del enhanced
-            else:  # 正常亮度图像
-                _, img_binary = cv2.threshold(img_gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # 转回三通道图像
-            img_array = cv2.cvtColor(img_binary, cv2.COLOR_GRAY2RGB)
-            
-            # 释放临时变量
-            del img_gray
-            del img_binary
-            
-        return img_array
+        Returns:
+            [(文本框, 文本, 置信度), ...]，快速识别时文本框为None
+        """
+        crops = self._lookup_layout(layout_key, img_array)
+        if crops is not None:
+            results = self._recognize_crops(crops)
+            self.layout_cache.check_confidence(layout_key, [confidence for _, confidence in results])
+            return [(None, text, confidence) for text, confidence in results]
+        
+        lines = self._ocr_lines(img_array)
+        if self.layout_cache_enabled and layout_key is not None:
+            self.layout_cache.store(layout_key, img_array, [box for box, _, _ in lines])
+        return lines
     
-    def recognize_text(self, image):
+    def recognize_text(self, image, layout_key=None):
         """识别图像中的文字
         
         Args:
-            image: PIL图像对象
+            image: PIL图像对象或BGRX数组
+            layout_key: 文本行布局缓存的标识，为None时不使用缓存
             
         Returns:
-            识别出的文本字符串
+            识别出的文本字符串，识别失败时返回None，没有文字时返回空字符串
         """
-        if not self.ocr:
-            if not self.initialize():
-                return ""
-        
-        # 检查内存占用并在需要时重置引擎
-        engine_reset = self._check_memory_and_reset_if_needed()
-        if engine_reset and not self.ocr:
-            if not self.initialize():
-                return ""
+        if not self._ensure_engine():
+            return None
                 
         try:
             # 预处理图像
             img_array = self.preprocess_image(image)
             
-            # 执行OCR识别，禁用方向分类
-            result = self.ocr.ocr(img_array, cls=False)
+            lines = self._read_lines(img_array, layout_key)
             
             # 释放数组资源
             del img_array
             
-            if not result or not result[0]:
-                return ""
-            
-            texts = []
-            for line in result[0]:
-                text = line[1][0]
-                confidence = line[1][1]
-                if confidence > self.confidence_threshold:
-                    texts.append(text)
-            
+            texts = [text for _, text, confidence in lines if confidence > self.confidence_threshold]
             final_text = "\n".join(texts)
             
             # 更新最后处理的内存占用
@@ -270,7 +436,135 @@ class OCRProcessor:
             return final_text
             
         except Exception as e:
-            print(f"OCR识别出错: {str(e)}")
+            log(f"OCR识别出错: {str(e)}", 'ERROR')
+            # 出错时重置引擎
+            self.release()
+            return None
+    
+    def _pack_images(self, arrays, gap=32):
+        """把多幅图像逐行拼接到画布上，每张画布不超过检测的最大边长
+        
+        检测时超过det_limit_side_len的画布会被整体缩小，拼接的图像越多文字越小，
+        所以画布装满后另开一张，本身就超过限制的图像单独检测
+        
+        Args:
+            arrays: 预处理后的图像数组列表
+            gap: 图像之间的间隔像素
+            
+        Returns:
+            [(画布, [(图像序号, x, y, 宽度, 高度), ...]), ...]
+        """
+        limit = self.ocr_settings.get('det_limit_side_len', 960)
+        arrays = [np.dstack([a] * 3) if a.ndim == 2 else a[:, :, :3] for a in arrays]
+        
+        layouts = []
+        current = []
+        x = y = row_height = 0
+        for index, array in enumerate(arrays):
+            height, width = array.shape[:2]
+            if width > limit or height > limit:
+                layouts.append([(index, 0, 0, width, height)])
+                continue
+            # 当前行放不下时换行，画布放不下时另开一张
+            if current and x + width > limit:
+                x, y, row_height = 0, y + row_height + gap, 0
+            if current and y + height > limit:
+                layouts.append(current)
+                current = []
+                x = y = row_height = 0
+            current.append((index, x, y, width, height))
+            x += width + gap
+            row_height = max(row_height, height)
+        if current:
+            layouts.append(current)
+        
+        canvases = []
+        for cells in layouts:
+            canvas_width = max(x + width for _, x, _, width, _ in cells)
+            canvas_height = max(y + height for _, _, y, _, height in cells)
+            canvas = np.full((canvas_height, canvas_width, 3), 255, dtype=np.uint8)
+            for index, x, y, width, height in cells:
+                canvas[y:y + height, x:x + width] = arrays[index]
+            canvases.append((canvas, cells))
+        return canvases
+    
+    def recognize_batch(self, images, layout_keys=None):
+        """一次识别多幅图像，拼接后批量检测，识别按rec_batch_num批量进行
+        
+        布局未变化的图像跳过检测，直接识别缓存的文本行
+        
+        Args:
+            images: PIL图像对象或BGRX数组的列表
+            layout_keys: 与images一一对应的布局缓存标识，为None时不使用缓存
+            
+        Returns:
+            与images一一对应的文本字符串列表，识别失败的图像对应None
+        """
+        if not images:
+            return []
+        if not self._ensure_engine():
+            return [None] * len(images)
+        
+        keys = layout_keys or [None] * len(images)
+        try:
+            # 每幅图像使用各自的缓冲区槽位
+            arrays = [self.preprocess_image(image, slot) for slot, image in enumerate(images)]
+            texts = [[] for _ in images]
+            
+            # 布局未变化的图像：所有文本行切片合并为一次识别
+            cached = []
+            pending = []
+            for index, array in enumerate(arrays):
+                crops = self._lookup_layout(keys[index], array)
+                if crops is None:
+                    pending.append(index)
+                else:
+                    cached.append((index, crops))
+            if cached:
+                results = self._recognize_crops([crop for _, crops in cached for crop in crops])
+                offset = 0
+                for index, crops in cached:
+                    part = results[offset:offset + len(crops)]
+                    offset += len(crops)
+                    self.layout_cache.check_confidence(keys[index], [confidence for _, confidence in part])
+                    texts[index] = [text for text, confidence in part if confidence > self.confidence_threshold]
+            
+            # 其余图像拼接后执行完整检测，画布不超过检测的最大边长
+            if len(pending) == 1:
+                index = pending[0]
+                lines = self._read_lines(arrays[index], keys[index])
+                texts[index] = [text for _, text, confidence in lines if confidence > self.confidence_threshold]
+            elif pending:
+                for canvas, cells in self._pack_images([arrays[index] for index in pending]):
+                    lines = self._ocr_lines(canvas)
+                    del canvas
+                    
+                    # 按文本框中心所在的格子把结果分配回各自的图像
+                    boxes = [[] for _ in cells]
+                    for box, text, confidence in lines:
+                        center_x = sum(point[0] for point in box) / len(box)
+                        center_y = sum(point[1] for point in box) / len(box)
+                        for cell, (_, x, y, width, height) in enumerate(cells):
+                            if x <= center_x < x + width and y <= center_y < y + height:
+                                boxes[cell].append([(point[0] - x, point[1] - y) for point in box])
+                                if confidence > self.confidence_threshold:
+                                    texts[pending[cells[cell][0]]].append(text)
+                                break
+                    
+                    if self.layout_cache_enabled:
+                        for cell, (position, _, _, _, _) in enumerate(cells):
+                            index = pending[position]
+                            if keys[index] is not None:
+                                self.layout_cache.store(keys[index], arrays[index], boxes[cell])
+            del arrays
+            
+            # 更新最后处理的内存占用
+            self.last_process_memory = self.get_process_memory()
+            
+            return ["\n".join(lines_of_image) for lines_of_image in texts]
+            
+        except Exception as e:
+            log(f"OCR批量识别出错: {str(e)}", 'ERROR')
             # 出错时重置引擎
             self.release()
-            return "" 
\ No newline at end of file
+            return [None] * len(images)
@@ -0,0 +1,627 @@
+import os
+import threading
+import time
+import zlib
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from metrics import metrics
+from utils import log
+
+def _worker_main(conn, ocr_settings, processor_options):
+    """OCR子进程入口：创建OCR引擎，循环处理主进程发来的请求
+
+    Args:
+        conn: 与主进程通信的Pipe连接
+        ocr_settings: OCR引擎的设置字典
+        processor_options: 传给OCRProcessor的其他参数
+    """
+    # 只在子进程中导入Paddle，主进程不加载推理框架
+    from ocr.ocr_processor import OCRProcessor
+    # 子进程中记录的阶段耗时随结果交给主进程
+    metrics.forward = True
+    processor = OCRProcessor(ocr_settings, **processor_options)
+    if not processor.initialize():
+        conn.send(('error', "OCR引擎初始化失败"))
+        return
+    conn.send(('ready', os.getpid()))
+
+    shm = None
+    try:
+        while True:
+            try:
+                request = conn.recv()
+            except EOFError:
+                break
+            command = request[0]
+            if command == 'stop':
+                break
+            try:
+                if command == 'ping':
+                    conn.send(('ok', None, processor.get_process_memory(), processor.get_stats()))
+                elif command == 'settings':
+                    processor.update_settings(**request[1])
+                elif command == 'recognize':
+                    _, shm_name, specs, layout_keys = request
+                    if shm is None or shm.name != shm_name:
+                        if shm is not None:
+                            shm.close()
+                        shm = shared_memory.SharedMemory(name=shm_name)
+                    # 预处理直接读取共享内存中的数组，不再构造PIL图像
+                    images = [np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset) for offset, shape in specs]
+                    texts = processor.recognize_batch(images, layout_keys)
+                    del images
+                    stats = dict(processor.get_stats(), samples=metrics.take_pending())
+                    conn.send(('ok', texts, processor.get_process_memory(), stats))
+            except Exception as e:
+                conn.send(('error', str(e)))
+    finally:
+        if shm is not None:
+            shm.close()
+        processor.release()
+
+
+class OCRWorker:
+    """OCR子进程句柄，图像通过共享内存传给子进程，文本通过Pipe返回"""
+
+    def __init__(self, ocr_settings, processor_options, context=None):
+        """启动OCR子进程
+
+        Args:
+            ocr_settings: OCR引擎的设置字典
+            processor_options: 传给OCRProcessor的其他参数
+            context: multiprocessing上下文，默认使用spawn
+        """
+        context = context or multiprocessing.get_context('spawn')
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, ocr_settings, processor_options),
+            name="ocr-worker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        self.shm = None
+        self.ready = False
+        self.failed = False
+        self.busy = False
+        self.pid = None
+        self.started_at = time.time()
+        self.calls = 0
+        self.rss = 0
+        self.stats = {}
+
+    def poll_ready(self, timeout=0):
+        """检查子进程是否已经加载好模型
+
+        Args:
+            timeout: 最多等待的秒数
+
+        Returns:
+            bool: 是否就绪
+        """
+        if self.ready or self.failed:
+            return self.ready
+        try:
+            if self.conn.poll(timeout):
+                message = self.conn.recv()
+                if message[0] == 'ready':
+                    self.ready = True
+                    self.pid = message[1]
+                else:
+                    self.failed = True
+                    log(f"OCR子进程启动失败: {message[1]}", 'ERROR')
+            elif not self.process.is_alive():
+                self.failed = True
+                log("OCR子进程意外退出", 'ERROR')
+        except (EOFError, OSError):
+            self.failed = True
+            log("OCR子进程意外退出", 'ERROR')
+        return self.ready
+
+    def is_alive(self):
+        """子进程是否仍在运行"""
+        return not self.failed and self.process.is_alive()
+
+    def _write_images(self, images):
+        """把图像写入共享内存，容量不足时重新分配
+
+        Returns:
+            [(偏移, 形状), ...]
+        """
+        arrays = [
+            image if isinstance(image, np.ndarray) else np.asarray(image if image.mode == 'RGB' else image.convert('RGB'))
+            for image in images
+        ]
+        total = sum(array.nbytes for array in arrays)
+        if self.shm is None or self.shm.size < total:
+            self._release_buffer()
+            # 按2的幂分配，避免图像尺寸变化时频繁重新分配
+            size = 1 << max(20, (total - 1).bit_length())
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+
+        specs = []
+        offset = 0
+        for array in arrays:
+            view = np.ndarray(array.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset)
+            view[...] = array
+            del view
+            specs.append((offset, array.shape))
+            offset += array.nbytes
+        return specs
+
+    def submit(self, images, layout_keys=None):
+        """发送识别请求，不等待结果"""
+        specs = self._write_images(images)
+        self.conn.send(('recognize', self.shm.name, specs, layout_keys))
+        self.busy = True
+
+    def collect(self, timeout):
+        """等待submit或ping的结果
+
+        Returns:
+            识别出的文本列表，ping时为None
+
+        Raises:
+            TimeoutError: 子进程在timeout秒内没有响应
+            RuntimeError: 子进程返回错误或已经退出
+        """
+        try:
+            if not self.conn.poll(timeout):
+                raise TimeoutError("OCR子进程响应超时")
+            message = self.conn.recv()
+        except (EOFError, OSError):
+            self.failed = True
+            raise RuntimeError("OCR子进程意外退出")
+        finally:
+            self.busy = False
+        if message[0] != 'ok':
+            raise RuntimeError(message[1])
+        _, texts, self.rss, self.stats = message
+        metrics.merge(self.stats.pop('samples', ()))
+        if texts is not None:
+            self.calls += 1
+        return texts
+
+    def recognize(self, images, layout_keys=None, timeout=30.0):
+        """识别多幅图像，返回与images一一对应的文本列表"""
+        self.submit(images, layout_keys)
+        return self.collect(timeout)
+
+    def ping(self, timeout=5.0):
+        """健康检查，同时更新子进程的内存占用
+
+        Returns:
+            bool: 子进程是否在timeout秒内响应
+        """
+        try:
+            self.conn.send(('ping',))
+            self.busy = True
+            self.collect(timeout)
+            return True
+        except Exception:
+            return False
+
+    def update_settings(self, **settings):
+        """更新子进程中OCRProcessor的设置"""
+        try:
+            self.conn.send(('settings', settings))
+        except (OSError, ValueError):
+            pass
+
+    def _release_buffer(self):
+        if self.shm is not None:
+            self.shm.close()
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+            self.shm = None
+
+    def stop(self, timeout=2.0):
+        """通知子进程退出，超时后强制结束"""
+        try:
+            self.conn.send(('stop',))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout)
+        self.conn.close()
+        self._release_buffer()
+
+
+class WorkerSlot:
+    """进程池中的一个位置，保存当前子进程和正在启动的备用子进程"""
+
+    def __init__(self, index):
+        self.index = index
+        self.worker = None
+        self.standby = None
+        # 是否有线程正在使用这个位置的子进程
+        self.in_use = False
+        # 还没有发给子进程的设置，下次识别前发送
+        self.pending_settings = {}
+
+
+class OCRWorkerPool:
+    """OCR进程池，接口与OCRProcessor一致，可以被多个线程同时调用
+
+    推理在子进程中进行，Paddle分配的内存不会留在主进程。一批图像会分给多个子进程并行识别，结果按原顺序返回。
+    同一个布局缓存标识优先交给同一个位置的子进程，子进程中的布局缓存和识别结果缓存可以持续命中，
+    这个位置正在识别时交给其他空闲的子进程，不排队等待。
+    子进程的内存、调用次数或运行时间超过限制时，先启动备用子进程，加载好模型后再替换并结束旧进程，
+    结束的进程占用的内存由系统完全回收。空闲的子进程定期做健康检查，无响应的会被重新启动。
+    """
+
+    def __init__(self, ocr_settings, confidence_threshold=0.8, memory_threshold=1800, auto_reset_enabled=True,
+                 layout_cache_enabled=False, line_cache_size=0, preprocess_steps=None, workers=1, threads_per_worker=0,
+                 max_calls=5000, max_age=3600, timeout=30.0, start_timeout=120.0, health_interval=30.0):
+        """初始化进程池
+
+        Args:
+            ocr_settings: OCR引擎的设置字典
+            confidence_threshold: 置信度阈值
+            memory_threshold: 每个子进程的内存阈值，单位MB
+            auto_reset_enabled: 是否启用自动回收子进程
+            layout_cache_enabled: 是否缓存文本行布局
+            line_cache_size: 识别结果缓存的行数
+            preprocess_steps: 预处理步骤开关
+            workers: 子进程数量
+            threads_per_worker: 每个子进程的MKL-DNN计算线程数，为0时按CPU核数平均分配
+            max_calls: 子进程最多处理的请求数
+            max_age: 子进程最长运行时间(秒)
+            timeout: 等待识别结果的超时时间(秒)
+            start_timeout: 等待子进程加载模型的超时时间(秒)
+            health_interval: 空闲子进程的健康检查间隔(秒)
+        """
+        self.worker_count = max(1, workers)
+        threads = threads_per_worker or max(1, (os.cpu_count() or 1) // self.worker_count)
+        self.ocr_settings = dict(ocr_settings, cpu_threads=threads)
+        self.processor_options = {
+            'confidence_threshold': confidence_threshold,
+            'auto_reset_enabled': False,  # 由进程池回收整个进程
+            'layout_cache_enabled': layout_cache_enabled,
+            'line_cache_size': line_cache_size,
+            'preprocess_steps': preprocess_steps,
+        }
+        self.memory_threshold = memory_threshold * 1024 * 1024
+        self.auto_reset_enabled = auto_reset_enabled
+        self.max_calls = max_calls
+        self.max_age = max_age
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.health_interval = health_interval
+        self.context = multiprocessing.get_context('spawn')
+
+        self.slots = []
+        self.lock = threading.Lock()
+        # 位置被归还、进程池启动结束或被释放时通知等待的线程
+        self.condition = threading.Condition(self.lock)
+        self.starting = False
+        self.last_health_check = time.monotonic()
+        self.engine_resets = 0
+
+    def _spawn(self):
+        return OCRWorker(self.ocr_settings, dict(self.processor_options), self.context)
+
+    def initialize(self):
+        """启动所有子进程并等待模型加载完成，各子进程同时加载
+
+        等待加载时不持有锁，加载期间可以随时释放进程池，其他线程调用时等待启动结束
+
+        Returns:
+            bool: 是否至少有一个子进程可用
+        """
+        with self.lock:
+            while self.starting:
+                self.condition.wait()
+            if self.slots:
+                return any(slot.worker is not None for slot in self.slots)
+            print(f"启动 {self.worker_count} 个OCR子进程，每个使用 {self.ocr_settings['cpu_threads']} 个计算线程...")
+            slots = [WorkerSlot(index) for index in range(self.worker_count)]
+            for slot in slots:
+                slot.standby = self._spawn()
+            self.slots = slots
+            self.starting = True
+
+        try:
+            deadline = time.monotonic() + self.start_timeout
+            for slot in slots:
+                worker = slot.standby
+                # 分段等待，进程池被释放时尽快结束
+                while (self.slots is slots and not worker.poll_ready(0.2) and not worker.failed
+                       and time.monotonic() < deadline):
+                    pass
+                with self.lock:
+                    if self.slots is not slots:
+                        break
+                    slot.standby = None
+                    if worker.ready:
+                        slot.worker = worker
+                        print(f"OCR子进程 {slot.index} 已就绪 (PID: {worker.pid})")
+                        continue
+                    # 稍后重新启动
+                    slot.standby = self._spawn()
+                if not worker.failed:
+                    log(f"OCR子进程 {slot.index} 启动超时", 'WARNING')
+                worker.stop()
+        finally:
+            with self.lock:
+                self.starting = False
+                released = self.slots is not slots
+                self.condition.notify_all()
+            if released:
+                # 启动期间进程池已经被释放，这一批子进程在这里结束
+                for slot in slots:
+                    for worker in (slot.worker, slot.standby):
+                        if worker is not None:
+                            worker.stop()
+        return not released and any(slot.worker is not None for slot in slots)
+
+    def release(self):
+        """结束所有子进程，正在启动的子进程由initialize结束"""
+        with self.lock:
+            slots, self.slots = self.slots, []
+            starting = self.starting
+            self.condition.notify_all()
+        if starting or not slots:
+            return
+        for slot in slots:
+            for worker in (slot.worker, slot.standby):
+                if worker is not None:
+                    worker.stop()
+        print("OCR子进程已结束")
+
+    def update_settings(self, memory_threshold=None, auto_reset_enabled=None, layout_cache_enabled=None,
+                        line_cache_size=None, preprocess_steps=None):
+        """更新设置，缓存和预处理相关的设置会转发给子进程"""
+        if memory_threshold is not None:
+            self.memory_threshold = memory_threshold * 1024 * 1024
+        if auto_reset_enabled is not None:
+            self.auto_reset_enabled = auto_reset_enabled
+        forwarded = {}
+        if layout_cache_enabled is not None:
+            forwarded['layout_cache_enabled'] = layout_cache_enabled
+        if line_cache_size is not None:
+            forwarded['line_cache_size'] = line_cache_size
+        if preprocess_steps is not None:
+            forwarded['preprocess_steps'] = preprocess_steps
+        self.processor_options.update(forwarded)
+        if not forwarded:
+            return
+        with self.lock:
+            for slot in self.slots:
+                slot.pending_settings.update(forwarded)
+        # 空闲的子进程立即发送，正在识别的子进程在下一次识别前发送
+        for slot in self._take_idle_slots():
+            self._send_settings(slot)
+            self._return_slot(slot)
+
+    def _send_settings(self, slot):
+        """把位置上排队的设置发给子进程，调用前需要已经占用这个位置"""
+        with self.lock:
+            settings, slot.pending_settings = slot.pending_settings, {}
+        if settings and slot.worker is not None:
+            slot.worker.update_settings(**settings)
+
+    def request_reset(self, reason=None):
+        """为所有子进程启动备用子进程，就绪后逐个替换
+
+        Returns:
+            bool: 是否启动了备用子进程
+        """
+        started = False
+        with self.lock:
+            for slot in self.slots:
+                if slot.worker is not None and slot.standby is None:
+                    slot.standby = self._spawn()
+                    started = True
+        if started:
+            if reason:
+                print(reason)
+            print("正在启动备用OCR子进程...")
+        return started
+
+    def _recycle_reason(self, worker):
+        """检查子进程是否需要回收，返回原因，不需要时返回None"""
+        if worker.rss > self.memory_threshold:
+            return f"OCR子进程内存占用({worker.rss/1024/1024:.2f}MB)超过阈值({self.memory_threshold/1024/1024:.2f}MB)"
+        if self.max_calls and worker.calls >= self.max_calls:
+            return f"OCR子进程已处理 {worker.calls} 次请求"
+        if self.max_age and time.time() - worker.started_at > self.max_age:
+            return f"OCR子进程已运行 {(time.time() - worker.started_at) / 60:.0f} 分钟"
+        return None
+
+    def _take_idle_slots(self):
+        """占用当前所有空闲的位置，不等待，用完后用_return_slot归还"""
+        with self.lock:
+            slots = [slot for slot in self.slots if slot.worker is not None and not slot.in_use]
+            for slot in slots:
+                slot.in_use = True
+        return slots
+
+    def _fail(self, slot, error):
+        """子进程出错：结束它，立即启动新的子进程"""
+        log(f"OCR子进程 {slot.index} 出错: {str(error)}，将重新启动", 'ERROR')
+        with self.lock:
+            worker, slot.worker = slot.worker, None
+            if slot.standby is None:
+                slot.standby = self._spawn()
+        # 结束子进程最多需要等待几秒，不持有锁
+        if worker is not None:
+            worker.stop()
+
+    def _return_slot(self, slot):
+        """识别结束后归还位置：需要时替换为就绪的备用子进程，检查是否需要回收"""
+        # 换下来的子进程在释放锁之后结束
+        stopped = []
+        with self.lock:
+            slot.in_use = False
+            self.condition.notify_all()
+            if slot not in self.slots:
+                # 进程池已经释放
+                stopped.append(slot.worker)
+            elif slot.standby is not None and slot.standby.poll_ready():
+                stopped.append(slot.worker)
+                slot.worker, slot.standby = slot.standby, None
+                if stopped[-1] is not None:
+                    self.engine_resets += 1
+                print(f"OCR子进程 {slot.index} 已切换 (PID: {slot.worker.pid})")
+            elif slot.standby is not None and slot.standby.failed:
+                stopped.append(slot.standby)
+                slot.standby = self._spawn()
+
+            if slot in self.slots and slot.worker is not None and self.auto_reset_enabled and slot.standby is None:
+                reason = self._recycle_reason(slot.worker)
+                if reason:
+                    print(reason + "，回收OCR子进程...")
+                    slot.standby = self._spawn()
+        for worker in stopped:
+            if worker is not None:
+                worker.stop()
+
+    def _maintain(self):
+        """启用已就绪的替补，定期检查空闲子进程的健康状况"""
+        stopped = []
+        with self.lock:
+            for slot in self.slots:
+                # 出错的位置替补就绪后直接启用
+                if slot.in_use or slot.worker is not None or slot.standby is None:
+                    continue
+                if slot.standby.poll_ready():
+                    slot.worker, slot.standby = slot.standby, None
+                    self.engine_resets += 1
+                    print(f"OCR子进程 {slot.index} 已重新启动 (PID: {slot.worker.pid})")
+                    self.condition.notify_all()
+                elif slot.standby.failed:
+                    stopped.append(slot.standby)
+                    slot.standby = self._spawn()
+        for worker in stopped:
+            worker.stop()
+
+        if time.monotonic() - self.last_health_check < self.health_interval:
+            return
+        self.last_health_check = time.monotonic()
+        for slot in self._take_idle_slots():
+            if not (slot.worker.is_alive() and slot.worker.ping()):
+                self._fail(slot, "健康检查无响应")
+            self._return_slot(slot)
+
+    def _slot_for(self, key, live, assignments):
+        """布局缓存标识优先对应的位置
+
+        这个位置的子进程不可用时换到其他可用的位置，正在识别时换到分到图像最少的空闲位置，
+        没有空闲位置时仍然使用原来的位置，等它空闲
+        """
+        choice = zlib.crc32(key.encode('utf-8'))
+        slot = self.slots[choice % len(self.slots)]
+        if slot.worker is None:
+            slot = live[choice % len(live)]
+        if slot.in_use:
+            idle = [candidate for candidate in live if not candidate.in_use]
+            if idle:
+                slot = min(idle, key=lambda candidate: len(assignments.get(candidate, ())))
+        return slot
+
+    def _acquire(self, keys):
+        """为每幅图像选择子进程并占用这些位置，位置被占用时等待
+
+        有布局缓存标识的图像优先交给固定的位置，那个位置正忙时交给空闲的位置，
+        没有标识的图像分给这些位置和其他空闲的位置
+
+        Returns:
+            {位置: [图像序号, ...]}，超时或没有可用的子进程时返回None
+        """
+        deadline = time.monotonic() + self.timeout
+        with self.lock:
+            while True:
+                live = [slot for slot in self.slots if slot.worker is not None]
+                if not live:
+                    return None
+                assignments = {}
+                keyless = []
+                for index, key in enumerate(keys):
+                    if key is None:
+                        keyless.append(index)
+                    else:
+                        assignments.setdefault(self._slot_for(key, live, assignments), []).append(index)
+                if keyless:
+                    # 优先交给没有分到图像的空闲位置，并行识别
+                    candidates = [slot for slot in live if not slot.in_use and slot not in assignments] + list(assignments)
+                    candidates = candidates or live
+                    for position, index in enumerate(keyless):
+                        assignments.setdefault(candidates[position % len(candidates)], []).append(index)
+
+                if not any(slot.in_use for slot in assignments):
+                    for slot in assignments:
+                        slot.in_use = True
+                    return assignments
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.condition.wait(remaining)
+
+    def recognize_batch(self, images, layout_keys=None):
+        """一次识别多幅图像，分给多个子进程并行识别
+
+        Args:
+            images: PIL图像对象列表
+            layout_keys: 与images一一对应的布局缓存标识
+
+        Returns:
+            与images一一对应的文本字符串列表，子进程不可用、超时或出错的图像对应None
+        """
+        if not images:
+            return []
+        if not self.initialize():
+            return [None] * len(images)
+        self._maintain()
+
+        keys = layout_keys or [None] * len(images)
+        texts = [None] * len(images)
+        assignments = self._acquire(keys)
+        if assignments is None:
+            log("没有可用的OCR子进程", 'ERROR')
+            return texts
+
+        submitted = []
+        for slot, indices in assignments.items():
+            try:
+                self._send_settings(slot)
+                slot.worker.submit([images[index] for index in indices], [keys[index] for index in indices])
+                submitted.append((slot, indices))
+            except Exception as e:
+                self._fail(slot, e)
+
+        for slot, indices in submitted:
+            try:
+                for index, text in zip(indices, slot.worker.collect(self.timeout)):
+                    texts[index] = text
+            except Exception as e:
+                self._fail(slot, e)
+
+        for slot in assignments:
+            self._return_slot(slot)
+        return texts
+
+    def recognize_text(self, image, layout_key=None):
+        """识别图像中的文字，识别失败时返回None"""
+        return self.recognize_batch([image], [layout_key])[0]
+
+    def get_stats(self):
+        """汇总各子进程上报的统计信息"""
+        stats = {
+            'layout_cache_enabled': self.processor_options['layout_cache_enabled'],
+            'layout_hits': 0, 'layout_misses': 0,
+            'line_cache_size': self.processor_options['line_cache_size'],
+            'line_hits': 0, 'line_misses': 0, 'line_entries': 0,
+        }
+        workers = [slot.worker for slot in list(self.slots) if slot.worker is not None]
+        for worker in workers:
+            for key in ('layout_hits', 'layout_misses', 'line_hits', 'line_misses', 'line_entries'):
+                stats[key] += worker.stats.get(key, 0)
+        stats['engine_resets'] = self.engine_resets
+        stats['workers'] = len(workers)
+        return stats
@@ -0,0 +1,120 @@
+import numpy as np
+import cv2
+
+class ImagePreprocessor:
+    """OCR图像预处理，所有中间结果写入预先分配的缓冲区，画面尺寸不变时每帧不再分配内存
+
+    处理步骤：缩小过大的图像 -> 灰度 -> (暗图像)CLAHE增强对比度 -> OTSU二值化 -> 三通道模型输入。
+    输入可以是PIL图像，也可以是截图得到的BGRX数组，BGRX数组不经过PIL直接处理。
+    """
+
+    # 每一步的默认开关
+    DEFAULT_STEPS = {
+        'resize': True,     # 缩小超过max_dimension的图像
+        'binarize': True,   # OTSU二值化
+        'clahe': True,      # 暗图像二值化前先增强对比度
+    }
+
+    def __init__(self, steps=None, max_dimension=1024, dark_threshold=100):
+        """初始化预处理器
+
+        Args:
+            steps: {步骤名称: 是否启用}，未指定的步骤使用DEFAULT_STEPS
+            max_dimension: 图像的最大边长，超过时等比例缩小
+            dark_threshold: 平均亮度低于该值时视为暗图像
+        """
+        self.steps = dict(self.DEFAULT_STEPS)
+        self.max_dimension = max_dimension
+        self.dark_threshold = dark_threshold
+        self.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        # (槽位, 用途) -> 缓冲区，同一批中的每幅图像使用不同的槽位
+        self.buffers = {}
+        self.allocations = 0
+        self.update_steps(steps)
+
+    def update_steps(self, steps):
+        """修改步骤开关"""
+        if steps:
+            self.steps.update({name: bool(enabled) for name, enabled in steps.items() if name in self.steps})
+
+    def clear(self):
+        """释放所有缓冲区"""
+        self.buffers.clear()
+
+    def _buffer(self, slot, purpose, height, width, channels=None):
+        """获取形状为(height, width[, channels])的缓冲区
+
+        宽度相同时只按需增加行数，返回的是缓冲区前height行，仍然是连续内存。
+        增量识别时每帧的高度不同，也不会重新分配。
+        """
+        key = (slot, purpose)
+        tail = (width,) if channels is None else (width, channels)
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.shape[1:] != tail or buffer.shape[0] < height:
+            rows = height if buffer is None or buffer.shape[1:] != tail else max(height, buffer.shape[0] * 2)
+            buffer = np.empty((rows,) + tail, dtype=np.uint8)
+            self.buffers[key] = buffer
+            self.allocations += 1
+        return buffer[:height]
+
+    def _target_size(self, width, height):
+        """计算缩小后的尺寸，不需要缩小时返回None"""
+        if not self.steps['resize'] or max(width, height) <= self.max_dimension:
+            return None
+        scale = self.max_dimension / max(width, height)
+        return max(1, int(width * scale)), max(1, int(height * scale))
+
+    def process(self, image, slot=0):
+        """预处理一幅图像
+
+        Args:
+            image: PIL图像对象，或形状为(高度, 宽度, 4)的BGRX数组、(高度, 宽度, 3)的RGB数组、(高度, 宽度)的灰度数组
+            slot: 缓冲区槽位，同时使用的多幅图像需要不同的槽位
+
+        Returns:
+            形状为(高度, 宽度, 3)的uint8数组，指向内部缓冲区，下次使用同一槽位处理时会被覆盖
+        """
+        if isinstance(image, np.ndarray):
+            array = image
+        else:
+            if image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            array = np.asarray(image)
+        bgrx = array.ndim == 3 and array.shape[2] == 4
+
+        # 缩小过大的图像，直接在数组上进行，不经过PIL
+        height, width = array.shape[:2]
+        size = self._target_size(width, height)
+        if size is not None:
+            width, height = size
+            resized = self._buffer(slot, 'resized', height, width, *array.shape[2:])
+            cv2.resize(array, size, dst=resized, interpolation=cv2.INTER_AREA)
+            array = resized
+
+        output = self._buffer(slot, 'output', height, width, 3)
+        if array.ndim == 2:
+            gray = array
+        elif self.steps['binarize']:
+            gray = self._buffer(slot, 'gray', height, width)
+            cv2.cvtColor(array, cv2.COLOR_BGRA2GRAY if bgrx else cv2.COLOR_RGB2GRAY, dst=gray)
+        else:
+            # 不二值化时直接输出彩色图像
+            if bgrx:
+                cv2.cvtColor(array, cv2.COLOR_BGRA2RGB, dst=output)
+            else:
+                np.copyto(output, array)
+            return output
+
+        if self.steps['binarize']:
+            if self.steps['clahe'] and cv2.mean(gray)[0] < self.dark_threshold:
+                # 暗图像先增强对比度
+                enhanced = self._buffer(slot, 'enhanced', height, width)
+                self.clahe.apply(gray, dst=enhanced)
+                gray = enhanced
+            binary = self._buffer(slot, 'binary', height, width)
+            cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU, dst=binary)
+            gray = binary
+
+        # 模型需要三通道输入
+        cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB, dst=output)
+        return output
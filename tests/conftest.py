@@ -0,0 +1,78 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitor.frame_source import SyntheticChatFrameSource
+
+
+class RenderedTextOCR:
+    """测试用的OCR，按SyntheticChatFrameSource的绘制方式比对像素，还原图像中完整的文字行
+
+    被截断的行不会被识别，fail_next为True时下一次识别失败
+    """
+
+    def __init__(self, source, ink_level=250, max_gap=3):
+        self.source = source
+        self.ink_level = ink_level
+        self.max_gap = max_gap
+        self.templates = {}
+        self.fail_next = False
+        self.calls = []
+
+    def _ink_rows(self, gray):
+        return np.flatnonzero((gray < self.ink_level).any(axis=1))
+
+    def _blocks(self, gray):
+        """按行间空白把图像切成文字块"""
+        rows = self._ink_rows(gray)
+        if len(rows) == 0:
+            return []
+        blocks = []
+        start = previous = rows[0]
+        for row in rows[1:]:
+            if row - previous > self.max_gap:
+                blocks.append(gray[start:previous + 1])
+                start = row
+            previous = row
+        blocks.append(gray[start:previous + 1])
+        return blocks
+
+    def _template(self, message):
+        if message not in self.templates:
+            image = Image.new('RGB', (self.source.width, self.source.line_height * 2), (255, 255, 255))
+            ImageDraw.Draw(image).text((8, 4), message, fill=(0, 0, 0), font=self.source.font)
+            gray = np.asarray(image.convert('L'))
+            rows = self._ink_rows(gray)
+            self.templates[message] = gray[rows[0]:rows[-1] + 1].tobytes()
+        return self.templates[message]
+
+    def recognize_text(self, image, layout_key=None):
+        self.calls.append(image.size)
+        if self.fail_next:
+            self.fail_next = False
+            return None
+        lookup = {self._template(message): message for message in set(self.source.posted)}
+        gray = np.asarray(image.convert('L'))
+        lines = [lookup.get(block.tobytes()) for block in self._blocks(gray)]
+        return "\n".join(line for line in lines if line is not None)
+
+    def recognize_batch(self, images, layout_keys=None):
+        return [self.recognize_text(image) for image in images]
+
+
+@pytest.fixture
+def chat_source():
+    """只在测试中手动发送消息的合成聊天帧来源，第一帧自动发送的随机消息在创建时就发出"""
+    source = SyntheticChatFrameSource(width=320, height=240, message_interval=1e9, plate_ratio=1.0, seed=7)
+    source.get_frame()
+    return source
+
+
+@pytest.fixture
+def chat_ocr(chat_source):
+    return RenderedTextOCR(chat_source)
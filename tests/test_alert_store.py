@@ -0,0 +1,61 @@
+import json
+import time
+
+from monitor.alert_store import AlertStore
+
+
+def test_records_expire_after_ttl():
+    store = AlertStore(ttl=60)
+    store.add("发现车牌: 12345", timestamp=time.time() - 120)
+    store.add("发现车牌: 23456")
+    assert "发现车牌: 12345" not in store
+    assert "发现车牌: 23456" in store
+    assert store.messages() == ["发现车牌: 23456"]
+
+
+def test_zero_ttl_never_expires():
+    store = AlertStore(ttl=0)
+    store.add("发现车牌: 12345", timestamp=0)
+    assert "发现车牌: 12345" in store
+
+
+def test_capacity_drops_oldest_records():
+    store = AlertStore(capacity=2)
+    for index, message in enumerate(("a", "b", "c")):
+        store.add(message, timestamp=time.time() + index)
+    assert store.messages() == ["b", "c"]
+
+
+def test_messages_are_normalized():
+    store = AlertStore()
+    store.add("发现车牌:  １２３４５")
+    assert "发现车牌: 12345" in store
+
+
+def test_records_persist_across_instances(tmp_path):
+    path = str(tmp_path / "alerts.json")
+    store = AlertStore(ttl=3600, path=path)
+    store.add("发现车牌: 12345", timestamp=time.time() - 7200)
+    store.add("发现车牌: 23456")
+
+    reloaded = AlertStore(ttl=3600, path=path)
+    assert reloaded.messages() == ["发现车牌: 23456"]
+    with open(path, encoding='utf-8') as f:
+        assert [message for message, _ in json.load(f)] == ["发现车牌: 23456"]
+
+
+def test_replace_keeps_existing_timestamps():
+    store = AlertStore()
+    timestamp = time.time() - 10
+    store.add("a", timestamp=timestamp)
+    store.replace(["b", "a"])
+    assert dict(store.items())["a"] == timestamp
+    # 按提醒时间排列，保留下来的旧记录在前
+    assert store.messages() == ["a", "b"]
+
+
+def test_corrupt_file_is_ignored(tmp_path):
+    path = tmp_path / "alerts.json"
+    path.write_text("{", encoding='utf-8')
+    store = AlertStore(path=str(path))
+    assert len(store) == 0
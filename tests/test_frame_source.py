@@ -0,0 +1,53 @@
+from PIL import Image
+
+from monitor.frame_source import ImageDirectoryFrameSource, SyntheticChatFrameSource, create_frame_source
+
+
+def write_frames(directory, count):
+    for index in range(count):
+        Image.new('RGB', (40, 30), (index * 40, 0, 0)).save(directory / f"{index:03d}.png")
+
+
+def test_directory_frames_play_in_name_order(tmp_path):
+    write_frames(tmp_path, 3)
+    (tmp_path / "notes.txt").write_text("x", encoding='utf-8')
+    source = ImageDirectoryFrameSource(str(tmp_path), crop_area=(0, 0, 20, 10))
+    colors = []
+    for _ in range(4):
+        frame = source.get_frame()
+        assert frame.size == (20, 10)
+        colors.append(frame.getpixel((0, 0))[0])
+    assert colors == [0, 40, 80, 0]
+    assert source.current_file().endswith("000.png")
+
+
+def test_directory_without_loop_stops(tmp_path):
+    write_frames(tmp_path, 2)
+    source = ImageDirectoryFrameSource(str(tmp_path), loop=False)
+    assert source.get_frame() is not None and source.get_frame() is not None
+    assert source.get_frame() is None
+    source.reset()
+    assert source.get_frame() is not None
+
+
+def test_missing_directory_is_not_ready(tmp_path):
+    source = ImageDirectoryFrameSource(str(tmp_path / "missing"))
+    assert not source.is_ready()
+    assert source.get_frame() is None
+
+
+def test_synthetic_source_posts_messages_and_scrolls():
+    source = SyntheticChatFrameSource(width=200, height=100, message_interval=0, seed=1)
+    for _ in range(10):
+        frame = source.get_frame()
+    assert frame.size == (200, 100)
+    assert len(source.posted) == 10
+    assert source.lines == source.posted[-len(source.lines):]
+    assert source.can_render("12345")
+    source.reset()
+    assert source.posted == []
+
+
+def test_create_frame_source_falls_back_to_window():
+    assert create_frame_source({'frame_source': 'synthetic'}).name == "synthetic"
+    assert create_frame_source({'frame_source': 'unknown'}).name == "window"
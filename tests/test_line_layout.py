@@ -0,0 +1,56 @@
+import numpy as np
+
+from ocr.line_layout import LineLayoutCache
+
+
+def page(rows):
+    """白底黑字的图像，rows为[(上边界, 下边界, 左边界, 右边界), ...]"""
+    image = np.full((120, 200), 255, dtype=np.uint8)
+    for top, bottom, left, right in rows:
+        image[top:bottom, left:right] = 0
+    return image
+
+
+def box(top, bottom, left, right):
+    return [(left, top), (right, top), (right, bottom), (left, bottom)]
+
+
+LINES = [(10, 24, 20, 120), (40, 54, 20, 80)]
+BOXES = [box(8, 26, 18, 122), box(38, 56, 18, 82)]
+
+
+def test_unchanged_layout_returns_line_crops():
+    cache = LineLayoutCache()
+    cache.store('main', page(LINES), BOXES)
+    # 文字变长时水平范围按当前帧重新计算
+    crops = cache.lookup('main', page([(10, 24, 20, 150), (40, 54, 20, 80)]))
+    assert [crop.shape for crop in crops] == [(18, 148), (18, 78)]
+    assert cache.hits == 1 and cache.get_hit_rate() == 1.0
+
+
+def test_moved_lines_need_detection():
+    cache = LineLayoutCache()
+    cache.store('main', page(LINES), BOXES)
+    assert cache.lookup('main', page([(top + 6, bottom + 6, left, right) for top, bottom, left, right in LINES])) is None
+    assert cache.lookup('other', page(LINES)) is None
+    assert cache.misses == 2
+
+
+def test_boxes_on_the_same_row_are_merged():
+    cache = LineLayoutCache()
+    cache.store('main', page(LINES), [box(8, 26, 18, 60), box(9, 25, 70, 122)] + BOXES[1:])
+    assert cache.layouts['main']['bands'] == [(8, 26), (38, 56)]
+
+
+def test_redetect_interval_and_low_confidence_drop_the_layout():
+    cache = LineLayoutCache(redetect_interval=3)
+    image = page(LINES)
+    cache.store('main', image, BOXES)
+    assert cache.lookup('main', image) is not None
+    assert cache.lookup('main', image) is not None
+    assert cache.lookup('main', image) is None
+
+    cache.store('main', image, BOXES)
+    cache.check_confidence('main', [0.9, 0.1])
+    assert cache.lookup('main', image) is None
+    assert 'main' not in cache.layouts
@@ -0,0 +1,17 @@
+from monitor.monitor_target import MonitorTarget
+
+RULES = {'number_patterns': ['\\d{5}'], 'custom_patterns': [], 'keywords': [], 'exclude_patterns': []}
+
+
+def test_failed_ocr_does_not_leave_frame_as_reference(chat_source, chat_ocr):
+    target = MonitorTarget('main', chat_source, chat_ocr, RULES)
+    frame = chat_source.get_frame()
+    assert target.should_process(frame)
+    image, request = target.prepare(frame)
+    chat_ocr.fail_next = True
+    assert target.commit(chat_ocr.recognize_text(image), request) is None
+    # 同样的画面需要重新识别
+    assert target.should_process(frame)
+    image, request = target.prepare(frame)
+    assert target.commit(chat_ocr.recognize_text(image), request).splitlines() == chat_source.lines
+    assert not target.should_process(frame)
@@ -0,0 +1,101 @@
+import threading
+import time
+
+from ocr.ocr_worker import OCRWorkerPool
+
+
+class FakeWorker:
+    """代替OCR子进程，记录收到的请求"""
+
+    count = 0
+
+    def __init__(self, pool, delay=0.0):
+        FakeWorker.count += 1
+        self.pid = FakeWorker.count
+        self.pool = pool
+        self.delay = delay
+        self.ready = True
+        self.failed = False
+        self.rss = 0
+        self.calls = 0
+        self.started_at = time.time()
+        self.stats = {}
+        self.messages = []
+        self.stopped_under_lock = None
+        self.fail_collect = False
+
+    def poll_ready(self, timeout=0):
+        return True
+
+    def is_alive(self):
+        return True
+
+    def ping(self, timeout=5.0):
+        return True
+
+    def update_settings(self, **settings):
+        self.messages.append(('settings', settings))
+
+    def submit(self, images, layout_keys=None):
+        self.messages.append(('recognize', list(images)))
+        self.pending = [f"{self.pid}:{image}" for image in images]
+
+    def collect(self, timeout=None):
+        time.sleep(self.delay)
+        if self.fail_collect:
+            raise RuntimeError("OCR子进程意外退出")
+        self.calls += 1
+        return self.pending
+
+    def stop(self, timeout=2.0):
+        # 持有锁时lock.acquire(False)会失败
+        acquired = self.pool.lock.acquire(False)
+        if acquired:
+            self.pool.lock.release()
+        self.stopped_under_lock = not acquired
+
+
+def make_pool(workers, delay=0.0):
+    pool = OCRWorkerPool({}, workers=workers, threads_per_worker=1)
+    pool._spawn = lambda: FakeWorker(pool, delay)
+    assert pool.initialize()
+    return pool
+
+
+def test_busy_slot_falls_back_to_idle_worker():
+    pool = make_pool(2, delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.recognize_batch(['frame'], ['main'])))
+               for _ in range(2)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 同一个标识的两批图像由两个子进程同时识别
+    assert time.monotonic() - start < 0.35
+    assert sorted(text for texts in results for text in texts) == sorted(
+        f"{slot.worker.pid}:frame" for slot in pool.slots)
+    pool.release()
+
+
+def test_failed_worker_returns_none_and_stops_outside_lock():
+    pool = make_pool(1)
+    worker = pool.slots[0].worker
+    worker.fail_collect = True
+    assert pool.recognize_batch(['a', 'b'], [None, None]) == [None, None]
+    assert worker.stopped_under_lock is False
+    assert pool.slots[0].worker is not worker
+    pool.release()
+
+
+def test_settings_reach_busy_worker_before_next_request():
+    pool = make_pool(1)
+    slot = pool.slots[0]
+    slot.in_use = True
+    pool.update_settings(line_cache_size=50)
+    assert slot.worker.messages == []
+    slot.in_use = False
+    pool.recognize_batch(['a'], ['main'])
+    assert slot.worker.messages == [('settings', {'line_cache_size': 50}), ('recognize', ['a'])]
+    pool.release()
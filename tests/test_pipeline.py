@@ -0,0 +1,84 @@
+import random
+import threading
+import time
+
+from monitor.frame_source import SyntheticChatFrameSource
+from monitor.pipeline import MonitorPipeline
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_results_are_delivered_in_capture_order(chat_ocr):
+    source = chat_ocr.source
+    source.message_interval = 0
+    delays = random.Random(3)
+
+    def process_frames(frames):
+        # 各OCR线程耗时不同，完成顺序和取帧顺序不一致
+        time.sleep(delays.uniform(0, 0.03))
+        return [(name, chat_ocr.recognize_text(image).splitlines()[-1]) for name, image in frames.items()]
+
+    pipeline = MonitorPipeline({'main': source}, process_frames, lambda: 0.005, ocr_threads=4)
+    results = []
+
+    def collected():
+        results.extend(pipeline.poll_results())
+        return len(results) >= 20
+
+    assert pipeline.start()
+    assert wait_for(collected)
+    assert pipeline.stop()
+
+    messages = [message for _, message in results]
+    positions = [source.posted.index(message) for message in messages]
+    assert positions == sorted(positions)
+    assert len(set(messages)) == len(messages)
+
+
+def test_failed_batches_are_discarded_in_order(chat_source):
+    lock = threading.Lock()
+    calls = []
+    discarded = []
+
+    def process_frames(frames):
+        with lock:
+            calls.append(len(calls))
+            failed = len(calls) % 2 == 0
+        if failed:
+            raise RuntimeError("OCR失败")
+        return list(frames)
+
+    pipeline = MonitorPipeline({'main': chat_source}, process_frames, lambda: 0.005, ocr_threads=2,
+                               discard_frames=discarded.append)
+    assert pipeline.start()
+    assert wait_for(lambda: len(discarded) >= 3)
+    assert pipeline.stop()
+    assert discarded[:3] == [['main']] * 3
+    assert pipeline.processed_frames >= 3
+
+
+def test_pipeline_refuses_to_restart_while_threads_run():
+    release = threading.Event()
+
+    def process_frames(frames):
+        release.wait()
+        return []
+
+    source = SyntheticChatFrameSource(width=64, height=64, message_interval=0)
+    pipeline = MonitorPipeline({'main': source}, process_frames, lambda: 0.005)
+    assert pipeline.start()
+    assert wait_for(lambda: pipeline.captured_frames > 0)
+    time.sleep(0.1)
+    assert not pipeline.stop(timeout=0.05)
+    assert not pipeline.start()
+    release.set()
+    assert pipeline.stop()
+    assert pipeline.start()
+    assert pipeline.stop()
@@ -0,0 +1,33 @@
+import pytest
+
+from monitor.scan_scheduler import ScanScheduler
+
+
+def test_idle_cycles_back_off_to_max_interval():
+    scheduler = ScanScheduler(base_interval=1.0, min_interval=0.3, max_interval=2.0, backoff=1.5)
+    intervals = [scheduler.next_interval() for _ in range(4)]
+    assert intervals == pytest.approx([1.5, 2.0, 2.0, 2.0])
+
+
+def test_activity_snaps_back_to_min_interval():
+    scheduler = ScanScheduler(base_interval=1.0, min_interval=0.3, max_interval=2.0, backoff=2.0)
+    scheduler.next_interval()
+    scheduler.record_activity()
+    assert scheduler.next_interval() == pytest.approx(0.3)
+    assert scheduler.next_interval() == pytest.approx(0.6)
+    assert scheduler.active_cycles == 1
+
+
+def test_disabled_scheduler_uses_base_interval():
+    scheduler = ScanScheduler(base_interval=1.0, enabled=False)
+    scheduler.record_activity()
+    assert scheduler.next_interval() == 1.0
+    assert scheduler.get_rate() == pytest.approx(1.0)
+
+
+def test_reset_starts_from_base_interval():
+    scheduler = ScanScheduler(base_interval=1.0, min_interval=0.3, max_interval=2.0)
+    scheduler.record_activity()
+    scheduler.next_interval()
+    scheduler.reset()
+    assert scheduler.current_interval() == 1.0
@@ -0,0 +1,92 @@
+import numpy as np
+
+from monitor.scroll_tracker import IncrementalReader, LineBuffer, ScrollTracker
+
+
+def post(source, *messages):
+    for message in messages:
+        source.post_message(message)
+    return source.get_frame()
+
+
+def test_failed_band_is_read_again_on_next_frame(chat_source, chat_ocr):
+    reader = IncrementalReader(chat_ocr)
+    reader.read(post(chat_source, '10001', '10002', '10003'))
+
+    image, request = reader.prepare(post(chat_source, '20001'))
+    assert request.band
+    chat_ocr.fail_next = True
+    assert reader.commit(chat_ocr.recognize_text(image), request) is None
+    assert '20001' not in reader.buffer.get_text()
+
+    text = reader.read(post(chat_source, '20002'))
+    assert text.splitlines()[-3:] == ['10003', '20001', '20002']
+    assert reader.full_scans == 2
+
+
+def brute_force_shift(tracker, profile):
+    """逐个滚动距离比较平均灰度差"""
+    previous = tracker.last_profile
+    height = profile.shape[0]
+    errors = [np.mean(np.abs(profile[:height - shift] - previous[shift:]))
+              for shift in range(int(height * tracker.max_shift_ratio) + 1)]
+    best = int(np.argmin(errors))
+    return best if errors[best] <= tracker.match_tolerance else None
+
+
+def test_estimate_shift_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for height in (24, 97, 240):
+        content = rng.uniform(0, 255, (height * 2, 16)).astype(np.float32)
+        # 一半的行是空白，和聊天记录一样
+        content[rng.random(height * 2) < 0.5] = 255
+        for shift in (0, 1, height // 3, int(height * 0.6)):
+            tracker = ScrollTracker()
+            tracker.last_profile = content[:height]
+            current = content[shift:shift + height] + rng.normal(0, 0.5, (height, 16)).astype(np.float32)
+            assert tracker.estimate_shift(current) == brute_force_shift(tracker, current) == shift
+
+    tracker = ScrollTracker()
+    tracker.last_profile = rng.uniform(0, 255, (120, 16)).astype(np.float32)
+    assert tracker.estimate_shift(rng.uniform(0, 255, (120, 16)).astype(np.float32)) is None
+
+
+def test_band_reads_follow_scrolling_chat(chat_source, chat_ocr):
+    reader = IncrementalReader(chat_ocr)
+    # 连续的相同消息也要各自保留
+    batches = [('40001',), ('40002', '40002'), (), ('40003',), ('40004', '40005', '40006'), ('40006',)]
+    for messages in batches:
+        text = reader.read(post(chat_source, *messages))
+        assert text.splitlines()[-len(chat_source.lines):] == chat_source.lines
+    assert reader.band_scans >= 4
+    # 新区域的图像比整幅画面小
+    assert min(height for _, height in chat_ocr.calls) < chat_source.height // 2
+
+
+def test_smooth_scroll_merges_without_gaps_or_repeats(chat_ocr):
+    source = chat_ocr.source
+    source.height = source.line_height * 40
+    for index in range(45):
+        source.post_message(f"{50000 + index}")
+    tall = source.get_frame()
+    window = 240
+
+    reader = IncrementalReader(chat_ocr)
+    for top in range(0, tall.height - window, 7):
+        frame = tall.crop((0, top, tall.width, top + window))
+        visible = chat_ocr.recognize_text(frame).splitlines()
+        lines = reader.read(frame).splitlines()
+        assert lines[-len(visible):] == visible
+        # 缓冲区是连续的一段消息，没有漏掉或重复的行
+        start = source.posted.index(lines[0])
+        assert lines == source.posted[start:start + len(lines)]
+    assert reader.band_scans > reader.full_scans
+
+
+def test_line_buffer_keeps_latest_lines():
+    buffer = LineBuffer(max_lines=3)
+    buffer.replace(['a', 'b'])
+    buffer.extend(['c', 'd'])
+    assert buffer.get_text() == "b\nc\nd"
+    buffer.clear()
+    assert buffer.get_text() == ""
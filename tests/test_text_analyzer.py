@@ -0,0 +1,48 @@
+from monitor.text_analyzer import TextAnalyzer
+
+RULES = {
+    'number_patterns': ['(?<!\\d)\\d{5}(?!\\d)', '\\d{6}(?!\\d)'],
+    'custom_patterns': [],
+    'keywords': ['等车', '车车', '约吗'],
+    'exclude_patterns': ['\\d+\\s*[=＝]\\s*\\d+', '^\\d+[=＝]', '[=＝]\\d+$'],
+}
+
+
+def test_matches_are_reported_in_screen_order():
+    analyzer = TextAnalyzer(RULES)
+    text = "12345 有人等车吗\n约吗\n车 654321"
+    assert analyzer.find_matches(text) == [
+        "发现车牌: 12345", "发现关键词: 12345 有人等车吗", "发现关键词: 约吗", "发现车牌: 654321"]
+
+
+def test_overlapping_number_patterns_report_each_match():
+    rules = dict(RULES, number_patterns=['\\d{5}', '\\d{6}'])
+    analyzer = TextAnalyzer(rules)
+    assert analyzer.find_matches("123456") == ["发现车牌: 12345", "发现车牌: 123456"]
+
+
+def test_exclude_patterns_with_inline_flags_are_not_merged():
+    # 排除规则作用于匹配到的号码
+    rules = dict(RULES, exclude_patterns=['(?i)^1\\d+', '^9'])
+    analyzer = TextAnalyzer(rules)
+    assert len(analyzer.exclude_regexes) == 2
+    assert analyzer.find_matches("12345\n98765\n23456") == ["发现车牌: 23456"]
+
+
+def test_exclude_patterns_are_merged():
+    analyzer = TextAnalyzer(RULES)
+    assert len(analyzer.exclude_regexes) == 1
+
+
+def test_alerted_messages_are_not_repeated():
+    analyzer = TextAnalyzer(RULES)
+    for message in analyzer.find_matches("12345\n12345"):
+        analyzer.add_alerted_message(message)
+    assert analyzer.find_matches("12345") == []
+    # 全角数字规范化后视为同一条消息
+    assert analyzer.find_matches("１２３４５") == []
+
+
+def test_invalid_patterns_are_skipped():
+    analyzer = TextAnalyzer(dict(RULES, custom_patterns=['([', '车\\d']))
+    assert analyzer.find_matches("车1") == ["匹配正则'车\\d': 车1"]
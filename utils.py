@@ -1,32 +1,154 @@
 """
 工具模块，包含通用的辅助类和函数
 """
+import os
 import sys
-import tkinter as tk
 import gc
+import json
+import threading
+import time
+from collections import deque
 import psutil
 
+LOG_LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+class RotatingFileSink:
+    """按大小轮转的日志文件"""
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, backup_count=3):
+        """初始化日志文件
+        
+        Args:
+            path: 日志文件路径
+            max_bytes: 单个文件的最大字节数，超过后轮转
+            backup_count: 保留的旧文件数量
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.lock = threading.Lock()
+        self.file = open(path, 'a', encoding='utf-8')
+        self.size = self.file.tell()
+
+    def _rotate(self):
+        self.file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, 'w', encoding='utf-8')
+        self.size = 0
+
+    def write(self, message):
+        with self.lock:
+            if self.file is None:
+                return
+            if self.size >= self.max_bytes and message.endswith('\n'):
+                self._rotate()
+            self.file.write(message)
+            self.size += len(message.encode('utf-8'))
+
+    def flush(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
 class Logger:
-    """日志记录器，重定向输出到文本控件"""
-    def __init__(self, text_widget):
+    """日志记录器，重定向输出到文本控件
+    
+    输出先放入环形缓冲区，由GUI线程定时批量写入文本控件，写日志本身不会操作控件
+    """
+    def __init__(self, text_widget, max_lines=500, level='INFO', file_sink=None):
+        """初始化日志记录器
+        
+        Args:
+            text_widget: 显示日志的文本控件
+            max_lines: 文本控件中保留的最大行数
+            level: 日志级别，低于该级别的日志会被忽略，print的输出视为INFO，级别为WARNING或ERROR时不显示
+            file_sink: 可选的RotatingFileSink
+        """
         self.terminal = sys.stdout
         self.text_widget = text_widget
-        self.max_lines = 500  # 默认最大行数，会被配置覆盖
+        self.max_lines = max_lines  # 会被配置覆盖
+        self.level = level
+        self.file_sink = file_sink
+        # 环形缓冲区，控件来不及刷新时丢弃最早的输出
+        self.pending = deque(maxlen=max_lines * 4)
+        self.flush_job = None
+
+    def update_settings(self, max_lines=None, level=None):
+        """更新最大行数和日志级别，缓冲区按新的行数重新分配"""
+        if max_lines is not None and max_lines != self.max_lines:
+            self.max_lines = max_lines
+            self.pending = deque(self.pending, maxlen=max_lines * 4)
+        if level is not None:
+            self.level = level
 
     def write(self, message):
+        # print的输出视为INFO级别
+        if LOG_LEVELS['INFO'] < LOG_LEVELS.get(self.level, 20):
+            return
+        self._write(message)
+
+    def _write(self, message):
         try:
             if self.terminal:
                 self.terminal.write(message)
+            if self.file_sink:
+                self.file_sink.write(message)
+            self.pending.append(message)
+        except:
+            pass  # 忽略错误，确保程序不会崩溃
+
+    def log(self, message, level='INFO'):
+        """按级别写入一条日志"""
+        if LOG_LEVELS.get(level, 20) < LOG_LEVELS.get(self.level, 20):
+            return
+        if level != 'INFO':
+            message = f"[{level}] {message}"
+        self._write(message + "\n")
+
+    def start_flush_timer(self, root, interval=100):
+        """定时把缓冲区写入文本控件
+        
+        Args:
+            root: Tk根窗口
+            interval: 刷新间隔(毫秒)
+        """
+        def tick():
+            self.flush_pending()
+            self.flush_job = root.after(interval, tick)
+        tick()
+
+    def flush_pending(self):
+        """把缓冲区中的输出一次性写入文本控件，只能在GUI线程调用"""
+        chunks = []
+        try:
+            while True:
+                chunks.append(self.pending.popleft())
+        except IndexError:
+            pass
+        if chunks:
+            self._insert("".join(chunks))
+
+    def _insert(self, message):
+        """写入文本控件"""
+        try:
             if self.text_widget:
-                # 限制日志框中的行数
-                lines = self.text_widget.get('1.0', tk.END).count('\n')
+                self.text_widget.insert('end', message)
+                # 限制日志框中的行数，index直接给出行号，不需要读取全部文本
+                lines = int(self.text_widget.index('end-1c').split('.')[0])
                 if lines > self.max_lines:
-                    # 删除前半部分的日志
-                    self.text_widget.delete('1.0', f'{lines//2}.0')
-                
-                self.text_widget.insert(tk.END, message)
-                self.text_widget.see(tk.END)
-                self.text_widget.update()
+                    self.text_widget.delete('1.0', f'{lines - self.max_lines + 1}.0')
+                self.text_widget.see('end')
         except:
             pass  # 忽略错误，确保程序不会崩溃
 
@@ -34,8 +156,104 @@ class Logger:
         try:
             if self.terminal:
                 self.terminal.flush()
+            if self.file_sink:
+                self.file_sink.flush()
+        except:
+            pass
+
+    def close(self):
+        """停止定时刷新，关闭日志文件"""
+        try:
+            if self.flush_job is not None:
+                self.text_widget.after_cancel(self.flush_job)
+                self.flush_job = None
         except:
             pass
+        if self.file_sink:
+            self.file_sink.close()
+
+class StructuredLogger:
+    """结构化日志记录器，无界面运行时替换sys.stdout，每条日志输出为一行JSON
+    
+    print的输出按行记录为INFO级别的消息，event用于记录带字段的事件
+    """
+    def __init__(self, stream=None, level='INFO', file_sink=None):
+        """初始化结构化日志记录器
+        
+        Args:
+            stream: 输出流，默认为标准错误
+            level: 日志级别，低于该级别的日志会被忽略
+            file_sink: 可选的RotatingFileSink
+        """
+        self.stream = stream or sys.stderr
+        self.level = level
+        self.file_sink = file_sink
+        self.lock = threading.Lock()
+        self.buffer = ""
+
+    def _emit(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        try:
+            with self.lock:
+                self.stream.write(line)
+                self.stream.flush()
+                if self.file_sink:
+                    self.file_sink.write(line)
+        except Exception:
+            pass  # 忽略错误，确保程序不会崩溃
+
+    def _record(self, level, **fields):
+        record = {'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'level': level}
+        record.update(fields)
+        return record
+
+    def write(self, message):
+        # 按行输出，不完整的行先缓存，空行忽略
+        with self.lock:
+            self.buffer += message
+            if "\n" not in self.buffer:
+                return
+            *lines, self.buffer = self.buffer.split("\n")
+        # print的输出视为INFO级别
+        for line in lines:
+            if line.strip():
+                self.log(line)
+
+    def log(self, message, level='INFO'):
+        """按级别写入一条日志"""
+        if LOG_LEVELS.get(level, 20) < LOG_LEVELS.get(self.level, 20):
+            return
+        self._emit(self._record(level, message=message))
+
+    def event(self, name, level='INFO', **fields):
+        """记录一个带字段的事件"""
+        if LOG_LEVELS.get(level, 20) < LOG_LEVELS.get(self.level, 20):
+            return
+        self._emit(self._record(level, event=name, **fields))
+
+    def flush(self):
+        try:
+            self.stream.flush()
+            if self.file_sink:
+                self.file_sink.flush()
+        except Exception:
+            pass
+
+    def close(self):
+        """输出未完成的行，关闭日志文件"""
+        if self.buffer.strip():
+            self.log(self.buffer)
+        self.buffer = ""
+        if self.file_sink:
+            self.file_sink.close()
+
+def log(message, level='INFO'):
+    """按级别输出日志，sys.stdout不是Logger时只输出INFO及以上级别"""
+    stream = sys.stdout
+    if isinstance(stream, (Logger, StructuredLogger)):
+        stream.log(message, level)
+    elif LOG_LEVELS.get(level, 20) >= LOG_LEVELS['INFO']:
+        print(message)
 
 def format_bytes(bytes_value):
     """将字节数格式化为易读的字符串"""
@@ -109,5 +327,5 @@ def get_system_info():
             'process_memory': process_memory
         }
     except Exception as e:
-        print(f"获取系统信息失败: {str(e)}")
+        log(f"获取系统信息失败: {str(e)}", 'ERROR')
         return None 
\ No newline at end of file